@@ -0,0 +1,65 @@
+"""
+Measures time-to-prompt (from starting the backend process until its welcome
+message arrives) and the latency of the first autocompletion request, which
+needs jedi, right after the prompt and after the backend has been idle for a while.
+
+    python misc/benchmarks/backend_startup_benchmark.py [repeats]
+"""
+import os.path
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from debugger_delta_benchmark import BackendSession
+from thonny.common import InlineCommand, InlineResponse  # @UnresolvedImport
+
+SOURCE = "import os\nos.pa"
+
+
+def complete(session):
+    start = time.perf_counter()
+    session.send(
+        InlineCommand("editor_autocomplete", source=SOURCE, row=2, column=5, filename=None)
+    )
+    session.receive_until(InlineResponse)
+    return time.perf_counter() - start
+
+
+def measure(work_dir, preload, idle_time):
+    start = time.perf_counter()
+    session = BackendSession(work_dir, preload_shared_modules=preload)
+    time_to_prompt = time.perf_counter() - start
+
+    time.sleep(idle_time)
+    completion_time = complete(session)
+    session.close()
+    return time_to_prompt, completion_time
+
+
+def format_times(times):
+    return "median %6.1f ms, max %6.1f ms" % (
+        statistics.median(times) * 1000,
+        max(times) * 1000,
+    )
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    work_dir = tempfile.mkdtemp()
+
+    for title, preload, idle_time in [
+        ("no preload, immediate", False, 0),
+        ("preload, immediate", True, 0),
+        ("preload, after 1 s idle", True, 1),
+    ]:
+        results = [measure(work_dir, preload, idle_time) for _ in range(repeats)]
+        print(title)
+        print("  time to prompt:   " + format_times([r[0] for r in results]))
+        print("  first completion: " + format_times([r[1] for r in results]))
+
+
+if __name__ == "__main__":
+    main()
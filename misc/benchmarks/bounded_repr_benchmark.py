@@ -0,0 +1,81 @@
+"""
+Compares the time of full repr + truncation (as export_value did before)
+with bounded_repr on big containers, using the budgets for variables (100)
+and for other exported values (5000).
+
+    python misc/benchmarks/bounded_repr_benchmark.py [element count]
+"""
+import os.path
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from thonny.bounded_repr import bounded_repr  # @UnresolvedImport
+
+
+def full_repr(value, max_length):
+    rep = repr(value)
+    if len(rep) > max_length:
+        rep = rep[:max_length] + "…"
+    return rep
+
+
+def create_values(count):
+    values = [
+        ("small list", [1, "a", {"b": 2.5}]),
+        ("list of ints", list(range(count))),
+        ("list of floats", [i / 3 for i in range(count)]),
+        ("list of strings", ["item %d" % i for i in range(count)]),
+        ("dict", {i: str(i) for i in range(count)}),
+        ("set", set(range(count))),
+        ("nested lists", [[i, [i, i]] for i in range(count // 3)]),
+        ("long string", "x" * count * 10),
+    ]
+
+    try:
+        import numpy
+    except ImportError:
+        pass
+    else:
+        values.append(("numpy array", numpy.arange(count, dtype=float)))
+        try:
+            import pandas
+        except ImportError:
+            pass
+        else:
+            values.append(
+                ("pandas DataFrame", pandas.DataFrame({"a": range(count), "b": range(count)}))
+            )
+
+    return values
+
+
+def measure(func, value, max_length, repeats=3):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func(value, max_length)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000000
+    print("%d elements" % count)
+    print("%-18s %8s %12s %12s" % ("", "budget", "full repr", "bounded"))
+    for title, value in create_values(count):
+        for max_length in [100, 5000]:
+            print(
+                "%-18s %8d %10.3fms %10.3fms"
+                % (
+                    title,
+                    max_length,
+                    measure(full_repr, value, max_length) * 1000,
+                    measure(bounded_repr, value, max_length) * 1000,
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
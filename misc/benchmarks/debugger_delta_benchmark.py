@@ -0,0 +1,158 @@
+"""
+Measures the amount of data the backend sends per debugger step
+with full stacks and with stack deltas (source texts are announced once
+and included in the size of the step which announced them).
+
+    python misc/benchmarks/debugger_delta_benchmark.py [steps] [FastDebug|Debug]
+"""
+import os.path
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+import thonny.common  # @UnresolvedImport
+from thonny.common import (  # @UnresolvedImport
+    BINARY_FRAME_HEADER_SIZE,
+    BINARY_FRAME_MARKER,
+    DebuggerCommand,
+    DebuggerResponse,
+    ToplevelCommand,
+    ToplevelResponse,
+    apply_stack_delta,
+    parse_binary_frame_header,
+    parse_binary_message,
+    parse_message,
+    serialize_binary_message,
+    serialize_message,
+)
+
+
+def create_student_program(line_count=2000):
+    lines = ["import math", "", "results = {}", ""]
+    function_count = 0
+    while len(lines) < line_count - 10:
+        lines += [
+            "def compute_%d(n):" % function_count,
+            "    total = 0",
+            "    for i in range(n):",
+            "        total += math.sqrt(i) * %d" % function_count,
+            "    return total",
+            "",
+            "value_%d = compute_%d(3)" % (function_count, function_count),
+            "results[%d] = value_%d" % (function_count, function_count),
+            "",
+        ]
+        function_count += 1
+
+    return "\n".join(lines) + "\n"
+
+
+class BackendSession:
+    def __init__(self, work_dir, **init_options):
+        env = dict(os.environ, THONNY_USER_DIR=work_dir, PYTHONIOENCODING="utf-8")
+        launcher = os.path.join(os.path.dirname(thonny.common.__file__), "backend_launcher.py")
+        self._proc = subprocess.Popen(
+            [sys.executable, "-u", "-B", launcher],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            cwd=work_dir,
+            env=env,
+        )
+        init_msg = dict(init_options, frontend_sys_path=sys.path, protocols=["binary"])
+        self._send_raw((serialize_message(init_msg) + "\n").encode("ASCII"))
+        self.receive_until(ToplevelResponse)
+
+    def _send_raw(self, data):
+        self._proc.stdin.write(data)
+        self._proc.stdin.flush()
+
+    def send(self, msg):
+        self._send_raw(serialize_binary_message(msg))
+
+    def receive(self):
+        """Returns next message and its size in bytes"""
+        stdout = self._proc.stdout
+        while True:
+            start = stdout.read(1)
+            if start == b"":
+                raise RuntimeError("Backend terminated")
+            elif start == BINARY_FRAME_MARKER:
+                header = start + stdout.read(BINARY_FRAME_HEADER_SIZE - 1)
+                payload = stdout.read(parse_binary_frame_header(header))
+                return parse_binary_message(payload), len(header) + len(payload)
+            else:
+                line = start + stdout.readline()
+                if line.startswith(thonny.common.MESSAGE_MARKER.encode("ASCII")):
+                    return parse_message(line.decode("ASCII")), len(line)
+
+    def receive_until(self, msg_classes):
+        """Returns the message and the number of bytes read
+        (including preceding messages, eg. source announcements)"""
+        total_size = 0
+        while True:
+            msg, size = self.receive()
+            total_size += size
+            if isinstance(msg, msg_classes):
+                return msg, total_size
+
+    def close(self):
+        self._proc.kill()
+
+
+def measure(script_path, work_dir, command_name, steps, use_deltas):
+    session = BackendSession(work_dir)
+    session.send(ToplevelCommand(command_name, args=[script_path], breakpoints={}))
+    msg, size = session.receive_until(DebuggerResponse)
+    sizes = [size]
+    stack = msg["stack"]
+    state_id = msg["state_id"]
+
+    for _ in range(steps):
+        cmd = DebuggerCommand(
+            "step_into",
+            breakpoints={},
+            cursor_position=None,
+            frame_id=stack[-1].id,
+            state=stack[-1].event,
+            focus=stack[-1].focus,
+        )
+        if use_deltas:
+            cmd["acknowledged_state_id"] = state_id
+        session.send(cmd)
+
+        msg, size = session.receive_until((DebuggerResponse, ToplevelResponse))
+        if isinstance(msg, ToplevelResponse):
+            break
+        sizes.append(size)
+
+        if "stack_delta_base" in msg:
+            stack = apply_stack_delta(stack, msg["stack"])
+        else:
+            stack = msg["stack"]
+        state_id = msg["state_id"]
+
+    session.close()
+    return sizes
+
+
+def main():
+    steps = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    command_name = sys.argv[2] if len(sys.argv) > 2 else "FastDebug"
+
+    work_dir = tempfile.mkdtemp()
+    script_path = os.path.join(work_dir, "student_project.py")
+    with open(script_path, "w", encoding="utf-8") as fp:
+        fp.write(create_student_program())
+
+    for title, use_deltas in [("full stacks", False), ("stack deltas", True)]:
+        sizes = measure(script_path, work_dir, command_name, steps, use_deltas)
+        print(
+            "%-13s %4d steps, avg %8.0f bytes/step, first %8d bytes, total %10d bytes"
+            % (title, len(sizes), sum(sizes) / len(sizes), sizes[0], sum(sizes))
+        )
+
+
+if __name__ == "__main__":
+    main()
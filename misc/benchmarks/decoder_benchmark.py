@@ -0,0 +1,144 @@
+"""
+Compares thonny.common.decode_repr with eval on corpora of text protocol messages.
+
+A corpus is a file with one serialized message (as sent by the backend) per line.
+Record a corpus by running a sample program (and debugging it) in a real backend:
+    python misc/benchmarks/decoder_benchmark.py --record corpus.txt
+
+Benchmark given corpora (or built-in synthetic messages, if no files are given):
+    python misc/benchmarks/decoder_benchmark.py corpus.txt other_corpus.txt
+"""
+import os.path
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+import thonny.common  # @UnresolvedImport
+from thonny.common import (  # @UnresolvedImport
+    DebuggerCommand,
+    DebuggerResponse,
+    ToplevelCommand,
+    ToplevelResponse,
+    decode_repr,
+    serialize_message,
+)
+
+SAMPLE_PROGRAM = """
+import math
+
+def describe(n):
+    parts = [str(i) for i in range(n)]
+    return {"n": n, "sqrt": math.sqrt(n), "parts": parts, "missing": float("nan")}
+
+data = {}
+for i in range(30):
+    data[i] = describe(i)
+    print(i, data[i]["sqrt"], "õun", b"bytes")
+"""
+
+
+def record(corpus_path, debug_steps=50):
+    tmp_dir = tempfile.mkdtemp()
+    script_path = os.path.join(tmp_dir, "sample.py")
+    with open(script_path, "w", encoding="utf-8") as fp:
+        fp.write(SAMPLE_PROGRAM)
+
+    env = dict(os.environ, THONNY_USER_DIR=tmp_dir, PYTHONIOENCODING="utf-8")
+    launcher = os.path.join(os.path.dirname(thonny.common.__file__), "backend_launcher.py")
+    proc = subprocess.Popen(
+        [sys.executable, "-u", "-B", launcher],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        cwd=tmp_dir,
+        env=env,
+    )
+
+    lines = []
+
+    def send(msg):
+        proc.stdin.write((serialize_message(msg) + "\n").encode("ASCII"))
+        proc.stdin.flush()
+
+    def receive_until(msg_classes):
+        while True:
+            line = proc.stdout.readline()
+            if not line:
+                raise RuntimeError("Backend terminated")
+            if line.startswith(thonny.common.MESSAGE_MARKER.encode("ASCII")):
+                lines.append(line.decode("ASCII").rstrip("\r\n"))
+                msg = decode_repr(lines[-1][1:].encode("ASCII").decode("UTF-7"))
+                if isinstance(msg, msg_classes):
+                    return msg
+
+    send({"frontend_sys_path": sys.path, "protocols": ["text"]})
+    receive_until(ToplevelResponse)
+
+    send(ToplevelCommand("execute_source", source=SAMPLE_PROGRAM))
+    receive_until(ToplevelResponse)
+
+    send(ToplevelCommand("FastDebug", args=[script_path], breakpoints={}))
+    receive_until(DebuggerResponse)
+    for _ in range(debug_steps):
+        send(DebuggerCommand("step_into", breakpoints={}, cursor_position=None))
+        if isinstance(receive_until((DebuggerResponse, ToplevelResponse)), ToplevelResponse):
+            break
+
+    proc.kill()
+
+    with open(corpus_path, "w", encoding="ASCII") as fp:
+        fp.write("\n".join(lines) + "\n")
+
+    print("Recorded %d messages to %s" % (len(lines), corpus_path))
+
+
+def load_corpus(path):
+    with open(path, encoding="ASCII") as fp:
+        return [line.rstrip("\r\n") for line in fp if line.strip()]
+
+
+def create_synthetic_corpus():
+    from protocol_benchmark import create_debugger_response, create_program_output
+
+    return [serialize_message(create_program_output()) for _ in range(200)] + [
+        serialize_message(create_debugger_response()) for _ in range(10)
+    ]
+
+
+def measure(title, lines, repeat=5):
+    texts = [line[1:].encode("ASCII").decode("UTF-7") for line in lines]
+    eval_namespace = dict(vars(thonny.common), nan=float("nan"), inf=float("inf"))
+
+    results = {}
+    for name, fun in [
+        ("eval", lambda text: eval(text, eval_namespace)),
+        ("decode_repr", decode_repr),
+    ]:
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for text in texts:
+                fun(text)
+            duration = time.perf_counter() - start
+            best = duration if best is None else min(best, duration)
+        results[name] = best
+
+    total_size = sum(map(len, texts))
+    print("%s (%d messages, %d KB)" % (title, len(texts), total_size // 1024))
+    for name in results:
+        print(
+            "  %-12s %10.0f msg/s %8.2f MB/s"
+            % (name, len(texts) / results[name], total_size / results[name] / 1024 / 1024)
+        )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "--record":
+        record(sys.argv[2])
+    elif len(sys.argv) > 1:
+        for path in sys.argv[1:]:
+            measure(os.path.basename(path), load_corpus(path))
+    else:
+        measure("synthetic", create_synthetic_corpus())
@@ -0,0 +1,127 @@
+"""
+Compares the time of running a CPU-bound program without debugger ("Run")
+with the faster debugger resuming to a breakpoint at the end of the program
+and stepping over the calls in its main loop. Faster debugger gets measured with
+sys.settrace (FastTracer) and, if the interpreter supports it (Python 3.12+),
+with sys.monitoring (MonitoringTracer).
+
+    python misc/benchmarks/fast_tracer_benchmark.py [repeats]
+"""
+import os.path
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from debugger_delta_benchmark import BackendSession
+from thonny.common import (  # @UnresolvedImport
+    DebuggerCommand,
+    DebuggerResponse,
+    ToplevelCommand,
+    ToplevelResponse,
+)
+
+PROGRAM = """
+def work(n):
+    total = 0
+    for i in range(n):
+        total += i * i % 7
+    return total
+
+result = 0
+for k in range(300):
+    result += work(10000)
+print(result)
+"""
+
+LOOP_LINE = PROGRAM.count("\n", 0, PROGRAM.index("    result +=")) + 1
+LAST_LINE = PROGRAM.count("\n", 0, PROGRAM.index("print(result)")) + 1
+STEP_OVER_COUNT = 20
+
+
+def measure(work_dir, script_path, command_name, breakpoints, use_sys_monitoring, step_overs):
+    session = BackendSession(work_dir)
+    start = time.perf_counter()
+    session.send(
+        ToplevelCommand(
+            command_name,
+            args=[script_path],
+            breakpoints=breakpoints,
+            use_sys_monitoring=use_sys_monitoring,
+        )
+    )
+    msg, _ = session.receive_until((DebuggerResponse, ToplevelResponse))
+
+    if step_overs:
+        # measure only stepping
+        start = time.perf_counter()
+        for _ in range(step_overs):
+            frame = msg["stack"][-1]
+            session.send(
+                DebuggerCommand(
+                    "step_over",
+                    breakpoints={},
+                    cursor_position=None,
+                    frame_id=frame.id,
+                    state=frame.event,
+                    focus=frame.focus,
+                )
+            )
+            msg, _ = session.receive_until((DebuggerResponse, ToplevelResponse))
+
+    duration = time.perf_counter() - start
+    session.close()
+    return duration
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    work_dir = tempfile.mkdtemp()
+    script_path = os.path.join(work_dir, "cpu_bound.py")
+    with open(script_path, "w", encoding="utf-8") as fp:
+        fp.write(PROGRAM)
+
+    variants = [("run", "Run", {}, False, 0)]
+    tracers = [("settrace", False)]
+    if hasattr(sys, "monitoring"):
+        tracers.append(("monitoring", True))
+    for tracer_title, use_sys_monitoring in tracers:
+        variants += [
+            (
+                "resume to end, %s" % tracer_title,
+                "FastDebug",
+                {script_path: {LAST_LINE}},
+                use_sys_monitoring,
+                0,
+            ),
+            (
+                "%d step overs, %s" % (STEP_OVER_COUNT, tracer_title),
+                "FastDebug",
+                {script_path: {LOOP_LINE}},
+                use_sys_monitoring,
+                STEP_OVER_COUNT,
+            ),
+        ]
+
+    for title, command_name, breakpoints, use_sys_monitoring, step_overs in variants:
+        durations = [
+            measure(
+                work_dir, script_path, command_name, breakpoints, use_sys_monitoring, step_overs
+            )
+            for _ in range(repeats)
+        ]
+        print(
+            "%-26s median %8.1f ms, min %8.1f ms, max %8.1f ms"
+            % (
+                title,
+                statistics.median(durations) * 1000,
+                min(durations) * 1000,
+                max(durations) * 1000,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Evaluates an expression producing a big value in the shell many times and reports
+backend's resident memory (Linux only) and heap statistics with an effectively
+unlimited heap (as it was before heap eviction) and with the default limit.
+
+    python misc/benchmarks/heap_growth_benchmark.py [evaluations] [MB per value]
+"""
+import os.path
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from debugger_delta_benchmark import BackendSession
+from thonny.backend import _HEAP_DEFAULT_SIZE_LIMIT  # @UnresolvedImport
+from thonny.common import (  # @UnresolvedImport
+    InlineCommand,
+    InlineResponse,
+    ToplevelCommand,
+    ToplevelResponse,
+)
+
+
+def get_rss_mb(pid):
+    with open("/proc/%d/status" % pid) as fp:
+        for line in fp:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+
+    return float("nan")
+
+
+def measure(work_dir, heap_size_limit, evaluations, value_mb):
+    session = BackendSession(work_dir, heap_size_limit=heap_size_limit)
+    source = "b'x' * %d" % (value_mb * 1024 * 1024)
+    for _ in range(evaluations):
+        session.send(ToplevelCommand("execute_source", source=source))
+        session.receive_until(ToplevelResponse)
+
+    session.send(InlineCommand("get_heap_stats"))
+    msg, _ = session.receive_until(InlineResponse)
+    rss = get_rss_mb(session._proc.pid)
+    session.close()
+    return rss, msg["heap_stats"]
+
+
+def main():
+    evaluations = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    value_mb = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    work_dir = tempfile.mkdtemp()
+
+    for title, limit in [("unlimited", 2 ** 62), ("default limit", _HEAP_DEFAULT_SIZE_LIMIT)]:
+        rss, stats = measure(work_dir, limit, evaluations, value_mb)
+        print(
+            "%-14s RSS %7.1f MB, strong values %5d (%7.1f MB), evicted %d"
+            % (
+                title,
+                rss,
+                stats["strong_count"],
+                stats["strong_size"] / 1024 / 1024,
+                stats["eviction_count"],
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Measures how fast printed lines reach the frontend with and without
+output buffering in the backend.
+
+    python misc/benchmarks/output_benchmark.py [line_count]
+"""
+import os.path
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from debugger_delta_benchmark import BackendSession
+from thonny.common import BackendEvent, ToplevelCommand, ToplevelResponse  # @UnresolvedImport
+
+PROGRAMS = [
+    ("print loop", "for i in range(%d):\n    print(i)\n"),
+    (
+        "mixed streams",
+        "import sys\n"
+        "for i in range(%d):\n"
+        "    print(i, file=sys.stderr if i %% 10 == 0 else sys.stdout)\n",
+    ),
+]
+
+
+def measure(work_dir, source, output_buffering):
+    session = BackendSession(work_dir, output_buffering=output_buffering)
+    start = time.perf_counter()
+    session.send(ToplevelCommand("execute_source", source=source))
+
+    message_count = 0
+    line_count = 0
+    chunks = []
+    while True:
+        msg, _ = session.receive()
+        if isinstance(msg, ToplevelResponse):
+            break
+        elif isinstance(msg, BackendEvent) and msg.event_type == "ProgramOutput":
+            message_count += 1
+            line_count += msg["data"].count("\n")
+            chunks.append((msg["stream_name"], msg["data"]))
+
+    duration = time.perf_counter() - start
+    session.close()
+    return line_count, message_count, duration, chunks
+
+
+def main():
+    line_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    work_dir = tempfile.mkdtemp()
+
+    for title, template in PROGRAMS:
+        print("%s (%d lines)" % (title, line_count))
+        outputs = []
+        for output_buffering in [False, True]:
+            lines, messages, duration, chunks = measure(
+                work_dir, template % line_count, output_buffering
+            )
+            outputs.append(chunks)
+            print(
+                "  %-12s %8d messages %10.0f lines/s"
+                % ("buffered" if output_buffering else "unbuffered", messages, lines / duration)
+            )
+
+        # buffering may merge messages, but must keep the content and order of streams
+        def merge(chunks):
+            result = []
+            for stream_name, data in chunks:
+                if result and result[-1][0] == stream_name:
+                    result[-1] = (stream_name, result[-1][1] + data)
+                else:
+                    result.append((stream_name, data))
+            return result
+
+        assert merge(outputs[0]) == merge(outputs[1])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Measures how long Workbench spends on finding and importing built-in frontend
+plug-ins, when all modules get imported and when modules with a manifest
+are left for later.
+
+Cold runs use a fresh copy of thonny package (without bytecode) and no manifest cache,
+warm runs have both caches filled.
+load_plugin functions are not called, as they need a Tk window.
+
+    python misc/benchmarks/plugin_loading_benchmark.py [repeats]
+"""
+import os.path
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+REPO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..")
+
+PROBE = """
+import importlib, pkgutil, sys, time
+sys.path.insert(0, %r)
+import thonny.workbench
+import thonny.plugins
+from thonny.plugin_manifests import ManifestCache
+
+start = time.perf_counter()
+cache = ManifestCache(%r) if %r else None
+for module_info in pkgutil.iter_modules(thonny.plugins.__path__, "thonny.plugins."):
+    if cache is not None and cache.get_manifest(module_info) is not None:
+        continue
+    try:
+        importlib.import_module(module_info[1])
+    except Exception:
+        pass
+if cache is not None:
+    cache.save()
+print(time.perf_counter() - start)
+"""
+
+
+def measure(use_manifests, warm):
+    work_dir = tempfile.mkdtemp()
+    shutil.copytree(
+        os.path.join(REPO_DIR, "thonny"),
+        os.path.join(work_dir, "thonny"),
+        ignore=shutil.ignore_patterns("__pycache__"),
+    )
+    cache_path = os.path.join(work_dir, "plugin_manifests.cache")
+    code = PROBE % (work_dir, cache_path, use_manifests)
+    cmd = [sys.executable, "-c", code]
+    if warm:
+        # fill the caches
+        subprocess.check_output(cmd)
+    result = float(subprocess.check_output(cmd))
+    shutil.rmtree(work_dir)
+    return result
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    for title, use_manifests in [("import all", False), ("manifests", True)]:
+        for warm in [False, True]:
+            durations = [measure(use_manifests, warm) for _ in range(repeats)]
+            print(
+                "%-11s %-5s median %6.1f ms, max %6.1f ms"
+                % (
+                    title,
+                    "warm" if warm else "cold",
+                    statistics.median(durations) * 1000,
+                    max(durations) * 1000,
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Compares encode+decode throughput of text (repr/eval + UTF-7) and binary
+frontend-backend protocols on typical messages.
+
+Run from the repository root:
+    python misc/benchmarks/protocol_benchmark.py
+"""
+import os.path
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from thonny.common import (  # @UnresolvedImport
+    BINARY_FRAME_HEADER_SIZE,
+    BackendEvent,
+    DebuggerResponse,
+    FrameInfo,
+    TextRange,
+    ValueInfo,
+    parse_binary_message,
+    parse_message,
+    serialize_binary_message,
+    serialize_message,
+)
+
+
+def create_program_output():
+    return BackendEvent("ProgramOutput", stream_name="stdout", data="Tere, maailm! 12345\n")
+
+
+def create_debugger_response(frame_count=3, variable_count=30, source_lines=200):
+    source = "\n".join("x%d = some_function(%d) + 'õun'" % (i, i) for i in range(source_lines))
+    variables = {"var%d" % i: ValueInfo(10000 + i, repr([i] * 5)) for i in range(variable_count)}
+    stack = []
+    for i in range(frame_count):
+        stack.append(
+            FrameInfo(
+                id=1000 + i,
+                filename="/home/student/project/module%d.py" % i,
+                module_name="__main__",
+                code_name="<module>" if i == 0 else "func%d" % i,
+                source=source,
+                source_hash=None,
+                lineno=10 + i,
+                firstlineno=1,
+                in_library=False,
+                locals=None if i == 0 else variables,
+                globals=variables,
+                freevars=(),
+                event="before_expression",
+                focus=TextRange(10 + i, 4, 10 + i, 20),
+                node_tags={"class=Call", "has_children"},
+                current_statement=TextRange(10 + i, 0, 10 + i, 30),
+                current_root_expression=TextRange(10 + i, 4, 10 + i, 30),
+                current_evaluations=[(TextRange(10 + i, 4, 10 + i, 8), ValueInfo(5, "42"))],
+            )
+        )
+
+    return DebuggerResponse(
+        stack=stack,
+        in_present=True,
+        io_symbol_count=123,
+        exception_info={
+            "id": None,
+            "msg": None,
+            "type_name": None,
+            "lines_with_frame_info": None,
+            "affected_frame_ids": set(),
+            "is_fresh": False,
+        },
+        tracer_class="NiceTracer",
+    )
+
+
+def text_roundtrip(msg):
+    return parse_message(serialize_message(msg))
+
+
+def binary_roundtrip(msg):
+    return parse_binary_message(serialize_binary_message(msg)[BINARY_FRAME_HEADER_SIZE:])
+
+
+def measure(title, msg, number):
+    print(title)
+    for name, fun, size in [
+        ("text", text_roundtrip, len(serialize_message(msg))),
+        ("binary", binary_roundtrip, len(serialize_binary_message(msg))),
+    ]:
+        assert fun(msg) == msg
+        duration = min(timeit.repeat(lambda: fun(msg), number=number, repeat=3))
+        print(
+            "  %-7s %9d bytes %12.0f msg/s %10.2f MB/s"
+            % (name, size, number / duration, size * number / duration / 1024 / 1024)
+        )
+
+
+if __name__ == "__main__":
+    measure("ProgramOutput", create_program_output(), 20000)
+    measure("DebuggerResponse (3 frames, 30 variables)", create_debugger_response(), 200)
+    measure(
+        "DebuggerResponse (10 frames, 300 variables, 2000 lines)",
+        create_debugger_response(10, 300, 2000),
+        10,
+    )
@@ -0,0 +1,109 @@
+"""
+Measures F5-to-first-output latency (from issuing Run until the first output
+of the script arrives) with a freshly started backend, with a backend forked
+by a zygote (Linux only) and with a spare backend prepared in advance.
+
+    python misc/benchmarks/spare_backend_benchmark.py [repeats]
+"""
+import os.path
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+import thonny.backend_launcher  # @UnresolvedImport
+from thonny.common import (  # @UnresolvedImport
+    BackendEvent,
+    ToplevelCommand,
+    serialize_binary_message,
+)
+from thonny.running import BackendProcess, BackendZygote  # @UnresolvedImport
+
+SCRIPT = """
+print("Hello!")
+"""
+
+
+def create_spec(work_dir):
+    return {
+        "cmd_line": [sys.executable, "-u", "-B", thonny.backend_launcher.__file__],
+        "env": dict(os.environ, PYTHONIOENCODING="utf-8", THONNY_USER_DIR=work_dir),
+        "cwd": work_dir,
+        "socket_transport": False,
+        "init_msg": {
+            "frontend_sys_path": sys.path,
+            "protocols": ["binary"],
+            "output_buffering": True,
+        },
+    }
+
+
+def run_script(process, script_path):
+    """Returns when first output of the script arrives"""
+    process.wait_until_ready()
+    process.message_output.write(
+        serialize_binary_message(ToplevelCommand("Run", args=[script_path]))
+    )
+    process.message_output.flush()
+
+    while True:
+        for msg in process.message_parser.read_messages():
+            if isinstance(msg, BackendEvent) and msg.event_type == "ProgramOutput":
+                return
+
+
+def measure(spec, script_path, use_spare, zygote=None):
+    if use_spare:
+        process = BackendProcess(spec, zygote)
+        process.warm_up()
+        start = time.perf_counter()
+    else:
+        start = time.perf_counter()
+        process = BackendProcess(spec, zygote)
+
+    run_script(process, script_path)
+    duration = time.perf_counter() - start
+    process.kill()
+    return duration
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    work_dir = tempfile.mkdtemp()
+    script_path = os.path.join(work_dir, "hello.py")
+    with open(script_path, "w", encoding="utf-8") as fp:
+        fp.write(SCRIPT)
+
+    spec = create_spec(work_dir)
+    variants = [("fresh backend", False, False), ("spare backend", True, False)]
+    if sys.platform == "linux":
+        variants.insert(1, ("forked backend", False, True))
+
+    for title, use_spare, use_zygote in variants:
+        zygote = None
+        if use_zygote:
+            zygote = BackendZygote(spec)
+            while not zygote.can_fork(spec):
+                if zygote.unsafe_reason is not None:
+                    raise RuntimeError("Zygote can't fork: " + zygote.unsafe_reason)
+                time.sleep(0.01)
+
+        durations = [measure(spec, script_path, use_spare, zygote) for _ in range(repeats)]
+        if zygote is not None:
+            zygote.kill()
+
+        print(
+            "%-14s median %7.1f ms, min %7.1f ms, max %7.1f ms"
+            % (
+                title,
+                statistics.median(durations) * 1000,
+                min(durations) * 1000,
+                max(durations) * 1000,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Starts N backends one after another and reports percentiles of their
+time-to-prompt and of the startup phases reported in the welcome message.
+
+    python misc/benchmarks/startup_phases_benchmark.py [count]
+"""
+import math
+import os.path
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from debugger_delta_benchmark import BackendSession
+from thonny.common import ToplevelResponse  # @UnresolvedImport
+
+PERCENTILES = [50, 90, 99]
+
+
+class PhaseRecordingSession(BackendSession):
+    def receive_until(self, msg_classes):
+        msg, size = super().receive_until(msg_classes)
+        if isinstance(msg, ToplevelResponse) and "startup_phases" in msg:
+            self.startup_phases = msg["startup_phases"]
+        return msg, size
+
+
+def percentile(values, p):
+    """Nearest-rank percentile"""
+    values = sorted(values)
+    return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    work_dir = tempfile.mkdtemp()
+
+    durations_by_phase = {}  # keeps phase order in Python 3.6+
+    total_durations = []
+    for _ in range(count):
+        start = time.time()
+        session = PhaseRecordingSession(work_dir, process_start_time=start)
+        total_durations.append(time.time() - start)
+        session.close()
+
+        for name, duration in session.startup_phases:
+            durations_by_phase.setdefault(name, []).append(duration)
+
+    print("%-58s" % ("%d backends" % count) + "".join("%8s" % ("p%d" % p) for p in PERCENTILES))
+    rows = [("time to prompt", total_durations)] + list(durations_by_phase.items())
+    for name, durations in rows:
+        print(
+            "%-58s" % name
+            + "".join("%6.1fms" % (percentile(durations, p) * 1000) for p in PERCENTILES)
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Measures "Step over" round trip latency (from sending the DebuggerCommand
+until the response gets handled in Tk thread) when the Tk thread learns about
+new messages by polling (as on Windows and macOS) or via a wakeup pipe (Linux).
+
+    python misc/benchmarks/step_latency_benchmark.py [steps]
+
+Uses a Tcl interpreter without Tk, so it doesn't need a display.
+"""
+import os.path
+import statistics
+import sys
+import tempfile
+import time
+import tkinter
+from threading import Thread
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from debugger_delta_benchmark import BackendSession
+from thonny.common import (  # @UnresolvedImport
+    DebuggerCommand,
+    DebuggerResponse,
+    ToplevelCommand,
+    apply_stack_delta,
+)
+from thonny.running import (  # @UnresolvedImport
+    MESSAGE_POLL_INTERVAL,
+    NOTIFIED_MESSAGE_POLL_INTERVAL,
+    MessageQueue,
+    WakeupPipe,
+)
+
+PROGRAM = """
+total = 0
+for i in range(100000):
+    total += i
+"""
+
+
+class SteppingClient:
+    def __init__(self, work_dir, script_path, steps, use_wakeup_pipe):
+        self._app = tkinter.Tcl()
+        self._steps = steps
+        self._latencies = []
+        self._command_time = None
+        self._done = False
+        self._stack = None
+
+        if use_wakeup_pipe:
+            self._wakeup_pipe = WakeupPipe(self._app, self._pull_messages)
+            self._queue = MessageQueue(100, self._wakeup_pipe.notify)
+            self._poll_interval = NOTIFIED_MESSAGE_POLL_INTERVAL
+        else:
+            self._wakeup_pipe = None
+            self._queue = MessageQueue(100)
+            self._poll_interval = MESSAGE_POLL_INTERVAL
+
+        self._session = BackendSession(work_dir)
+        Thread(target=self._listen, daemon=True).start()
+        self._command_time = time.perf_counter()
+        self._session.send(ToplevelCommand("FastDebug", args=[script_path], breakpoints={}))
+
+    def _listen(self):
+        while True:
+            try:
+                msg, _ = self._session.receive()
+            except RuntimeError:
+                # backend was closed
+                return
+            self._queue.append(msg)
+
+    def _poll_messages(self):
+        self._pull_messages()
+        self._app.after(self._poll_interval, self._poll_messages)
+
+    def _pull_messages(self):
+        while len(self._queue) > 0:
+            msg = self._queue.popleft()
+            if isinstance(msg, DebuggerResponse):
+                self._handle_debugger_response(msg)
+
+    def _handle_debugger_response(self, msg):
+        self._latencies.append(time.perf_counter() - self._command_time)
+        if len(self._latencies) > self._steps:
+            self._done = True
+            return
+
+        if "stack_delta_base" in msg:
+            self._stack = apply_stack_delta(self._stack, msg["stack"])
+        else:
+            self._stack = msg["stack"]
+
+        frame = self._stack[-1]
+        self._command_time = time.perf_counter()
+        self._session.send(
+            DebuggerCommand(
+                "step_over",
+                breakpoints={},
+                cursor_position=None,
+                frame_id=frame.id,
+                state=frame.event,
+                focus=frame.focus,
+                acknowledged_state_id=msg["state_id"],
+            )
+        )
+
+    def run(self):
+        self._poll_messages()
+        # Tcl's mainloop would quit immediately, as there are no Tk windows
+        while not self._done:
+            self._app.dooneevent()
+        self._session.close()
+        if self._wakeup_pipe is not None:
+            self._wakeup_pipe.close()
+
+        # first response includes backend's preparations
+        return self._latencies[1:]
+
+
+def main():
+    steps = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    work_dir = tempfile.mkdtemp()
+    script_path = os.path.join(work_dir, "loop.py")
+    with open(script_path, "w", encoding="utf-8") as fp:
+        fp.write(PROGRAM)
+
+    for title, use_wakeup_pipe in [("polling", False), ("wakeup pipe", True)]:
+        latencies = SteppingClient(work_dir, script_path, steps, use_wakeup_pipe).run()
+        print(
+            "%-12s %4d steps, mean %6.2f ms, median %6.2f ms, max %6.2f ms"
+            % (
+                title,
+                len(latencies),
+                statistics.mean(latencies) * 1000,
+                statistics.median(latencies) * 1000,
+                max(latencies) * 1000,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -59,14 +59,19 @@ def check_initialization():
 
 
 def launch():
-    _prepare_thonny_user_dir()
+    from thonny import startup_profiler
+
+    with startup_profiler.phase("_prepare_thonny_user_dir"):
+        _prepare_thonny_user_dir()
 
     try:
-        from thonny import workbench
+        with startup_profiler.phase("import thonny.workbench"):
+            from thonny import workbench
 
         if _should_delegate():
             # First check if there is existing Thonny instance to handle the request
-            delegation_result = _try_delegate_to_existing_instance(sys.argv[1:])
+            with startup_profiler.phase("_try_delegate_to_existing_instance"):
+                delegation_result = _try_delegate_to_existing_instance(sys.argv[1:])
             if delegation_result == True:  # pylint: disable=singleton-comparison
                 # we're done
                 print("Delegated to an existing Thonny instance. Exiting now.")
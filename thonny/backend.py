@@ -1,13 +1,19 @@
 # -*- coding: utf-8 -*-
 
 import ast
+import atexit
 import builtins
 import copy
+import dis
 import functools
+import gc
+import hashlib
 import importlib
 import inspect
 import io
+import itertools
 import logging
+import marshal
 import os.path
 import pkgutil
 import pydoc
@@ -16,18 +22,23 @@ import signal
 import site
 import subprocess
 import sys
+import time
 import tokenize
 import traceback
 import types
 import warnings
-from collections import namedtuple
+import weakref
+from collections import OrderedDict, namedtuple
 from importlib.machinery import PathFinder, SourceFileLoader
-from threading import Thread
+from threading import Event, RLock, Thread, get_ident
 
 import __main__  # @UnresolvedImport
 import _ast
 import thonny
+from thonny.bounded_repr import bounded_repr
 from thonny.common import (
+    BINARY_FRAME_HEADER_SIZE,
+    BINARY_FRAME_MARKER,
     BackendEvent,
     DebuggerCommand,
     DebuggerResponse,
@@ -40,10 +51,15 @@ from thonny.common import (
     ToplevelResponse,
     UserError,
     ValueInfo,
+    create_stack_delta,
+    format_startup_phases,
+    parse_binary_frame_header,
+    parse_binary_message,
     parse_message,
     path_startswith,
     range_contains_smaller,
     range_contains_smaller_or_equal,
+    serialize_binary_message,
     serialize_message,
     get_exe_dirs,
     get_augmented_system_path,
@@ -61,6 +77,44 @@ logger = logging.getLogger("thonny.backend")
 
 _CONFIG_FILENAME = os.path.join(thonny.THONNY_USER_DIR, "backend_configuration.ini")
 
+# modules which are imported with frontend's sys.path (in addition to backend's own).
+# Plug-ins need the eager ones during startup, the others are needed only by
+# autocompletion and NiceTracer and get imported on first use (or when backend is idle)
+_EAGER_SHARED_MODULE_NAMES = ["thonnycontrib"]
+_LAZY_SHARED_MODULE_NAMES = ["parso", "jedi", "six", "asttokens"]
+SHARED_MODULE_NAMES = _EAGER_SHARED_MODULE_NAMES + _LAZY_SHARED_MODULE_NAMES
+
+# Lazy shared modules get preloaded when backend hasn't got commands for this many seconds
+_IDLE_PRELOAD_DELAY = 0.5
+
+# Buffered program output gets sent when this many characters have accumulated ...
+_OUTPUT_FLUSH_SIZE = 16384
+# ... or when this many seconds have passed since the first buffered write
+_OUTPUT_FLUSH_INTERVAL = 0.05
+
+# Exported values are kept with strong references until there are this many of them ...
+_HEAP_MAX_STRONG_COUNT = 50000
+# ... or their estimated size exceeds this many bytes (can be overridden in init message)
+_HEAP_DEFAULT_SIZE_LIMIT = 256 * 1024 * 1024
+
+# NiceTracer keeps states for stepping back until their estimated size exceeds this many bytes
+# (can be overridden in init message) ...
+_STATE_LOG_DEFAULT_SIZE_LIMIT = 128 * 1024 * 1024
+# ... but always keeps this many latest states
+_STATE_LOG_MIN_COUNT = 10
+# Rough sizes for estimating memory usage of saved states
+_SAVED_STATE_BASE_SIZE = 200
+_EXPORTED_ITEM_SIZE = 200
+
+# Change this when NiceTracer's instrumentation changes, so that cached code doesn't get used
+_NICE_TRACER_VERSION = 1
+_INSTRUMENTED_CODE_CACHE_DIR = os.path.join(thonny.THONNY_USER_DIR, "instrumented_code_cache")
+# Least recently used entries get removed when the cache has more files
+_INSTRUMENTED_CODE_CACHE_MAX_FILES = 500
+
+# Line events can be turned off per frame since Python 3.7
+_FRAME_HAS_TRACE_LINES = sys.version_info >= (3, 7)
+
 TempFrameInfo = namedtuple(
     "TempFrameInfo",
     [
@@ -80,11 +134,457 @@ TempFrameInfo = namedtuple(
 _vm = None
 
 
+class ProgramOutputBuffer:
+    """Combines consecutive writes of program output into fewer ProgramOutput messages.
+
+    Buffered output gets written when output goes to another stream, when enough of it
+    has accumulated, soon after the first buffered write and before any other message.
+    """
+
+    def __init__(
+        self, write_message, flush_size=_OUTPUT_FLUSH_SIZE, flush_interval=_OUTPUT_FLUSH_INTERVAL
+    ):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._write_message = write_message
+        self._lock = RLock()
+        self._parts = []
+        self._size = 0
+        self._stream_name = None
+        self._start_time = None
+        self._flush_request = Event()
+
+    def start_periodic_flushing(self):
+        Thread(target=self._flush_periodically, daemon=True).start()
+
+    def add(self, stream_name, data):
+        with self._lock:
+            if stream_name != self._stream_name:
+                # keep the order of interleaved stdout and stderr writes
+                self.flush()
+                self._stream_name = stream_name
+
+            if not self._parts:
+                self._start_time = time.time()
+                self._flush_request.set()
+
+            self._parts.append(data)
+            self._size += len(data)
+
+            if self._size >= self.flush_size or (
+                "\n" in data and time.time() - self._start_time >= self.flush_interval
+            ):
+                self.flush()
+
+    def flush(self):
+        with self._lock:
+            if not self._parts:
+                return
+
+            data = "".join(self._parts)
+            self._parts = []
+            self._size = 0
+            self._write_message(
+                BackendEvent(
+                    "ProgramOutput", stream_name=self._stream_name, data=data, cwd=os.getcwd()
+                )
+            )
+
+    def write_message(self, msg):
+        with self._lock:
+            # all buffered output must reach the frontend before any other message
+            # (input requests, debugger pauses, ToplevelResponse-s, ...)
+            self.flush()
+            self._write_message(msg)
+
+    def _flush_periodically(self):
+        # Makes sure output without newlines (or without further writes) doesn't get stuck
+        while True:
+            self._flush_request.wait()
+            self._flush_request.clear()
+            time.sleep(self.flush_interval)
+            self.flush()
+
+
+class ObjectHeap:
+    """Keeps exported values available for later requests (eg. from object inspector).
+
+    Recently exported values are kept with strong references. When their number or
+    estimated total size exceeds the limits, least recently used ones are evicted.
+    Evicted values, which allow weak references, remain available as long as
+    the program keeps them alive. Values pinned by the frontend (ie. the ones it
+    currently displays) don't get evicted.
+    """
+
+    def __init__(self, size_limit=_HEAP_DEFAULT_SIZE_LIMIT, count_limit=_HEAP_MAX_STRONG_COUNT):
+        self.size_limit = size_limit
+        self.count_limit = count_limit
+        self._strong = OrderedDict()  # id => (value, estimated size), least recently used first
+        self._strong_size = 0
+        self._weak = {}  # id => weakref
+        self._pins = {}  # owner => set of id-s
+        self._pinned_ids = set()
+        self._demotion_count = 0
+        self._eviction_count = 0
+        # changes when a value becomes available or unavailable
+        self.version = 0
+        self._orders = {}  # (type filter, sort key) => sorted ids
+        self._orders_version = None
+
+    def add(self, value):
+        key = id(value)
+        if key in self._strong:
+            # strong reference guarantees that the id hasn't been reused
+            self._strong.move_to_end(key)
+            return
+
+        # weak entry (if any) either refers to same value or is about to be removed
+        ref = self._weak.pop(key, None)
+        if ref is None or ref() is not value:
+            self.version += 1
+
+        size = self._estimate_size(value)
+        self._strong[key] = (value, size)
+        self._strong_size += size
+        self._evict()
+
+    def get(self, key):
+        """Returns the value with given id or raises KeyError"""
+        if key in self._strong:
+            self._strong.move_to_end(key)
+            return self._strong[key][0]
+
+        value = self._weak[key]()
+        if value is None:
+            raise KeyError(key)
+
+        self.add(value)
+        return value
+
+    def __contains__(self, key):
+        if key in self._strong:
+            return True
+
+        ref = self._weak.get(key)
+        return ref is not None and ref() is not None
+
+    def items(self):
+        """Returns a list of (id, value) pairs of all available values"""
+        result = [(key, entry[0]) for key, entry in self._strong.items()]
+        for key, ref in list(self._weak.items()):
+            value = ref()
+            if value is not None:
+                result.append((key, value))
+        return result
+
+    def get_sorted_ids(self, type_filter=None, sort_by="id"):
+        """Returns ids of available values (optionally only the ones with matching type name)
+        in given order.
+
+        Paging through a large heap doesn't need sorting it for every page, therefore
+        the order is reused until the set of available values changes"""
+        if self._orders_version != self.version:
+            self._orders = {}
+            self._orders_version = self.version
+
+        order_key = (type_filter, sort_by)
+        if order_key not in self._orders:
+            items = self.items()
+            if type_filter:
+                items = [
+                    item for item in items if type_filter.lower() in type(item[1]).__name__.lower()
+                ]
+
+            if sort_by == "type":
+                items.sort(key=lambda item: (type(item[1]).__name__, item[0]))
+            elif sort_by == "size":
+                items.sort(key=lambda item: (self.get_size(*item), item[0]))
+            else:
+                assert sort_by == "id"
+                items.sort(key=lambda item: item[0])
+
+            self._orders[order_key] = [item[0] for item in items]
+
+        return self._orders[order_key]
+
+    def set_pinned(self, owner, ids):
+        if ids:
+            self._pins[owner] = set(ids)
+        else:
+            self._pins.pop(owner, None)
+        self._pinned_ids = set().union(*self._pins.values())
+
+        # pinned values need to be kept with strong references
+        for key in self._pinned_ids:
+            if key not in self._strong and key in self._weak:
+                try:
+                    self.get(key)
+                except KeyError:
+                    pass
+
+    def get_stats(self):
+        return {
+            "strong_count": len(self._strong),
+            "strong_size": self._strong_size,
+            "weak_count": len(self._weak),
+            "pinned_count": len(self._pinned_ids),
+            "size_limit": self.size_limit,
+            "count_limit": self.count_limit,
+            "demotion_count": self._demotion_count,
+            "eviction_count": self._eviction_count,
+        }
+
+    def _evict(self):
+        skipped = 0
+        while (
+            len(self._strong) > self.count_limit or self._strong_size > self.size_limit
+        ) and skipped < len(self._strong):
+            key, (value, size) = next(iter(self._strong.items()))
+            if key in self._pinned_ids:
+                self._strong.move_to_end(key)
+                skipped += 1
+                continue
+
+            del self._strong[key]
+            self._strong_size -= size
+            try:
+                self._weak[key] = weakref.ref(value, functools.partial(self._remove_weak, key))
+                self._demotion_count += 1
+            except TypeError:
+                self._eviction_count += 1
+                self.version += 1
+
+    def _remove_weak(self, key, ref):
+        # may be called in any thread
+        if self._weak.get(key) is ref:
+            self._weak.pop(key, None)
+            self.version += 1
+
+    def get_size(self, key, value):
+        """Returns estimated size of given value in the heap"""
+        if key in self._strong:
+            return self._strong[key][1]
+        else:
+            return self._estimate_size(value)
+
+    def _estimate_size(self, value):
+        # shallow size, but numpy arrays (owning their data) include the data buffer
+        try:
+            return sys.getsizeof(value)
+        except Exception:
+            return 0
+
+
+class SavedState:
+    """Program state at one NiceTracer event.
+
+    Consecutive states in same frame share the stack and differ only
+    by active_frame (None means that the newest frame of the stack is active)
+    """
+
+    __slots__ = (
+        "stack",
+        "active_frame",
+        "in_client_log",
+        "io_symbol_count",
+        "exception_value",
+        "fresh_exception_id",
+        "exception_info",
+        "size",
+    )
+
+    def __init__(
+        self,
+        stack,
+        active_frame,
+        io_symbol_count,
+        exception_value,
+        fresh_exception_id,
+        exception_info,
+        size,
+    ):
+        self.stack = stack
+        self.active_frame = active_frame
+        self.in_client_log = False
+        self.io_symbol_count = io_symbol_count
+        self.exception_value = exception_value
+        self.fresh_exception_id = fresh_exception_id
+        self.exception_info = exception_info
+        self.size = size
+
+    def get_active_frame(self):
+        if self.active_frame is None:
+            return self.stack[-1]
+        else:
+            return self.active_frame
+
+
+class StateLog:
+    """Saved states of NiceTracer, indexed from the start of the program.
+
+    When estimated total size of the states exceeds the limit, oldest states get
+    dropped and first_index tells which is the oldest state still available.
+    """
+
+    def __init__(self, size_limit=_STATE_LOG_DEFAULT_SIZE_LIMIT, min_count=_STATE_LOG_MIN_COUNT):
+        self.size_limit = size_limit
+        self.min_count = min_count
+        self.first_index = 0
+        self._states = []
+        # states before this position in _states have been dropped
+        self._start = 0
+        self._total_size = 0
+
+    def __len__(self):
+        return self.first_index + len(self._states) - self._start
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+
+        if index < self.first_index:
+            raise IndexError("State %d has been dropped" % index)
+
+        return self._states[self._start + index - self.first_index]
+
+    def append(self, state):
+        self._states.append(state)
+        self._total_size += state.size
+
+        while (
+            self._total_size > self.size_limit
+            and len(self._states) - self._start > self.min_count
+        ):
+            self._total_size -= self._states[self._start].size
+            self._states[self._start] = None
+            self._start += 1
+            self.first_index += 1
+
+        # compact the list only occasionally, so that appending stays cheap
+        if self._start > 1000 and self._start > len(self._states) // 2:
+            del self._states[: self._start]
+            self._start = 0
+
+    def get_stats(self):
+        return {
+            "count": len(self) - self.first_index,
+            "first_index": self.first_index,
+            "total_size": self._total_size,
+            "size_limit": self.size_limit,
+        }
+
+
+class InstrumentedCodeCache:
+    """Keeps code objects instrumented by NiceTracer together with the tables of nodes
+    referred to by marker calls, so that unchanged modules don't need to be parsed
+    and instrumented again in next debugging sessions.
+
+    Entries are keyed by the source, file name, compilation mode, Python version
+    and tracer version.
+    """
+
+    def __init__(
+        self, directory=_INSTRUMENTED_CODE_CACHE_DIR, max_files=_INSTRUMENTED_CODE_CACHE_MAX_FILES
+    ):
+        self.directory = directory
+        self.max_files = max_files
+
+    def get_key(self, source, filename, mode, variant=""):
+        if isinstance(source, str):
+            source = source.encode("utf-8")
+
+        digest = hashlib.sha1()
+        for part in [
+            "%s %s" % (_NICE_TRACER_VERSION, thonny.get_version()),
+            sys.version,
+            sys.implementation.cache_tag or "",
+            filename,
+            mode,
+            variant,
+        ]:
+            digest.update(part.encode("utf-8") + b"\0")
+        digest.update(source)
+        return digest.hexdigest()
+
+    def load(self, key):
+        """Returns (code, node table) or None if the cache doesn't have this entry"""
+        path = self._get_path(key)
+        try:
+            with open(path, "rb") as fp:
+                entry = marshal.load(fp)
+            # mark as recently used
+            os.utime(path)
+            return entry
+        except FileNotFoundError:
+            return None
+        except Exception:
+            logger.exception("Could not load instrumented code from %s", path)
+            return None
+
+    def save(self, key, code, node_table):
+        path = self._get_path(key)
+        temp_path = "%s.%d.tmp" % (path, os.getpid())
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(temp_path, "wb") as fp:
+                marshal.dump((code, node_table), fp)
+            os.replace(temp_path, path)
+            self._remove_old_entries()
+        except Exception:
+            logger.exception("Could not save instrumented code to %s", path)
+
+    def _get_path(self, key):
+        return os.path.join(self.directory, key + ".bin")
+
+    def _remove_old_entries(self):
+        with os.scandir(self.directory) as it:
+            entries = [entry for entry in it if entry.name.endswith(".bin")]
+
+        if len(entries) <= self.max_files:
+            return
+
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[: len(entries) - self.max_files]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+
+class CachedNode:
+    """Stands for an AST node of instrumented code loaded from InstrumentedCodeCache"""
+
+    __slots__ = ("lineno", "col_offset", "end_lineno", "end_col_offset", "tags", "parent_node")
+
+
+class LazyUnit:
+    """Outermost function (or method) of a lazily instrumented module,
+    which gets fully instrumented when one of its code objects is needed"""
+
+    __slots__ = ("node", "class_nodes", "first_lineno", "last_lineno", "code", "cheap_code")
+
+    def __init__(self, node, class_nodes):
+        self.node = node
+        self.class_nodes = class_nodes
+        self.first_lineno = min([node.lineno] + [d.lineno for d in node.decorator_list])
+        self.last_lineno = node.end_lineno
+        self.code = None
+        self.cheap_code = None
+
+
 class VM:
-    def __init__(self):
+    def __init__(self, message_socket=None, startup_phases=None):
+        """If message_socket is given, then commands and messages go through it
+        and stdin/stdout are left for the program.
+        
+        startup_phases lists (name, start time) of the phases before creating the VM
+        """
         global _vm
         _vm = self
 
+        self._startup_phases = list(startup_phases or [])
+        self._start_startup_phase("vm setup")
+
         self._ini = None
         self._command_handlers = {}
         self._object_info_tweakers = []
@@ -93,17 +593,48 @@ class VM:
         self._source_preprocessors = []
         self._ast_postprocessors = []
         self._main_dir = os.path.dirname(sys.modules["thonny"].__file__)
-        self._heap = {}  # WeakValueDictionary would be better, but can't store reference to None
+        self._heap = ObjectHeap()
+        self._state_log_size_limit = _STATE_LOG_DEFAULT_SIZE_LIMIT
         self._source_info_by_frame = {}
+        self._announced_source_hashes = set()
         site.sethelper()  # otherwise help function is not available
         pydoc.pager = pydoc.plainpager  # otherwise help command plays tricks
+        self._start_startup_phase("fake streams")
         self._install_fake_streams()
+        if message_socket is None:
+            self._command_stream = self._original_stdin.buffer
+            self._message_stream = self._original_stdout.buffer
+        else:
+            self._command_stream = message_socket.makefile("rb")
+            self._message_stream = message_socket.makefile("wb")
         self._current_executor = None
         self._io_level = 0
         self._tty_mode = True
+        self._protocol = "text"
+        self._output_buffering = False
+        self._output_buffer = ProgramOutputBuffer(self._write_message)
+        self._start_startup_phase("init message wait")
+        # held while handling a command, so that preloading happens only when backend is idle
+        self._lazy_shared_modules_lock = RLock()
+        self._lazy_shared_modules_loaded = False
 
         init_msg = self._fetch_command()
+        # frontend lists the protocols it understands, in the order of preference
+        if "binary" in init_msg.get("protocols", []):
+            self._protocol = "binary"
+
+        if init_msg.get("heap_size_limit") is not None:
+            self._heap.size_limit = init_msg["heap_size_limit"]
+
+        if init_msg.get("debugger_history_limit") is not None:
+            self._state_log_size_limit = init_msg["debugger_history_limit"]
+
+        if init_msg.get("output_buffering", False):
+            self._output_buffering = True
+            self._output_buffer.start_periodic_flushing()
+            self._install_exit_flushing()
 
+        self._start_startup_phase("environment cleanup")
         original_argv = sys.argv.copy()
         original_path = sys.path.copy()
 
@@ -123,9 +654,11 @@ class VM:
         __main__.__doc__ = None
 
         self._frontend_sys_path = init_msg["frontend_sys_path"]
+        self._start_startup_phase("shared modules")
         self._load_shared_modules()
         self._load_plugins()
 
+        startup_durations = self._get_startup_durations(init_msg.get("process_start_time"))
         self.send_message(
             ToplevelResponse(
                 main_dir=self._main_dir,
@@ -146,11 +679,17 @@ class VM:
                 ),
                 python_version=_get_python_version_string(),
                 cwd=os.getcwd(),
+                protocol=self._protocol,
+                startup_phases=startup_durations,
             )
         )
+        logger.info("Startup phases: %s", format_startup_phases(startup_durations))
 
         self._install_signal_handler()
 
+        if init_msg.get("preload_shared_modules", False):
+            Thread(target=self._preload_lazy_shared_modules, daemon=True).start()
+
     def mainloop(self):
         try:
             while True:
@@ -158,12 +697,14 @@ class VM:
                     cmd = self._fetch_command()
                     if isinstance(cmd, InputSubmission):
                         self._input_queue.put(cmd)
-                    elif isinstance(cmd, ToplevelCommand):
-                        self._source_info_by_frame = {}
-                        self._input_queue = queue.Queue()
-                        self.handle_command(cmd)
                     else:
-                        self.handle_command(cmd)
+                        if isinstance(cmd, ToplevelCommand):
+                            self._source_info_by_frame = {}
+                            self._announced_source_hashes = set()
+                            self._input_queue = queue.Queue()
+
+                        with self._lazy_shared_modules_lock:
+                            self.handle_command(cmd)
                 except KeyboardInterrupt:
                     logger.exception("Interrupt in mainloop")
                     # Interrupt must always result in waiting_toplevel_command state
@@ -322,40 +863,30 @@ class VM:
         return module
 
     def _load_shared_modules(self):
-        self.load_modules_with_frontend_path(["parso", "jedi", "thonnycontrib", "six", "asttokens"])
+        self.load_modules_with_frontend_path(_EAGER_SHARED_MODULE_NAMES)
+
+    def load_lazy_shared_modules(self):
+        """Makes sure jedi, parso and asttokens are imported (if available)"""
+        with self._lazy_shared_modules_lock:
+            if not self._lazy_shared_modules_loaded:
+                self.load_modules_with_frontend_path(_LAZY_SHARED_MODULE_NAMES)
+                self._lazy_shared_modules_loaded = True
+
+    def _preload_lazy_shared_modules(self):
+        # Let the first commands (eg. Run) go before
+        time.sleep(_IDLE_PRELOAD_DELAY)
+        try:
+            self.load_lazy_shared_modules()
+        except Exception:
+            logger.exception("Could not preload shared modules")
 
     def load_modules_with_frontend_path(self, names):
-        from importlib import import_module
-
-        original_sys_path = sys.path
-        try:
-            sys.path = sys.path + self._frontend_sys_path
-            for name in names:
-                try:
-                    import_module(name)
-                except ImportError:
-                    pass
-        finally:
-            sys.path = original_sys_path
+        _import_with_extra_path(names, self._frontend_sys_path)
 
     def _load_plugins(self):
-        # built-in plugins
-        import thonny.plugins.backend  # pylint: disable=redefined-outer-name
-
-        self._load_plugins_from_path(thonny.plugins.backend.__path__, "thonny.plugins.backend.")
-
-        # 3rd party plugins from namespace package
-        try:
-            import thonnycontrib.backend  # @UnresolvedImport
-        except ImportError:
-            # No 3rd party plugins installed
-            pass
-        else:
-            self._load_plugins_from_path(thonnycontrib.backend.__path__, "thonnycontrib.backend.")
-
-    def _load_plugins_from_path(self, path, prefix):
         load_function_name = "load_plugin"
-        for _, module_name, _ in sorted(pkgutil.iter_modules(path, prefix), key=lambda x: x[1]):
+        for module_name in _find_plugin_module_names():
+            self._start_startup_phase("plugin " + module_name)
             try:
                 m = importlib.import_module(module_name)
                 if hasattr(m, load_function_name):
@@ -368,6 +899,25 @@ class VM:
             except Exception:
                 logger.exception("Failed loading plugin '" + module_name + "'")
 
+    def _start_startup_phase(self, name):
+        self._startup_phases.append((name, time.time()))
+
+    def _get_startup_durations(self, process_start_time):
+        """Returns (name, seconds) for each startup phase. 
+        
+        Time between starting the process (as measured by the frontend)
+        and the first phase is reported as interpreter start"""
+        end_time = time.time()
+        result = []
+        if process_start_time is not None:
+            result.append(("interpreter start", self._startup_phases[0][1] - process_start_time))
+
+        next_start_times = [start_time for _, start_time in self._startup_phases[1:]] + [end_time]
+        for (name, start_time), next_start_time in zip(self._startup_phases, next_start_times):
+            result.append((name, next_start_time - start_time))
+
+        return result
+
     def _install_signal_handler(self):
         def signal_handler(signal_, frame):
             raise KeyboardInterrupt("Execution interrupted")
@@ -397,7 +947,10 @@ class VM:
 
     def _cmd_FastDebug(self, cmd):
         self.switch_env_to_script_mode(cmd)
-        return self._execute_file(cmd, FastTracer)
+        if cmd.get("use_sys_monitoring", False) and MonitoringTracer.is_supported():
+            return self._execute_file(cmd, MonitoringTracer)
+        else:
+            return self._execute_file(cmd, FastTracer)
 
     def _cmd_Debug(self, cmd):
         self.switch_env_to_script_mode(cmd)
@@ -593,14 +1146,65 @@ class VM:
         raise RuntimeError("Frame '{0}' not found".format(cmd.frame_id))
 
     def _cmd_get_heap(self, cmd):
+        """Returns heap items in requested order, optionally only the ones with matching
+        type name and only requested page of them"""
+        type_filter = cmd.get("type_filter")
+        sort_by = cmd.get("sort_by", "id")
+        ids = self._heap.get_sorted_ids(type_filter, sort_by)
+        if cmd.get("reverse", False):
+            ids = ids[::-1]
+
+        offset = cmd.get("offset", 0)
+        limit = cmd.get("limit")
+        page = ids[offset:] if limit is None else ids[offset : offset + limit]
+
         result = {}
-        for key in self._heap:
-            result[key] = self.export_value(self._heap[key])
+        page_rows = []
+        for key in page:
+            try:
+                value = self._heap.get(key)
+            except KeyError:
+                # weakly referenced value disappeared after sorting
+                continue
 
-        return InlineResponse("get_heap", heap=result)
+            value_info = ValueInfo(key, self._get_value_repr(value, 100))
+            result[key] = value_info
+            page_rows.append(
+                {
+                    "id": key,
+                    "type_name": type(value).__name__,
+                    "size": self._heap.get_size(key, value),
+                    "value_info": value_info,
+                }
+            )
+
+        return InlineResponse(
+            "get_heap",
+            heap=result,
+            page=page_rows,
+            offset=offset,
+            total_count=len(ids),
+            sort_by=sort_by,
+            reverse=cmd.get("reverse", False),
+            type_filter=cmd.get("type_filter"),
+            heap_stats=self._heap.get_stats(),
+        )
+
+    def _cmd_get_heap_stats(self, cmd):
+        return InlineResponse("get_heap_stats", heap_stats=self._heap.get_stats())
+
+    def _cmd_set_pinned_objects(self, cmd):
+        self._heap.set_pinned(cmd.owner, cmd.object_ids)
+        return False
+
+    def _cmd_resend_debugger_response(self, cmd):
+        if isinstance(self._current_executor, Tracer):
+            self._current_executor.resend_debugger_response()
+        return False
 
     def _cmd_shell_autocomplete(self, cmd):
         error = None
+        self.load_lazy_shared_modules()
         try:
             import jedi
         except ImportError:
@@ -621,6 +1225,7 @@ class VM:
 
     def _cmd_editor_autocomplete(self, cmd):
         error = None
+        self.load_lazy_shared_modules()
         try:
             import jedi
 
@@ -685,7 +1290,7 @@ class VM:
             info = {"id": cmd.object_id, "error": "past info not available"}
 
         elif cmd.object_id in self._heap:
-            value = self._heap[cmd.object_id]
+            value = self._heap.get(cmd.object_id)
             attributes = {}
             if cmd.include_attributes:
                 for name in dir(value):
@@ -696,10 +1301,13 @@ class VM:
                         except Exception:
                             pass
 
-            self._heap[id(type(value))] = type(value)
+            self._heap.add(type(value))
             info = {
                 "id": cmd.object_id,
-                "repr": repr(value),
+                # elements of containers are shown separately
+                "repr": self._get_value_repr(value)
+                if isinstance(value, (list, tuple, set, frozenset, dict))
+                else repr(value),
                 "type": str(type(value)),
                 "full_type_name": str(type(value))
                 .replace("<class '", "")
@@ -723,9 +1331,13 @@ class VM:
             ):
                 self._add_function_info(value, info)
             elif isinstance(value, (list, tuple, set)):
-                self._add_elements_info(value, info)
+                self._add_elements_info(
+                    value, info, cmd.get("elements_offset", 0), cmd.get("elements_limit")
+                )
             elif isinstance(value, dict):
-                self._add_entries_info(value, info)
+                self._add_entries_info(
+                    value, info, cmd.get("elements_offset", 0), cmd.get("elements_limit")
+                )
             elif hasattr(value, "image_data"):
                 info["image_data"] = value.image_data
 
@@ -788,15 +1400,36 @@ class VM:
         except Exception:
             pass
 
-    def _add_elements_info(self, value, info):
-        info["elements"] = []
-        for element in value:
-            info["elements"].append(self.export_value(element))
+    def _add_elements_info(self, value, info, offset=0, limit=None):
+        info["length"] = len(value)
+        info["elements_offset"] = offset
+        info["elements"] = [
+            self.export_value(element) for element in _get_element_page(value, offset, limit)
+        ]
+
+    def _add_entries_info(self, value, info, offset=0, limit=None):
+        info["length"] = len(value)
+        info["elements_offset"] = offset
+        info["entries"] = [
+            (self.export_value(key), self.export_value(item))
+            for key, item in _get_element_page(value, offset, limit)
+        ]
+
+    def _cmd_get_object_elements(self, cmd):
+        """Returns a page of elements (or dict entries) of given object"""
+        if isinstance(self._current_executor, NiceTracer) and self._current_executor.is_in_past():
+            info = {"error": "past info not available"}
+        elif cmd.object_id in self._heap:
+            value = self._heap.get(cmd.object_id)
+            info = {}
+            if isinstance(value, dict):
+                self._add_entries_info(value, info, cmd.offset, cmd.limit)
+            else:
+                self._add_elements_info(value, info, cmd.offset, cmd.limit)
+        else:
+            info = {"error": "object info not available"}
 
-    def _add_entries_info(self, value, info):
-        info["entries"] = []
-        for key in value:
-            info["entries"].append((self.export_value(key), self.export_value(value[key])))
+        return InlineResponse("get_object_elements", object_id=cmd.object_id, **info)
 
     def _execute_file(self, cmd, executor_class):
         # args are accepted only in Run and Debug,
@@ -863,12 +1496,23 @@ class VM:
         builtins.__import__ = self._original_import
 
     def _fetch_command(self):
-        line = self._original_stdin.readline()
-        if line == "":
-            logger.info("Read stdin EOF")
-            sys.exit()
-        cmd = parse_message(line)
-        return cmd
+        # Frontend may use either protocol, independent of the one used for sending.
+        # The first byte tells which one is used for this message
+        stream = self._command_stream
+        start = stream.read(1)
+        if start == BINARY_FRAME_MARKER:
+            size = parse_binary_frame_header(start + stream.read(BINARY_FRAME_HEADER_SIZE - 1))
+            payload = stream.read(size)
+            if len(payload) < size:
+                logger.info("Read command stream EOF")
+                sys.exit()
+            return parse_binary_message(payload)
+        else:
+            line = start + stream.readline()
+            if not line.endswith(b"\n"):
+                logger.info("Read command stream EOF")
+                sys.exit()
+            return parse_message(line.decode("ASCII"))
 
     def send_message(self, msg):
         if "cwd" not in msg:
@@ -877,21 +1521,62 @@ class VM:
         if isinstance(msg, ToplevelResponse) and "globals" not in msg:
             msg["globals"] = self.export_globals()
 
-        self._original_stdout.write(serialize_message(msg) + "\n")
+        self._output_buffer.write_message(msg)
+
+    def _write_message(self, msg):
+        if self._protocol == "binary":
+            data = serialize_binary_message(msg)
+        else:
+            data = (serialize_message(msg) + "\n").encode("ASCII")
+
+        # text layer may contain output written around thonny
         self._original_stdout.flush()
+        self._message_stream.write(data)
+        self._message_stream.flush()
+
+    def send_program_output(self, stream_name, data):
+        if self._output_buffering:
+            self._output_buffer.add(stream_name, data)
+        else:
+            self.send_message(BackendEvent("ProgramOutput", stream_name=stream_name, data=data))
+
+    def flush_output(self):
+        self._output_buffer.flush()
+
+    def _install_exit_flushing(self):
+        """Makes sure buffered output doesn't get lost when the program exits
+        (hard crashes and kills can't be helped)"""
+        atexit.register(self._flush_output_at_exit)
+
+        original_exit = os._exit
+
+        def _exit(status):
+            self._flush_output_at_exit()
+            original_exit(status)
+
+        os._exit = _exit
+
+    def _flush_output_at_exit(self):
+        try:
+            self.flush_output()
+        except (OSError, ValueError):
+            # frontend may be gone already
+            pass
 
     def export_value(self, value, max_repr_length=5000):
-        self._heap[id(value)] = value
+        self._heap.add(value)
+        return ValueInfo(id(value), self._get_value_repr(value, max_repr_length))
+
+    def get_exported_value(self, object_id):
+        """Returns an exported value by its id or raises KeyError, if it's not available anymore"""
+        return self._heap.get(object_id)
+
+    def _get_value_repr(self, value, max_repr_length=5000):
         try:
-            rep = repr(value)
+            return bounded_repr(value, max_repr_length)
         except Exception:
             # See https://bitbucket.org/plas/thonny/issues/584/problem-with-thonnys-back-end-obj-no
-            rep = "??? <repr error>"
-
-        if len(rep) > max_repr_length:
-            rep = rep[:max_repr_length] + "…"
-
-        return ValueInfo(id(value), rep)
+            return "??? <repr error>"
 
     def export_variables(self, variables):
         result = {}
@@ -929,7 +1614,9 @@ class VM:
             code_name = system_frame.f_code.co_name
 
             if not relevance_checker or relevance_checker(system_frame):
-                source, firstlineno, in_library = self._get_frame_source_info(system_frame)
+                source, source_hash, firstlineno, in_library = self._get_frame_source_info(
+                    system_frame
+                )
 
                 result.insert(
                     0,
@@ -948,6 +1635,7 @@ class VM:
                         globals=self.export_variables(system_frame.f_globals),
                         freevars=system_frame.f_code.co_freevars,
                         source=source,
+                        source_hash=source_hash,
                         lineno=system_frame.f_lineno,
                         firstlineno=firstlineno,
                         in_library=in_library,
@@ -1001,10 +1689,28 @@ class VM:
     def _get_frame_source_info(self, frame):
         fid = id(frame)
         if fid not in self._source_info_by_frame:
-            self._source_info_by_frame[fid] = _fetch_frame_source_info(frame)
+            source, firstlineno, in_library = _fetch_frame_source_info(frame)
+            if source is None:
+                source_hash = None
+            else:
+                source_hash = hashlib.sha1(source.encode("utf-8", "surrogatepass")).hexdigest()
+            self._source_info_by_frame[fid] = (source, source_hash, firstlineno, in_library)
 
         return self._source_info_by_frame[fid]
 
+    def _announce_source(self, filename, source_hash, source):
+        """Sends the source to the frontend, unless it has been sent during
+        current toplevel command already"""
+        if source_hash is None or source_hash in self._announced_source_hashes:
+            return
+
+        self.send_message(
+            BackendEvent(
+                "SourceAnnouncement", filename=filename, source_hash=source_hash, source=source
+            )
+        )
+        self._announced_source_hashes.add(source_hash)
+
     def _prepare_user_exception(self):
         e_type, e_value, e_traceback = sys.exc_info()
         sys.last_type, sys.last_value, sys.last_traceback = (e_type, e_value, e_traceback)
@@ -1072,13 +1778,15 @@ class VM:
                     data = data.decode(errors="replace")
 
                 if data != "":
-                    self._vm.send_message(
-                        BackendEvent("ProgramOutput", stream_name=self._stream_name, data=data)
-                    )
+                    self._vm.send_program_output(self._stream_name, data)
                     self._processed_symbol_count += len(data)
             finally:
                 self._vm._exit_io_function()
 
+        def flush(self):
+            self._vm.flush_output()
+            self._target_stream.flush()
+
         def writelines(self, lines):
             try:
                 self._vm._enter_io_function()
@@ -1180,17 +1888,13 @@ class Executor:
                 root = self._prepare_ast(source, filename, "exec")
                 statements = compile(ast.Module(body=root.body[:-1]), filename, "exec")
                 expression = compile(ast.Expression(root.body[-1].value), filename, "eval")
+            elif mode == "eval":
+                assert not ast_postprocessors
+                expression = compile(self._prepare_ast(source, filename, mode), filename, mode)
+            elif mode == "exec":
+                statements = self._compile_statements(source, filename, ast_postprocessors)
             else:
-                root = self._prepare_ast(source, filename, mode)
-                if mode == "eval":
-                    assert not ast_postprocessors
-                    expression = compile(root, filename, mode)
-                elif mode == "exec":
-                    for func in ast_postprocessors:
-                        func(root)
-                    statements = compile(root, filename, mode)
-                else:
-                    raise ValueError("Unknown mode")
+                raise ValueError("Unknown mode")
 
             return self._execute_prepared_user_code(statements, expression, global_vars)
         except SyntaxError:
@@ -1219,6 +1923,12 @@ class Executor:
     def _prepare_ast(self, source, filename, mode):
         return ast.parse(source, filename, mode)
 
+    def _compile_statements(self, source, filename, ast_postprocessors):
+        root = self._prepare_ast(source, filename, "exec")
+        for func in ast_postprocessors:
+            func(root)
+        return compile(root, filename, "exec")
+
 
 class SimpleRunner(Executor):
     pass
@@ -1230,6 +1940,9 @@ class Tracer(Executor):
         self._thonny_src_dir = os.path.dirname(sys.modules["thonny"].__file__)
         self._fresh_exception = None
         self._reported_frame_ids = set()
+        self._last_sent_stack = None
+        self._last_sent_state_id = None
+        self._last_sent_response = None
 
         # first (automatic) stepping command depends on whether any breakpoints were set or not
         breakpoints = self._original_cmd.breakpoints
@@ -1279,10 +1992,11 @@ class Tracer(Executor):
         )
 
     def _is_interesting_frame(self, frame):
+        return self._is_interesting_code(frame.f_code) and not self._vm.is_doing_io()
+
+    def _is_interesting_code(self, code):
         # For some reason Pylint doesn't see inspect.CO_GENERATOR and such
         # pylint: disable=no-member
-        code = frame.f_code
-
         return not (
             code is None
             or code.co_filename is None
@@ -1295,7 +2009,6 @@ class Tracer(Executor):
             or sys.version_info >= (3, 6)
             and code.co_flags & inspect.CO_ASYNC_GENERATOR  # @UndefinedVariable
             or "importlib._bootstrap" in code.co_filename
-            or self._vm.is_doing_io()
             or path_startswith(code.co_filename, self._thonny_src_dir)
         )
 
@@ -1376,6 +2089,47 @@ class Tracer(Executor):
     def _breakpointhook(self, *args, **kw):
         pass
 
+    def _send_debugger_response(self, msg):
+        """Sends only the changes compared to the previous state,
+        if the frontend has confirmed that it knows the previous state.
+        
+        Sources are announced separately and frames refer to them by source_hash"""
+        stack = []
+        for frame in msg["stack"]:
+            if frame.source_hash is not None:
+                self._vm._announce_source(frame.filename, frame.source_hash, frame.source)
+                frame = frame._replace(source=None)
+            stack.append(frame)
+
+        msg["stack"] = stack
+        state_id = 0 if self._last_sent_state_id is None else self._last_sent_state_id + 1
+
+        if (
+            self._last_sent_stack is not None
+            and self._current_command.get("acknowledged_state_id") == self._last_sent_state_id
+        ):
+            msg["stack"] = create_stack_delta(self._last_sent_stack, stack)
+            msg["stack_delta_base"] = self._last_sent_state_id
+
+        msg["state_id"] = state_id
+        self._last_sent_stack = stack
+        self._last_sent_state_id = state_id
+        self._last_sent_response = msg
+
+        self._vm.send_message(msg)
+
+    def resend_debugger_response(self):
+        """Sends last response again with full stack, for the frontend which
+        couldn't apply the delta"""
+        msg = self._last_sent_response
+        if msg is None:
+            return
+
+        if "stack_delta_base" in msg:
+            del msg["stack_delta_base"]
+        msg["stack"] = self._last_sent_stack
+        self._vm.send_message(msg)
+
     def _check_notify_return(self, frame_id):
         if frame_id in self._reported_frame_ids:
             # Need extra notification, because it may be long time until next interesting event
@@ -1390,52 +2144,149 @@ class Tracer(Executor):
 
 
 class FastTracer(Tracer):
+    """Stops at lines with the help of sys.settrace. Only the frames, which may need to stop
+    under current command get traced and they get line events only when needed,
+    so that "Resume" to a breakpoint runs almost at full speed."""
+
     def __init__(self, vm, original_cmd):
         super().__init__(vm, original_cmd)
 
         self._alive_frame_ids = set()
+        self._start_command(self._current_command, None)
 
     def _breakpointhook(self, *args, **kw):
         frame = inspect.currentframe()
         while not self._is_interesting_frame(frame):
             frame = frame.f_back
         self._report_current_state(frame)
-        self._current_command = self._fetch_next_debugger_command()
+        self._start_command(self._fetch_next_debugger_command(), frame)
+
+    def _start_command(self, cmd, frame):
+        """Prepares for running until the completion of given command.
+        Frame is the one, which was reported last (if any)"""
+        self._current_command = cmd
+        # handler is looked up once per command instead of every line
+        self._completion_check = getattr(self, "_cmd_%s_completed" % cmd.name)
+        if cmd.name == "run_to_cursor":
+            self._effective_breakpoints = self._get_breakpoints_with_cursor_position(cmd)
+        else:
+            self._effective_breakpoints = cmd.breakpoints
+        self._code_breakpoints = {}  # id(code) => (code, line numbers or None)
+
+        self._prepare_stack_frames(frame)
+
+    def _prepare_stack_frames(self, frame):
+        """Makes sure that frames on the stack get the events needed by current command"""
+        for frame, needs_lines in self._get_stack_frames(frame):
+            if frame.f_trace is None:
+                # the frame was skipped at call event, but now it may need to stop
+                frame.f_trace = self._trace
+            self._alive_frame_ids.add(id(frame))
+
+            if _FRAME_HAS_TRACE_LINES:
+                frame.f_trace_lines = needs_lines
+
+    def _get_stack_frames(self, frame):
+        """Returns interesting frames of the stack (newest first), each paired with the flag
+        telling whether current command needs line events in this frame"""
+        frames = []
+        while frame is not None:
+            if self._is_interesting_frame(frame):
+                frames.append(frame)
+            frame = frame.f_back
+
+        cmd = self._current_command
+        frame_ids = [id(frame) for frame in frames]
+        if cmd.frame_id in frame_ids:
+            cmd_frame_index = frame_ids.index(cmd.frame_id)
+        else:
+            # step_over and step_out complete at next line of any frame
+            cmd_frame_index = -1
+
+        return [
+            (
+                frame,
+                bool(
+                    cmd.name == "step_into"
+                    or self._get_code_breakpoints(frame.f_code)
+                    or cmd.name == "step_over"
+                    and i >= cmd_frame_index
+                    or cmd.name == "step_out"
+                    and (i > cmd_frame_index or cmd_frame_index == -1)
+                ),
+            )
+            for i, frame in enumerate(frames)
+        ]
+
+    def _new_frame_needs_lines(self, breakpoint_lines):
+        cmd = self._current_command
+        return bool(
+            cmd.name == "step_into"
+            or breakpoint_lines
+            or cmd.name in ("step_over", "step_out")
+            and cmd.frame_id not in self._alive_frame_ids
+        )
+
+    def _get_code_breakpoints(self, code):
+        """Returns the lines of the code object, where current command needs to stop,
+        or None if the code is not interesting"""
+        entry = self._code_breakpoints.get(id(code))
+        if entry is None:
+            if not self._is_interesting_code(code):
+                lines = None
+            elif code.co_filename in self._effective_breakpoints:
+                file_lines = self._effective_breakpoints[code.co_filename]
+                lines = {
+                    lineno for _, lineno in dis.findlinestarts(code) if lineno in file_lines
+                }
+            else:
+                lines = set()
+            # code is kept in the entry so that its id doesn't get reused
+            entry = (code, lines)
+            self._code_breakpoints[id(code)] = entry
+
+        return entry[1]
 
     def _trace(self, frame, event, arg):
-        if self._should_skip_frame(frame, event):
-            return None
+        cmd = self._current_command
 
         if event == "call":
-            self._check_store_main_frame_id(frame)
+            breakpoint_lines = self._get_code_breakpoints(frame.f_code)
+            if breakpoint_lines is None or self._vm.is_doing_io():
+                return None
 
+            self._check_store_main_frame_id(frame)
             self._fresh_exception = None
-            # can we skip this frame?
-            if self._current_command.name == "step_over" and not self._current_command.breakpoints:
+
+            needs_lines = self._new_frame_needs_lines(breakpoint_lines)
+            if not needs_lines and id(frame) != cmd.frame_id:
+                # Frame can't complete current command
                 return None
-            else:
-                self._alive_frame_ids.add(id(frame))
 
-        elif event == "return":
+            self._alive_frame_ids.add(id(frame))
+            if _FRAME_HAS_TRACE_LINES:
+                frame.f_trace_lines = needs_lines
+
+        elif event == "line":
             self._fresh_exception = None
-            self._alive_frame_ids.remove(id(frame))
-            self._check_notify_return(id(frame))
 
-        elif event == "exception":
-            self._fresh_exception = arg
-            self._register_affected_frame(arg[1], frame)
-            if self._is_interesting_exception(frame):
-                # UI doesn't know about separate exception events
+            if self._completion_check(frame, cmd):
                 self._report_current_state(frame)
-                self._current_command = self._fetch_next_debugger_command()
+                self._start_command(self._fetch_next_debugger_command(), frame)
 
-        elif event == "line":
+        elif event == "return":
             self._fresh_exception = None
+            self._alive_frame_ids.discard(id(frame))
+            self._check_notify_return(id(frame))
 
-            handler = getattr(self, "_cmd_%s_completed" % self._current_command.name)
-            if handler(frame, self._current_command):
-                self._report_current_state(frame)
-                self._current_command = self._fetch_next_debugger_command()
+        elif event == "exception":
+            if not self._should_skip_frame(frame, event):
+                self._fresh_exception = arg
+                self._register_affected_frame(arg[1], frame)
+                if self._is_interesting_exception(frame):
+                    # UI doesn't know about separate exception events
+                    self._report_current_state(frame)
+                    self._start_command(self._fetch_next_debugger_command(), frame)
 
         else:
             self._fresh_exception = None
@@ -1449,12 +2300,12 @@ class FastTracer(Tracer):
             in_present=True,
             io_symbol_count=None,
             exception_info=self._export_exception_info(),
-            tracer_class="FastTracer",
+            tracer_class=type(self).__name__,
         )
 
         self._reported_frame_ids.update(map(lambda f: f.id, stack))
 
-        self._vm.send_message(msg)
+        self._send_debugger_response(msg)
 
     def _cmd_step_into_completed(self, frame, cmd):
         return True
@@ -1474,33 +2325,221 @@ class FastTracer(Tracer):
         return self._at_a_breakpoint(frame, cmd)
 
     def _cmd_run_to_cursor_completed(self, frame, cmd):
-        return self._at_a_breakpoint(frame, cmd, self._get_breakpoints_with_cursor_position(cmd))
+        return self._at_a_breakpoint(frame, cmd)
 
-    def _at_a_breakpoint(self, frame, cmd, breakpoints=None):
+    def _at_a_breakpoint(self, frame, cmd):
         # TODO: try re-entering same line in loop
-        if breakpoints is None:
-            breakpoints = cmd.breakpoints
-
-        filename = frame.f_code.co_filename
-        return filename in breakpoints and frame.f_lineno in breakpoints[filename]
+        return frame.f_lineno in (self._get_code_breakpoints(frame.f_code) or ())
 
     def _frame_is_alive(self, frame_id):
         return frame_id in self._alive_frame_ids
 
 
+class MonitoringTracer(FastTracer):
+    """Works like FastTracer, but gets its events via sys.monitoring (Python 3.12+),
+    which allows enabling line events only for the code objects where current command
+    may stop and disabling call events for the code objects which can't stop."""
+
+    @classmethod
+    def is_supported(cls):
+        return (
+            hasattr(sys, "monitoring")
+            and sys.monitoring.get_tool(sys.monitoring.DEBUGGER_ID) is None
+        )
+
+    def __init__(self, vm, original_cmd):
+        self._monitored_codes = {}  # id(code) => code with local events
+        self._thread_id = None
+        super().__init__(vm, original_cmd)
+
+    def _execute_prepared_user_code(self, statements, expression, global_vars):
+        monitoring = sys.monitoring
+        tool_id = monitoring.DEBUGGER_ID
+        events = monitoring.events
+        callbacks = {
+            events.PY_START: self._on_py_start,
+            events.PY_RETURN: self._on_py_return,
+            events.PY_UNWIND: self._on_py_return,
+            events.LINE: self._on_line,
+            events.RAISE: self._on_raise,
+        }
+
+        # unlike sys.settrace, sys.monitoring reports events of all threads
+        self._thread_id = get_ident()
+        monitoring.use_tool_id(tool_id, "Thonny")
+        try:
+            for event, callback in callbacks.items():
+                monitoring.register_callback(tool_id, event, callback)
+            self._set_global_events()
+            if hasattr(sys, "breakpointhook"):
+                old_breakpointhook = sys.breakpointhook
+                sys.breakpointhook = self._breakpointhook
+
+            return Executor._execute_prepared_user_code(
+                self, statements, expression, global_vars
+            )
+        finally:
+            monitoring.set_events(tool_id, 0)
+            self._clear_local_events()
+            for event in callbacks:
+                monitoring.register_callback(tool_id, event, None)
+            monitoring.free_tool_id(tool_id)
+            if hasattr(sys, "breakpointhook"):
+                sys.breakpointhook = old_breakpointhook
+
+    def _set_global_events(self, with_lines=False):
+        events = sys.monitoring.events
+        if self._current_command.name == "step_into":
+            with_lines = True
+        sys.monitoring.set_events(
+            sys.monitoring.DEBUGGER_ID,
+            events.PY_START | events.PY_UNWIND | events.RAISE | (events.LINE if with_lines else 0),
+        )
+
+    def _add_local_events(self, code, events):
+        monitoring = sys.monitoring
+        current_events = monitoring.get_local_events(monitoring.DEBUGGER_ID, code)
+        if current_events | events != current_events:
+            monitoring.set_local_events(monitoring.DEBUGGER_ID, code, current_events | events)
+            # keeps the code alive, so that its id doesn't get reused
+            self._monitored_codes[id(code)] = code
+
+    def _clear_local_events(self):
+        for code in self._monitored_codes.values():
+            sys.monitoring.set_local_events(sys.monitoring.DEBUGGER_ID, code, 0)
+        self._monitored_codes = {}
+
+    def _watch_frame(self, frame, needs_lines):
+        self._alive_frame_ids.add(id(frame))
+        events = sys.monitoring.events
+        self._add_local_events(frame.f_code, events.PY_RETURN | (events.LINE if needs_lines else 0))
+
+    def _prepare_stack_frames(self, frame):
+        if sys.monitoring.get_tool(sys.monitoring.DEBUGGER_ID) is None:
+            # called from constructor
+            return
+
+        # events of previous command are not relevant anymore
+        self._clear_local_events()
+        self._set_global_events()
+        sys.monitoring.restart_events()
+
+        self._alive_frame_ids = set()
+        for frame, needs_lines in self._get_stack_frames(frame):
+            self._watch_frame(frame, needs_lines)
+
+    def _on_py_start(self, code, instruction_offset):
+        if get_ident() != self._thread_id:
+            # DISABLE would disable the event for main thread as well
+            return None
+
+        breakpoint_lines = self._get_code_breakpoints(code)
+        if breakpoint_lines is None:
+            return sys.monitoring.DISABLE
+        elif self._vm.is_doing_io():
+            return None
+
+        frame = sys._getframe(1)
+        self._check_store_main_frame_id(frame)
+        self._fresh_exception = None
+
+        needs_lines = self._new_frame_needs_lines(breakpoint_lines)
+        if id(frame) == self._current_command.frame_id:
+            self._watch_frame(frame, needs_lines)
+        elif needs_lines:
+            self._add_local_events(code, sys.monitoring.events.LINE)
+        else:
+            # Neither this nor next frames of this code can complete current command
+            return sys.monitoring.DISABLE
+
+        return None
+
+    def _on_py_return(self, code, instruction_offset, arg):
+        if get_ident() != self._thread_id:
+            return None
+
+        frame_id = id(sys._getframe(1))
+        if frame_id not in self._alive_frame_ids:
+            return None
+
+        self._fresh_exception = None
+        self._alive_frame_ids.remove(frame_id)
+        self._check_notify_return(frame_id)
+        if frame_id == self._current_command.frame_id and self._current_command.name in (
+            "step_over",
+            "step_out",
+        ):
+            # command completes at next line of any frame
+            self._set_global_events(with_lines=True)
+
+        return None
+
+    def _on_line(self, code, line_number):
+        if get_ident() != self._thread_id:
+            return None
+
+        if self._get_code_breakpoints(code) is None:
+            return sys.monitoring.DISABLE
+        elif self._vm.is_doing_io():
+            return None
+
+        frame = sys._getframe(1)
+        self._fresh_exception = None
+        if self._completion_check(frame, self._current_command):
+            self._report_current_state(frame)
+            self._start_command(self._fetch_next_debugger_command(), frame)
+
+        return None
+
+    def _on_raise(self, code, instruction_offset, exception):
+        if get_ident() != self._thread_id:
+            return None
+
+        frame = sys._getframe(1)
+        if self._should_skip_frame(frame, "exception"):
+            return None
+
+        self._fresh_exception = (type(exception), exception, exception.__traceback__)
+        self._register_affected_frame(exception, frame)
+        if self._is_interesting_exception(frame):
+            # UI doesn't know about separate exception events
+            self._report_current_state(frame)
+            self._start_command(self._fetch_next_debugger_command(), frame)
+
+        return None
+
+
 class NiceTracer(Tracer):
     def __init__(self, vm, original_cmd):
         super().__init__(vm, original_cmd)
         self._instrumented_files = set()
         self._install_marker_functions()
         self._custom_stack = []
-        self._saved_states = []
+        self._saved_states = StateLog(vm._state_log_size_limit)
         self._current_state_index = 0
+        # TextRange-s of nodes are created once and shared by all states
+        self._node_focuses = {}
 
         from collections import Counter
 
         self._fulltags = Counter()
         self._nodes = {}
+        self._code_cache = InstrumentedCodeCache()
+        # node id-s are derived from the cache key of the source being prepared,
+        # so that id-s in cached code don't clash with the ones in other code
+        self._node_id_base = 0
+        self._prepared_node_ids = {}  # id(node) => node id
+
+        # In lazy mode function bodies get only statement markers at first and the code of
+        # a function gets replaced with fully instrumented one when the function is entered
+        # while user wants to see details (see _wants_details)
+        self._lazy_instrumentation = original_cmd.get("lazy_instrumentation", False)
+        self._lazy_sources = {}  # filename => source
+        self._lazy_units = {}  # filename => list of LazyUnit-s
+        self._lazy_future_imports = {}  # filename => list of ImportFrom nodes
+        self._cheap_codes = {}  # id(code) => code with only statement markers
+        self._unupgradable_code_ids = set()
+        self._code_lines = {}  # id(code) => set of line numbers
 
     def _breakpointhook(self, *args, **kw):
         self._report_state(len(self._saved_states) - 1)
@@ -1520,22 +2559,276 @@ class NiceTracer(Tracer):
             if not hasattr(builtins, name):
                 setattr(builtins, name, getattr(self, name))
 
-    def _prepare_ast(self, source, filename, mode):
+    def _prepare_ast(self, source, filename, mode, lazy=False):
+        """Instruments the code. If lazy, then function bodies get only statement markers"""
+        root = self._parse_and_tag(source, filename, mode)
+        self._start_node_export(source, filename, mode, "lazy" if lazy else "")
+        self._insert_expression_markers(root, not lazy)
+        self._insert_statement_markers(root)
+        self._insert_for_target_markers(root, not lazy)
+        self._instrumented_files.add(filename)
+
+        return root
+
+    def _parse_and_tag(self, source, filename, mode):
         # ast_utils need to be imported after asttokens
         # is (custom-)imported
+        self._vm.load_lazy_shared_modules()
         from thonny import ast_utils
 
         root = ast.parse(source, filename, mode)
-
         ast_utils.mark_text_ranges(root, source)
         self._tag_nodes(root)
-        self._insert_expression_markers(root)
-        self._insert_statement_markers(root)
-        self._insert_for_target_markers(root)
-        self._instrumented_files.add(filename)
-
         return root
 
+    def _start_node_export(self, source, filename, mode, variant):
+        self._node_id_base = (
+            int(self._code_cache.get_key(source, filename, mode, variant)[:12], 16) << 24
+        )
+        self._prepared_node_ids = {}
+
+    def _compile_statements(self, source, filename, ast_postprocessors):
+        if ast_postprocessors:
+            # result depends on postprocessors, can't use the cache
+            return super()._compile_statements(source, filename, ast_postprocessors)
+
+        return self._compile_instrumented(source, filename, "exec")
+
+    def _compile_instrumented(self, source, filename, mode):
+        """Returns instrumented code object, either from the cache or freshly compiled"""
+        # shell statements don't get compiled lazily, because their cheap code objects
+        # couldn't be mapped back to the source
+        lazy = self._lazy_instrumentation and os.path.isfile(filename)
+        key = self._code_cache.get_key(source, filename, mode, "lazy" if lazy else "")
+        entry = self._code_cache.load(key)
+        if entry is not None:
+            code, node_table = entry
+            self._load_node_table(node_table)
+            self._instrumented_files.add(filename)
+        else:
+            root = self._prepare_ast(source, filename, mode, lazy)
+            code = compile(root, filename, mode, dont_inherit=True)
+            self._code_cache.save(key, code, self._create_node_table())
+
+        if lazy:
+            self._lazy_sources[filename] = source
+            self._lazy_units.pop(filename, None)
+            self._register_cheap_codes(code)
+
+        return code
+
+    def _register_cheap_codes(self, code):
+        for const in code.co_consts:
+            if isinstance(const, types.CodeType):
+                self._cheap_codes[id(const)] = const
+                self._register_cheap_codes(const)
+
+    def _wants_details(self, code):
+        """Tells whether code with only statement markers should be replaced with
+        fully instrumented code before running it"""
+        cmd = self._current_command
+        if cmd.name == "step_into":
+            return True
+
+        if cmd.name == "run_to_cursor":
+            breakpoints = self._get_breakpoints_with_cursor_position(cmd)
+        else:
+            breakpoints = cmd.breakpoints
+
+        breakpoint_lines = breakpoints.get(code.co_filename)
+        if not breakpoint_lines:
+            return False
+
+        if id(code) not in self._code_lines:
+            self._code_lines[id(code)] = {
+                lineno for _, lineno in dis.findlinestarts(code) if lineno is not None
+            }
+        return not self._code_lines[id(code)].isdisjoint(breakpoint_lines)
+
+    def _check_upgrade_function(self, value):
+        """Replaces the code of a function, which is about to be called"""
+        if isinstance(value, types.MethodType):
+            value = value.__func__
+
+        if (
+            isinstance(value, types.FunctionType)
+            and id(value.__code__) in self._cheap_codes
+            and self._wants_details(value.__code__)
+        ):
+            full_code = self._get_full_code(value.__code__)
+            if full_code is not None:
+                value.__code__ = full_code
+
+    def _check_upgrade_code(self, code):
+        """Replaces the code in the functions referring to it. Called when code has already
+        started running, so the replacement has effect only for next calls.
+
+        Functions created later from this code (eg. closures created by a function which
+        is still running) get upgraded on their first call. In order to avoid this for
+        next calls of the enclosing function, its code gets upgraded as well."""
+        if id(code) in self._unupgradable_code_ids or not self._wants_details(code):
+            return
+
+        unit = self._find_lazy_unit(code)
+        full_code = self._get_full_code(code, unit)
+        if full_code is None:
+            self._unupgradable_code_ids.add(id(code))
+            return
+
+        _replace_function_code(code, full_code)
+
+        outer_code = self._get_cheap_unit_code(unit)
+        if outer_code is not None and outer_code is not code:
+            full_outer_code = self._get_full_code(outer_code, unit)
+            if full_outer_code is not None:
+                _replace_function_code(outer_code, full_outer_code)
+
+    def _find_lazy_unit(self, cheap_code):
+        filename = cheap_code.co_filename
+        if filename not in self._lazy_units:
+            self._lazy_units[filename] = self._find_lazy_units(filename)
+
+        for unit in self._lazy_units[filename]:
+            if unit.first_lineno <= cheap_code.co_firstlineno <= unit.last_lineno:
+                if unit.code is None:
+                    unit.code = self._compile_lazy_unit(filename, unit)
+                return unit
+
+        return None
+
+    def _get_cheap_unit_code(self, unit):
+        """Returns the code of the unit's outermost function with only statement markers
+        or None if it can't be identified"""
+        if unit.cheap_code is None:
+            outer_code = next(
+                code for code in _iter_nested_codes(unit.code) if code.co_name == unit.node.name
+            )
+            candidates = [
+                code
+                for code in self._cheap_codes.values()
+                if code.co_filename == outer_code.co_filename
+                and code.co_name == outer_code.co_name
+                and code.co_firstlineno == outer_code.co_firstlineno
+            ]
+            unit.cheap_code = candidates[0] if len(candidates) == 1 else False
+
+        return unit.cheap_code or None
+
+    def _get_full_code(self, cheap_code, unit=None):
+        """Returns fully instrumented counterpart of the code or None if it can't be found"""
+        if unit is None:
+            unit = self._find_lazy_unit(cheap_code)
+            if unit is None:
+                return None
+
+        candidates = [
+            code
+            for code in _iter_nested_codes(unit.code)
+            if code.co_name == cheap_code.co_name
+            and code.co_firstlineno == cheap_code.co_firstlineno
+        ]
+        if len(candidates) != 1 or candidates[0].co_freevars != cheap_code.co_freevars:
+            # eg. several lambdas on the same line
+            return None
+
+        return candidates[0]
+
+    def _find_lazy_units(self, filename):
+        """Finds outermost functions (including methods) from fresh AST of the module"""
+        source = self._lazy_sources[filename]
+        root = self._parse_and_tag(source, filename, "exec")
+        units = []
+
+        def visit(node, class_nodes):
+            for child in node.body:
+                if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                    units.append(LazyUnit(child, class_nodes))
+                elif isinstance(child, ast.ClassDef):
+                    visit(child, class_nodes + [child])
+                elif isinstance(child, ast.stmt):
+                    # functions may be defined in compound statements
+                    for name in ["body", "orelse", "finalbody"]:
+                        if isinstance(getattr(child, name, None), list):
+                            visit(_BodyHolder(getattr(child, name)), class_nodes)
+                    for handler in getattr(child, "handlers", []):
+                        visit(handler, class_nodes)
+
+        visit(root, [])
+        self._lazy_future_imports[filename] = [
+            node
+            for node in root.body
+            if isinstance(node, ast.ImportFrom) and node.module == "__future__"
+        ]
+        return units
+
+    def _compile_lazy_unit(self, filename, unit):
+        source = self._lazy_sources[filename]
+        self._start_node_export(source, filename, "exec", "unit %d" % unit.first_lineno)
+
+        node = self._insert_expression_markers(unit.node)
+        self._insert_statement_markers(node)
+        self._insert_for_target_markers(node)
+
+        # Function needs to be compiled in the same classes to get same
+        # name mangling and __class__ cell
+        body = [node]
+        for class_node in reversed(unit.class_nodes):
+            class_node = copy.copy(class_node)
+            class_node.body = body
+            body = [class_node]
+
+        module = ast.Module(body=self._lazy_future_imports[filename] + body)
+        module.type_ignores = []
+        return compile(module, filename, "exec", dont_inherit=True)
+
+    def _create_node_table(self):
+        """Describes the nodes exported in last _prepare_ast with tuples which can be marshalled"""
+        node_ids = dict(self._prepared_node_ids)
+        nodes = [self._nodes[node_id] for node_id in node_ids.values()]
+
+        # include parents, which weren't exported themselves
+        i = 0
+        while i < len(nodes):
+            parent = getattr(nodes[i], "parent_node", None)
+            if parent is not None and id(parent) not in node_ids:
+                node_ids[id(parent)] = self._node_id_base + len(node_ids)
+                nodes.append(parent)
+            i += 1
+
+        table = []
+        for node in nodes:
+            parent = getattr(node, "parent_node", None)
+            table.append(
+                (
+                    node_ids[id(node)],
+                    node.lineno,
+                    node.col_offset,
+                    node.end_lineno,
+                    node.end_col_offset,
+                    set(getattr(node, "tags", set())),
+                    None if parent is None else node_ids[id(parent)],
+                )
+            )
+        return table
+
+    def _load_node_table(self, table):
+        nodes = {}
+        for node_id, lineno, col_offset, end_lineno, end_col_offset, tags, _parent_id in table:
+            node = CachedNode()
+            node.lineno = lineno
+            node.col_offset = col_offset
+            node.end_lineno = end_lineno
+            node.end_col_offset = end_col_offset
+            node.tags = tags
+            nodes[node_id] = node
+
+        for row in table:
+            node_id, parent_id = row[0], row[-1]
+            if parent_id is not None:
+                nodes[node_id].parent_node = nodes[parent_id]
+
+        self._nodes.update(nodes)
+
     def _should_skip_frame(self, frame, event):
         code = frame.f_code
         return (
@@ -1613,12 +2906,17 @@ class NiceTracer(Tracer):
 
                 if "call_function" not in node.tags:
                     self._handle_progress_event(frame.f_back, event, marker_function_args, node)
+                elif event == "after_expression" and self._cheap_codes:
+                    # function is about to be called
+                    self._check_upgrade_function(marker_function_args["value"])
                 self._try_interpret_as_again_event(frame.f_back, event, marker_function_args, node)
 
             else:
                 # Calls to proper functions.
                 # Client doesn't care about these events,
                 # it cares about "before_statement" events in the first statement of the body
+                if id(frame.f_code) in self._cheap_codes:
+                    self._check_upgrade_code(frame.f_code)
                 self._custom_stack.append(CustomStackFrame(frame, "call"))
 
         elif event == "exception":
@@ -1664,9 +2962,12 @@ class NiceTracer(Tracer):
         Updates custom stack and stores the state
         
         self._custom_stack always keeps last info,
-        which gets exported as FrameInfos to _saved_states["stack"]
+        which gets exported as TempFrameInfos to the stacks of saved states
         """
-        focus = TextRange(node.lineno, node.col_offset, node.end_lineno, node.end_col_offset)
+        focus = self._node_focuses.get(id(node))
+        if focus is None:
+            focus = TextRange(node.lineno, node.col_offset, node.end_lineno, node.end_col_offset)
+            self._node_focuses[id(node)] = focus
 
         custom_frame = self._custom_stack[-1]
         custom_frame.event = event
@@ -1674,9 +2975,9 @@ class NiceTracer(Tracer):
         custom_frame.node = node
         custom_frame.node_tags = node.tags
 
-        if self._saved_states:
+        if len(self._saved_states):
             prev_state = self._saved_states[-1]
-            prev_state_frame = self._create_actual_active_frame(prev_state)
+            prev_state_frame = prev_state.get_active_frame()
         else:
             prev_state = None
             prev_state_frame = None
@@ -1713,47 +3014,76 @@ class NiceTracer(Tracer):
 
         # Save the snapshot.
         # Check if we can share something with previous state
+        current_exception = self._get_current_exception()[1]
         if (
             prev_state is not None
             and id(prev_state_frame.system_frame) == id(frame)
-            and prev_state["exception_value"] is self._get_current_exception()[1]
-            and prev_state["fresh_exception_id"] == id(self._fresh_exception)
+            and prev_state.exception_value is current_exception
+            and prev_state.fresh_exception_id == id(self._fresh_exception)
             and ("before" in event or "skipexport" in node.tags)
         ):
-
-            exception_info = prev_state["exception_info"]
+            exception_info = prev_state.exception_info
             # share the stack ...
-            stack = prev_state["stack"]
+            stack = prev_state.stack
             # ... but override certain things
-            active_frame_overrides = {
-                "event": custom_frame.event,
-                "focus": custom_frame.focus,
-                "node_tags": custom_frame.node_tags,
-                "current_root_expression": custom_frame.current_root_expression,
-                "current_evaluations": custom_frame.current_evaluations.copy(),
-                "current_statement": custom_frame.current_statement,
-            }
+            active_frame = prev_state_frame._replace(
+                event=custom_frame.event,
+                focus=custom_frame.focus,
+                node_tags=custom_frame.node_tags,
+                current_root_expression=custom_frame.current_root_expression,
+                current_evaluations=custom_frame.current_evaluations.copy(),
+                current_statement=custom_frame.current_statement,
+            )
+            size = _SAVED_STATE_BASE_SIZE + _EXPORTED_ITEM_SIZE * len(
+                active_frame.current_evaluations
+            )
         else:
-            # make full export
-            stack = self._export_stack()
+            # make full export (sharing unchanged parts of the previous stack)
+            prev_stack = prev_state.stack if prev_state is not None else []
+            stack = self._export_stack(prev_stack)
             exception_info = self._export_exception_info()
-            active_frame_overrides = {}
-
-        msg = {
-            "stack": stack,
-            "active_frame_overrides": active_frame_overrides,
-            "in_client_log": False,
-            "io_symbol_count": (
-                sys.stdin._processed_symbol_count
-                + sys.stdout._processed_symbol_count
-                + sys.stderr._processed_symbol_count
-            ),
-            "exception_value": self._get_current_exception()[1],
-            "fresh_exception_id": id(self._fresh_exception),
-            "exception_info": exception_info,
-        }
+            active_frame = None
+            size = _SAVED_STATE_BASE_SIZE + self._estimate_new_stack_size(stack, prev_stack)
+
+        if prev_state is not None:
+            # only the latest state needs it (and it can keep lots of objects alive)
+            prev_state.exception_value = None
+
+        self._saved_states.append(
+            SavedState(
+                stack=stack,
+                active_frame=active_frame,
+                io_symbol_count=(
+                    sys.stdin._processed_symbol_count
+                    + sys.stdout._processed_symbol_count
+                    + sys.stderr._processed_symbol_count
+                ),
+                exception_value=current_exception,
+                fresh_exception_id=id(self._fresh_exception),
+                exception_info=exception_info,
+                size=size,
+            )
+        )
 
-        self._saved_states.append(msg)
+    def _estimate_new_stack_size(self, stack, prev_stack):
+        """Estimates the memory taken by the parts of the stack, which are not shared
+        with the previous stack"""
+        seen_ids = set()
+        for tframe in prev_stack:
+            seen_ids.update((id(tframe), id(tframe.locals), id(tframe.globals)))
+
+        size = 0
+        for tframe in stack:
+            if id(tframe) in seen_ids:
+                continue
+            seen_ids.add(id(tframe))
+            size += _EXPORTED_ITEM_SIZE * (1 + len(tframe.current_evaluations))
+            for variables in [tframe.locals, tframe.globals]:
+                if variables is not None and id(variables) not in seen_ids:
+                    seen_ids.add(id(variables))
+                    size += _EXPORTED_ITEM_SIZE * len(variables)
+
+        return size
 
     def _respond_to_commands(self):
         """Tries to respond to client commands with states collected so far.
@@ -1764,8 +3094,8 @@ class NiceTracer(Tracer):
         while self._current_state_index < len(self._saved_states):
             state = self._saved_states[self._current_state_index]
 
-            # Get current state's most recent frame (together with overrides
-            frame = self._create_actual_active_frame(state)
+            # Get current state's most recent frame (together with overrides)
+            frame = state.get_active_frame()
 
             # Is this state meant to be seen?
             if "skip_" + frame.event not in frame.node_tags:
@@ -1775,27 +3105,25 @@ class NiceTracer(Tracer):
                 cmd_complete = tester(frame, self._current_command)
 
                 if cmd_complete:
-                    state["in_client_log"] = True
+                    state.in_client_log = True
                     self._report_state(self._current_state_index)
                     self._current_command = self._fetch_next_debugger_command()
 
             if self._current_command.name == "step_back":
-                if self._current_state_index == 0:
-                    # Already in first state. Remain in this loop
+                if self._current_state_index == self._saved_states.first_index:
+                    # Already in first available state. Remain in this loop
                     pass
                 else:
-                    assert self._current_state_index > 0
+                    assert self._current_state_index > self._saved_states.first_index
                     # Current event is no longer present in GUI "undo log"
-                    self._saved_states[self._current_state_index]["in_client_log"] = False
+                    self._saved_states[self._current_state_index].in_client_log = False
                     self._current_state_index -= 1
             else:
                 # Other commands move the pointer forward
                 self._current_state_index += 1
 
-    def _create_actual_active_frame(self, state):
-        return state["stack"][-1]._replace(**state["active_frame_overrides"])
-
     def _report_state(self, state_index):
+        saved_state = self._saved_states[state_index]
         in_present = state_index == len(self._saved_states) - 1
         if in_present:
             # For reported new events re-export stack to make sure it is not shared.
@@ -1804,29 +3132,23 @@ class NiceTracer(Tracer):
             # was not the right choice. See tag_nodes for more.)
             # Re-exporting reduces the harm by showing correct data at least
             # for present states.
-            self._saved_states[state_index]["stack"] = self._export_stack()
-
-        # need to make a copy for applying overrides
-        # and removing helper fields without modifying original
-        state = self._saved_states[state_index].copy()
-        state["stack"] = state["stack"].copy()
+            saved_state.stack = self._export_stack()
+            saved_state.active_frame = None
 
-        state["in_present"] = in_present
-        if not in_present:
-            # for past states fix the newest frame
-            state["stack"][-1] = self._create_actual_active_frame(state)
-
-        del state["exception_value"]
-        del state["active_frame_overrides"]
+        # need to make a copy for fixing the newest frame without modifying original
+        stack = saved_state.stack.copy()
+        stack[-1] = saved_state.get_active_frame()
 
         # Convert stack of TempFrameInfos to stack of FrameInfos
         new_stack = []
-        for tframe in state["stack"]:
+        for tframe in stack:
             system_frame = tframe.system_frame
             module_name = system_frame.f_globals["__name__"]
             code_name = system_frame.f_code.co_name
 
-            source, firstlineno, in_library = self._vm._get_frame_source_info(system_frame)
+            source, source_hash, firstlineno, in_library = self._vm._get_frame_source_info(
+                system_frame
+            )
 
             assert firstlineno is not None, "nofir " + str(system_frame)
             frame_id = id(system_frame)
@@ -1840,6 +3162,7 @@ class NiceTracer(Tracer):
                     globals=tframe.globals,
                     freevars=system_frame.f_code.co_freevars,
                     source=source,
+                    source_hash=source_hash,
                     lineno=system_frame.f_lineno,
                     firstlineno=firstlineno,
                     in_library=in_library,
@@ -1854,10 +3177,19 @@ class NiceTracer(Tracer):
 
             self._reported_frame_ids.add(frame_id)
 
-        state["stack"] = new_stack
-        state["tracer_class"] = "NiceTracer"
-
-        self._vm.send_message(DebuggerResponse(**state))
+        self._send_debugger_response(
+            DebuggerResponse(
+                stack=new_stack,
+                in_present=in_present,
+                in_client_log=saved_state.in_client_log,
+                io_symbol_count=saved_state.io_symbol_count,
+                fresh_exception_id=saved_state.fresh_exception_id,
+                exception_info=saved_state.exception_info,
+                # how many steps back are possible with the states, which haven't been dropped
+                past_state_count=state_index - self._saved_states.first_index,
+                tracer_class="NiceTracer",
+            )
+        )
 
     def _try_interpret_as_again_event(self, frame, original_event, original_args, original_node):
         """
@@ -1948,12 +3280,12 @@ class NiceTracer(Tracer):
     def _cmd_step_back_completed(self, frame, cmd):
         # Check if the selected message has been previously sent to front-end
         return (
-            self._saved_states[self._current_state_index]["in_client_log"]
-            or self._current_state_index == 0
+            self._saved_states[self._current_state_index].in_client_log
+            or self._current_state_index == self._saved_states.first_index
         )
 
     def _cmd_step_out_completed(self, frame, cmd):
-        if self._current_state_index == 0:
+        if self._current_state_index == self._saved_states.first_index:
             return False
 
         if frame.event == "after_statement":
@@ -1962,7 +3294,7 @@ class NiceTracer(Tracer):
         if self._at_a_breakpoint(frame, cmd):
             return True
 
-        prev_state_frame = self._saved_states[self._current_state_index - 1]["stack"][-1]
+        prev_state_frame = self._saved_states[self._current_state_index - 1].stack[-1]
 
         return (
             # the frame has completed
@@ -2007,41 +3339,59 @@ class NiceTracer(Tracer):
 
         return False
 
-    def _export_stack(self):
+    def _export_stack(self, prev_stack=()):
+        """Exports custom stack as a list of TempFrameInfos.
+
+        Frames, locals and globals which are equal to the ones in prev_stack are
+        taken from there, so that saved states can share them."""
         result = []
 
         exported_globals_per_module = {}
 
-        def export_globals(module_name, frame):
+        def export_globals(module_name, frame, prev_globals):
             if module_name not in exported_globals_per_module:
-                exported_globals_per_module[module_name] = self._vm.export_variables(
-                    frame.f_globals
-                )
+                exported = self._vm.export_variables(frame.f_globals)
+                if exported == prev_globals:
+                    exported = prev_globals
+                exported_globals_per_module[module_name] = exported
             return exported_globals_per_module[module_name]
 
-        for custom_frame in self._custom_stack:
+        for i, custom_frame in enumerate(self._custom_stack):
 
             system_frame = custom_frame.system_frame
             module_name = system_frame.f_globals["__name__"]
 
-            result.append(
-                TempFrameInfo(
-                    # need to store the reference to the frame to avoid it being GC-d
-                    # otherwise frame id-s would be reused and this would
-                    # mess up communication with the frontend.
-                    system_frame=system_frame,
-                    locals=None
-                    if system_frame.f_locals is system_frame.f_globals
-                    else self._vm.export_variables(system_frame.f_locals),
-                    globals=export_globals(module_name, system_frame),
-                    event=custom_frame.event,
-                    focus=custom_frame.focus,
-                    node_tags=custom_frame.node_tags,
-                    current_evaluations=custom_frame.current_evaluations.copy(),
-                    current_statement=custom_frame.current_statement,
-                    current_root_expression=custom_frame.current_root_expression,
-                )
+            if i < len(prev_stack) and prev_stack[i].system_frame is system_frame:
+                prev_tframe = prev_stack[i]
+            else:
+                prev_tframe = None
+
+            if system_frame.f_locals is system_frame.f_globals:
+                frame_locals = None
+            else:
+                frame_locals = self._vm.export_variables(system_frame.f_locals)
+                if prev_tframe is not None and frame_locals == prev_tframe.locals:
+                    frame_locals = prev_tframe.locals
+
+            tframe = TempFrameInfo(
+                # need to store the reference to the frame to avoid it being GC-d
+                # otherwise frame id-s would be reused and this would
+                # mess up communication with the frontend.
+                system_frame=system_frame,
+                locals=frame_locals,
+                globals=export_globals(
+                    module_name, system_frame, prev_tframe.globals if prev_tframe else None
+                ),
+                event=custom_frame.event,
+                focus=custom_frame.focus,
+                node_tags=custom_frame.node_tags,
+                current_evaluations=custom_frame.current_evaluations.copy(),
+                current_statement=custom_frame.current_statement,
+                current_root_expression=custom_frame.current_root_expression,
             )
+            if tframe == prev_tframe:
+                tframe = prev_tframe
+            result.append(tframe)
 
         assert result  # not empty
         return result
@@ -2311,9 +3661,9 @@ class NiceTracer(Tracer):
         ast.fix_missing_locations(stmt)
         return stmt
 
-    def _insert_for_target_markers(self, root):
+    def _insert_for_target_markers(self, root, into_functions=True):
         """inserts markers which notify assignment to for-loop variables"""
-        for node in ast.walk(root):
+        for node in ast.walk(root) if into_functions else _walk_outside_functions(root):
             if isinstance(node, ast.For):
                 old_target = node.target
                 # print(vars(old_target))
@@ -2355,7 +3705,7 @@ class NiceTracer(Tracer):
 
                 ast.fix_missing_locations(node)
 
-    def _insert_expression_markers(self, node):
+    def _insert_expression_markers(self, node, into_functions=True):
         """
         TODO: this docstring is outdated
         each expression e gets wrapped like this:
@@ -2405,6 +3755,16 @@ class NiceTracer(Tracer):
                     else:
                         # This expression (and its children) should be ignored
                         return node
+                elif not into_functions and isinstance(
+                    node, (ast.FunctionDef, ast.AsyncFunctionDef)
+                ):
+                    # instrument decorators, default values etc. but not the body
+                    body = node.body
+                    node.body = []
+                    try:
+                        return ast.NodeTransformer.generic_visit(self, node)
+                    finally:
+                        node.body = body
                 else:
                     # Descend into statements
                     return ast.NodeTransformer.generic_visit(self, node)
@@ -2418,8 +3778,11 @@ class NiceTracer(Tracer):
 
     def _export_node(self, node):
         assert isinstance(node, (ast.expr, ast.stmt))
-        node_id = id(node)
-        self._nodes[node_id] = node
+        node_id = self._prepared_node_ids.get(id(node))
+        if node_id is None:
+            node_id = self._node_id_base + len(self._prepared_node_ids)
+            self._prepared_node_ids[id(node)] = node_id
+            self._nodes[node_id] = node
         return ast.Num(node_id)
 
     def _debug(self, *args):
@@ -2458,12 +3821,51 @@ class FancySourceFileLoader(SourceFileLoader):
         old_tracer = sys.gettrace()
         sys.settrace(None)
         try:
-            root = self._tracer._prepare_ast(data, path, "exec")
-            return super().source_to_code(root, path)
+            return self._tracer._compile_instrumented(data, path, "exec")
         finally:
             sys.settrace(old_tracer)
 
 
+class _BodyHolder:
+    def __init__(self, body):
+        self.body = body
+
+
+def _walk_outside_functions(root):
+    """Like ast.walk, but doesn't descend into function bodies"""
+    todo = [root]
+    while todo:
+        node = todo.pop()
+        yield node
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)):
+            todo.extend(ast.iter_child_nodes(node))
+
+
+def _get_element_page(value, offset=0, limit=None):
+    """Returns a list of elements (or key-value pairs of a dict) of given container,
+    without going through the elements after the page"""
+    stop = None if limit is None else offset + limit
+    if isinstance(value, (list, tuple)):
+        return value[offset:stop]
+    elif isinstance(value, dict):
+        return list(itertools.islice(value.items(), offset, stop))
+    else:
+        return list(itertools.islice(value, offset, stop))
+
+
+def _replace_function_code(old_code, new_code):
+    for referrer in gc.get_referrers(old_code):
+        if isinstance(referrer, types.FunctionType) and referrer.__code__ is old_code:
+            referrer.__code__ = new_code
+
+
+def _iter_nested_codes(code):
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            yield const
+            yield from _iter_nested_codes(const)
+
+
 def _get_frame_prefix(frame):
     return str(id(frame)) + " " + ">" * len(inspect.getouterframes(frame, 0)) + " "
 
@@ -2617,5 +4019,53 @@ def _report_internal_error():
     traceback.print_exc()
 
 
+def _import_with_extra_path(names, extra_path):
+    from importlib import import_module
+
+    original_sys_path = sys.path
+    try:
+        sys.path = sys.path + extra_path
+        for name in names:
+            try:
+                import_module(name)
+            except ImportError:
+                pass
+    finally:
+        sys.path = original_sys_path
+
+
+def _find_plugin_module_names():
+    # built-in plugins
+    import thonny.plugins.backend  # pylint: disable=redefined-outer-name
+
+    result = _list_modules(thonny.plugins.backend.__path__, "thonny.plugins.backend.")
+
+    # 3rd party plugins from namespace package
+    try:
+        import thonnycontrib.backend  # @UnresolvedImport
+    except ImportError:
+        # No 3rd party plugins installed
+        pass
+    else:
+        result += _list_modules(thonnycontrib.backend.__path__, "thonnycontrib.backend.")
+
+    return result
+
+
+def _list_modules(path, prefix):
+    return sorted(module_name for _, module_name, _ in pkgutil.iter_modules(path, prefix))
+
+
+def preload_modules(frontend_sys_path):
+    """Imports the modules which VM.__init__ would import, without initializing
+    the plugins. Used by the zygote, so that forked backends find them in sys.modules"""
+    _import_with_extra_path(SHARED_MODULE_NAMES, frontend_sys_path)
+    for module_name in _find_plugin_module_names():
+        try:
+            importlib.import_module(module_name)
+        except Exception:
+            logger.exception("Failed preloading plugin '" + module_name + "'")
+
+
 def get_vm():
     return _vm
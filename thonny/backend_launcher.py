@@ -10,6 +10,11 @@ gives relative __file__-s on imported modules.)
 """
 
 if __name__ == "__main__":
+    import time
+
+    # (name, start time) of startup phases, VM reports their durations
+    startup_phases = [("thonny import", time.time())]
+
     # imports required by the backend itself
     import sys
     import logging
@@ -29,6 +34,7 @@ if __name__ == "__main__":
     assert spec.loader is not None
     spec.loader.exec_module(module)
 
+    startup_phases.append(("logging setup", time.time()))
     THONNY_USER_DIR = os.environ["THONNY_USER_DIR"]
     # set up logging
     logger = logging.getLogger("thonny")
@@ -65,6 +71,31 @@ if __name__ == "__main__":
         # https://stackoverflow.com/questions/36134072/setprocessdpiaware-seems-not-to-work-under-windows-10
         ctypes.windll.user32.SetProcessDPIAware()
 
+    # In zygote mode this process only preloads modules and forks new backends.
+    # serve_forks returns only in the forked children, which continue as regular backends
+    zygote_socket_path = os.environ.pop("THONNY_BACKEND_ZYGOTE", None)
+    if zygote_socket_path:
+        from thonny.backend_zygote import serve_forks  # @UnresolvedImport
+
+        serve_forks(
+            zygote_socket_path, os.environ.pop("THONNY_FRONTEND_SYS_PATH").split(os.pathsep)
+        )
+        # zygote's own phases don't count for the forked child
+        startup_phases = [("fork", time.time())]
+
+    # Frontend may offer a separate channel for commands and messages.
+    # User program (and its subprocesses) don't need to know about it
+    socket_path = os.environ.pop("THONNY_BACKEND_SOCKET", None)
+    if socket_path:
+        startup_phases.append(("socket connect", time.time()))
+        import socket
+
+        message_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        message_socket.connect(socket_path)
+    else:
+        message_socket = None
+
+    startup_phases.append(("backend import", time.time()))
     from thonny.backend import VM  # @UnresolvedImport
 
-    VM().mainloop()
+    VM(message_socket, startup_phases).mainloop()
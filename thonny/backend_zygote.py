@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+Fork server ("zygote") for CPython backends (Linux only).
+
+Zygote is started by backend_launcher (when THONNY_BACKEND_ZYGOTE is set),
+imports the modules each backend needs and then forks a new backend process
+for each request from the frontend. The child returns from serve_forks and
+continues in backend_launcher as a regular backend.
+
+The frontend connects to the control socket for each new backend and sends
+a request (see thonny.running.BackendZygote) consisting of
+4-byte length, serialized dict with "argv", "env" and "cwd", and file descriptors
+for child's stdin, stdout and stderr (as SCM_RIGHTS ancillary data).
+Zygote answers with child's pid (b"pid <pid>\n") and, when the child exits,
+with its exit code (b"exit <code>\n").
+
+Zygote prints b"ready\n" or b"unsafe <reason>\n" to its stdout after preloading.
+In the latter case forking could leave the children in a broken state
+(eg. when some module has created threads or initialized Tk) and zygote exits.
+"""
+
+import array
+import logging
+import os
+import select
+import socket
+import struct
+import sys
+import threading
+
+logger = logging.getLogger("thonny.backend_zygote")
+
+_LENGTH = struct.Struct(">I")
+_FD_COUNT = 3
+
+
+def serve_forks(control_socket_path, frontend_sys_path):
+    """Returns only in forked children"""
+    from thonny.backend import preload_modules  # @UnresolvedImport
+
+    preload_modules(frontend_sys_path)
+
+    problem = get_fork_problem()
+    if problem is not None:
+        logger.warning("Zygote can't fork: %s", problem)
+        _report_status("unsafe " + problem)
+        sys.exit(1)
+
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(control_socket_path)
+    listener.listen(5)
+    _report_status("ready")
+
+    stdin_fd = sys.stdin.fileno()
+    child_connections = {}
+
+    while True:
+        readable, _, _ = select.select([listener, stdin_fd], [], [], 0.1)
+
+        if stdin_fd in readable and os.read(stdin_fd, 1024) == b"":
+            # frontend has closed the zygote
+            # (forked backends live on until they get closed themselves)
+            sys.exit(0)
+
+        if listener in readable:
+            connection = listener.accept()[0]
+            try:
+                request, fds = _receive_request(connection)
+            except Exception:
+                logger.exception("Invalid fork request")
+                connection.close()
+            else:
+                pid = os.fork()
+                if pid == 0:
+                    listener.close()
+                    for other_connection in child_connections.values():
+                        other_connection.close()
+                    connection.close()
+                    _prepare_child(request, fds)
+                    return
+
+                for fd in fds:
+                    os.close(fd)
+                connection.sendall(b"pid %d\n" % pid)
+                child_connections[pid] = connection
+
+        _reap_children(child_connections)
+
+
+def get_fork_problem():
+    """Returns the reason why forking this process is unsafe or None"""
+    if "tkinter" in sys.modules or "_tkinter" in sys.modules:
+        return "tkinter is imported"
+
+    if threading.active_count() > 1:
+        return "threads are running"
+
+    return None
+
+
+def _report_status(status):
+    sys.stdout.write(status + "\n")
+    sys.stdout.flush()
+
+
+def _receive_request(connection):
+    fds = array.array("i")
+    data, ancdata, _, _ = connection.recvmsg(
+        65536, socket.CMSG_LEN(_FD_COUNT * fds.itemsize)
+    )
+    for level, kind, cmsg_data in ancdata:
+        if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+            fds.frombytes(cmsg_data[: len(cmsg_data) - (len(cmsg_data) % fds.itemsize)])
+
+    if len(fds) != _FD_COUNT:
+        for fd in fds:
+            os.close(fd)
+        raise RuntimeError("Expected %d file descriptors, got %d" % (_FD_COUNT, len(fds)))
+
+    while len(data) < _LENGTH.size:
+        data += _receive_exactly(connection, _LENGTH.size - len(data))
+    (size,) = _LENGTH.unpack(data[: _LENGTH.size])
+    payload = data[_LENGTH.size :]
+    if len(payload) < size:
+        payload += _receive_exactly(connection, size - len(payload))
+
+    from thonny.common import parse_message  # @UnresolvedImport
+
+    return parse_message(payload.decode("ASCII")), list(fds)
+
+
+def _receive_exactly(connection, size):
+    result = b""
+    while len(result) < size:
+        chunk = connection.recv(size - len(result))
+        if chunk == b"":
+            raise EOFError("Fork request was cut short")
+        result += chunk
+    return result
+
+
+def _prepare_child(request, fds):
+    # Existing sys.stdin, sys.stdout and sys.stderr start using the new pipes
+    for target_fd, fd in enumerate(fds):
+        os.dup2(fd, target_fd)
+        os.close(fd)
+
+    os.environ.clear()
+    os.environ.update(request["env"])
+    os.chdir(request["cwd"])
+    sys.argv[:] = request["argv"]
+
+
+def _reap_children(child_connections):
+    while child_connections:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            return
+
+        if pid == 0:
+            return
+
+        if os.WIFSIGNALED(status):
+            returncode = -os.WTERMSIG(status)
+        else:
+            returncode = os.WEXITSTATUS(status)
+
+        connection = child_connections.pop(pid, None)
+        if connection is not None:
+            try:
+                connection.sendall(b"exit %d\n" % returncode)
+            except OSError:
+                pass
+            connection.close()
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""
+Repr, which stops producing output when the length budget is exhausted.
+
+Gives the same text as repr for values whose repr fits into the budget (longer ones
+get truncated and "…" appended). Built-in containers are traversed only until the budget
+is exhausted or the time limit has passed. Numpy arrays and pandas data frames and series
+with many elements are described by a short summary. Other values are represented by their
+repr, but values whose type's repr has been too slow for a value of same or smaller length
+(or recently, for values without length) get described like object.__repr__ does.
+
+Used by the backend, so it must not import anything from the frontend.
+"""
+
+import sys
+import time
+import weakref
+
+ELLIPSIS = "…"
+
+# Ints with more bits get a summary (converting them to decimal is quadratic)
+_MAX_EXACT_INT_BITS = 10000
+# Arrays, data frames and series with more elements get a summary
+_MAX_FULL_REPR_SIZE = 1000
+# Types whose repr takes longer than this many seconds get a summary next time
+_SLOW_REPR_TIME = 0.05
+# Slow repr of a value without length affects its type for this many seconds
+_SLOW_REPR_EXPIRATION_TIME = 60
+# Containers are traversed until this many seconds have passed
+DEFAULT_TIME_LIMIT = 0.2
+
+# type => (length of the slow value or None, time of observation), doesn't keep the types alive
+_slow_reprs = weakref.WeakKeyDictionary()
+
+
+class _BudgetExhausted(Exception):
+    pass
+
+
+class _BoundedReprWriter:
+    def __init__(self, max_length, deadline):
+        self.parts = []
+        self.remaining = max_length
+        self.deadline = deadline
+        self.truncated = False
+        self._active_container_ids = set()
+
+    def write(self, text):
+        if len(text) > self.remaining:
+            self.parts.append(text[: self.remaining])
+            self.truncated = True
+            raise _BudgetExhausted()
+
+        self.parts.append(text)
+        self.remaining -= len(text)
+
+    def write_value(self, value):
+        value_type = type(value)
+        if value_type in (list, tuple, set, frozenset, dict):
+            self.write_container(value)
+        elif value_type in (str, bytes, bytearray):
+            self.write_sequence_prefix(value)
+        elif value_type is int:
+            if value.bit_length() > _MAX_EXACT_INT_BITS:
+                self.write("<int with about %d digits>" % int(value.bit_length() * 0.30103 + 1))
+            else:
+                self.write(repr(value))
+        elif value_type in (float, bool, type(None)):
+            self.write(repr(value))
+        elif not self.write_summary(value):
+            self.write_other(value)
+
+    def write_container(self, value):
+        value_type = type(value)
+        if id(value) in self._active_container_ids:
+            # same as built-in repr of recursive containers
+            self.write({list: "[...]", tuple: "(...)"}.get(value_type, "{...}"))
+            return
+
+        if value_type is list:
+            opening, closing = "[", "]"
+        elif value_type is tuple:
+            opening, closing = "(", ",)" if len(value) == 1 else ")"
+        elif value_type is dict:
+            opening, closing = "{", "}"
+        elif not value:
+            self.write(value_type.__name__ + "()")
+            return
+        elif value_type is set:
+            opening, closing = "{", "}"
+        else:
+            opening, closing = "frozenset({", "})"
+
+        self._active_container_ids.add(id(value))
+        try:
+            self.write(opening)
+            items = value.items() if value_type is dict else value
+            for i, item in enumerate(items):
+                if time.perf_counter() > self.deadline:
+                    self.truncated = True
+                    raise _BudgetExhausted()
+
+                if i > 0:
+                    self.write(", ")
+
+                if value_type is dict:
+                    self.write_value(item[0])
+                    self.write(": ")
+                    self.write_value(item[1])
+                else:
+                    self.write_value(item)
+            self.write(closing)
+        finally:
+            self._active_container_ids.discard(id(value))
+
+    def write_sequence_prefix(self, value):
+        # prefix is enough for exhausting the budget, as repr of it is at least as long
+        if len(value) > self.remaining:
+            value = value[: self.remaining]
+        self.write(repr(value))
+
+    def write_summary(self, value):
+        """Writes a summary of big numpy or pandas object, if value is one of these"""
+        numpy = sys.modules.get("numpy")
+        if numpy is not None and isinstance(value, numpy.ndarray):
+            if value.size > _MAX_FULL_REPR_SIZE:
+                self.write(
+                    "<%s shape=%s dtype=%s>" % (type(value).__name__, value.shape, value.dtype)
+                )
+                return True
+            return False
+
+        pandas = sys.modules.get("pandas")
+        if pandas is not None:
+            if isinstance(value, pandas.DataFrame) and value.size > _MAX_FULL_REPR_SIZE:
+                self.write("<%s shape=%s>" % (type(value).__name__, value.shape))
+                return True
+            elif isinstance(value, pandas.Series) and value.size > _MAX_FULL_REPR_SIZE:
+                self.write(
+                    "<%s name=%s length=%d dtype=%s>"
+                    % (type(value).__name__, value.name, len(value), value.dtype)
+                )
+                return True
+
+        return False
+
+    def write_other(self, value):
+        value_type = type(value)
+        length = _get_length(value)
+        if _is_repr_slow(value_type, length):
+            self.write(object.__repr__(value))
+            return
+
+        start_time = time.perf_counter()
+        rep = repr(value)
+        end_time = time.perf_counter()
+        if end_time - start_time > _SLOW_REPR_TIME:
+            _slow_reprs[value_type] = (length, end_time)
+        self.write(rep)
+
+
+def _get_length(value):
+    try:
+        return len(value)
+    except Exception:
+        return None
+
+
+def _is_repr_slow(value_type, length):
+    observation = _slow_reprs.get(value_type)
+    if observation is None:
+        return False
+
+    slow_length, observation_time = observation
+    if slow_length is None:
+        return time.perf_counter() - observation_time < _SLOW_REPR_EXPIRATION_TIME
+    else:
+        return length is not None and length >= slow_length
+
+
+def bounded_repr(value, max_length, time_limit=DEFAULT_TIME_LIMIT):
+    """Returns repr of the value truncated to max_length characters (plus "…"),
+    without computing the whole repr for big built-in containers and strings.
+
+    Exceptions raised by repr of the value or its parts are propagated."""
+    writer = _BoundedReprWriter(max_length, time.perf_counter() + time_limit)
+    try:
+        writer.write_value(value)
+    except _BudgetExhausted:
+        pass
+
+    result = "".join(writer.parts)
+    if writer.truncated:
+        result += ELLIPSIS
+    return result
@@ -3,17 +3,21 @@
 """
 Classes used both by front-end and back-end
 """
+import ast
 import os.path
 import platform
+import re
 import site
+import struct
 import sys
 import tokenize
 from collections import namedtuple
-from typing import List, Optional  # @UnusedImport
+from typing import List, Optional, Tuple  # @UnusedImport
 import subprocess
 import logging
 
 MESSAGE_MARKER = "\x02"
+BINARY_FRAME_MARKER = b"\x03"
 
 ValueInfo = namedtuple("ValueInfo", ["id", "repr"])
 FrameInfo = namedtuple(
@@ -24,6 +28,7 @@ FrameInfo = namedtuple(
         "module_name",
         "code_name",
         "source",
+        "source_hash",
         "lineno",
         "firstlineno",
         "in_library",
@@ -107,6 +112,75 @@ class Record:
         return hash(repr(self))
 
 
+def create_stack_delta(base_stack: List[FrameInfo], stack: List[FrameInfo]) -> list:
+    """Replaces frames which are present also in base_stack with dicts
+    containing only the fields which have changed.
+    
+    For locals and globals only changed and removed variables are given
+    (as <name>_changes and <name>_removed)"""
+    base_frames = {frame.id: frame for frame in base_stack}
+    result = []
+    for frame in stack:
+        base = base_frames.get(frame.id)
+        if base is None:
+            result.append(frame)
+        else:
+            result.append(_create_frame_delta(base, frame))
+    return result
+
+
+def _create_frame_delta(base: FrameInfo, frame: FrameInfo) -> dict:
+    delta = {"id": frame.id}
+    for name in FrameInfo._fields:
+        old = getattr(base, name)
+        new = getattr(frame, name)
+        if old is new:
+            continue
+        elif name in ("locals", "globals") and isinstance(old, dict) and isinstance(new, dict):
+            changes = {key: new[key] for key in new if old.get(key) != new[key]}
+            removed = [key for key in old if key not in new]
+            if changes:
+                delta[name + "_changes"] = changes
+            if removed:
+                delta[name + "_removed"] = removed
+        elif old != new:
+            delta[name] = new
+
+    return delta
+
+
+def apply_stack_delta(base_stack: List[FrameInfo], delta_stack: list) -> List[FrameInfo]:
+    """Reverse of create_stack_delta"""
+    base_frames = {frame.id: frame for frame in base_stack}
+    result = []
+    for item in delta_stack:
+        if isinstance(item, FrameInfo):
+            result.append(item)
+            continue
+
+        base = base_frames[item["id"]]
+        replacements = {}
+        for key in item:
+            if key in ("locals", "globals", "id"):
+                pass
+            elif key in FrameInfo._fields:
+                replacements[key] = item[key]
+
+        for name in ("locals", "globals"):
+            if name in item:
+                replacements[name] = item[name]
+            elif name + "_changes" in item or name + "_removed" in item:
+                variables = getattr(base, name).copy()
+                variables.update(item.get(name + "_changes", {}))
+                for key in item.get(name + "_removed", []):
+                    del variables[key]
+                replacements[name] = variables
+
+        result.append(base._replace(**replacements))
+
+    return result
+
+
 def range_contains_smaller(one: TextRange, other: TextRange) -> bool:
     this_start = (one.lineno, one.col_offset)
     this_end = (one.end_lineno, one.end_col_offset)
@@ -198,11 +272,436 @@ def serialize_message(msg: Record) -> str:
 
 
 def parse_message(msg_string: str) -> Record:
-    # DataFrames may have nan
-    # pylint: disable=unused-variable
-    nan = float("nan")  # @UnusedVariable
     assert msg_string[0] == MESSAGE_MARKER
-    return eval(msg_string[1:].encode("ASCII").decode("UTF-7"))
+    return decode_repr(msg_string[1:].encode("ASCII").decode("UTF-7").rstrip("\r\n"))
+
+
+class ReprDecodeError(ValueError):
+    pass
+
+
+_STRING_RE = re.compile(r"'[^'\\]*(?:\\.[^'\\]*)*'" + r'|"[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+_BYTES_RE = re.compile(r"b'(?:[^'\\]|\\.)*'" + r'|b"(?:[^"\\]|\\.)*"', re.DOTALL)
+_NUMBER_RE = re.compile(r"-?(?:inf\b|nan\b|\d+(\.\d*)?(e[-+]?\d+)?)")
+_NAME_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+_SPACE_RE = re.compile(r"\s*")
+
+_REPR_CONSTANTS = {
+    "None": None,
+    "True": True,
+    "False": False,
+    # DataFrames may have nan
+    "nan": float("nan"),
+    "inf": float("inf"),
+}
+
+
+def decode_repr(source: str):
+    """Decodes repr-s of the structures used in frontend-backend messages.
+    
+    Understands Record subclasses, ValueInfo, FrameInfo, TextRange, lists, tuples,
+    dicts, sets, strings, bytes, numbers (including nan and inf), True, False and None.
+    Unlike eval, it doesn't execute anything and raises ReprDecodeError
+    on unknown constructs."""
+    try:
+        value, pos = _decode_repr_value(source, _SPACE_RE.match(source, 0).end())
+    except (IndexError, TypeError) as e:
+        raise ReprDecodeError("Invalid message: " + str(e))
+
+    if pos != len(source):
+        raise ReprDecodeError("Extra data at %d" % pos)
+    return value
+
+
+def _decode_repr_value(s, pos):
+    c = s[pos]
+
+    if c == "'" or c == '"':
+        m = _STRING_RE.match(s, pos)
+        if m is None:
+            raise ReprDecodeError("Bad string at %d" % pos)
+        body = m.group()[1:-1]
+        if "\\" in body:
+            # make non-latin-1 characters escapes as well, so that
+            # unicode_escape can interpret everything
+            body = body.encode("latin-1", "backslashreplace").decode("unicode_escape")
+        return body, m.end()
+
+    elif c == "[":
+        items, pos = _decode_repr_items(s, pos + 1, "]")
+        return items, pos
+
+    elif c == "(":
+        items, pos = _decode_repr_items(s, pos + 1, ")")
+        return tuple(items), pos
+
+    elif c == "{":
+        return _decode_repr_dict_or_set(s, pos + 1)
+
+    elif c == "b" and pos + 1 < len(s) and s[pos + 1] in "'\"":
+        m = _BYTES_RE.match(s, pos)
+        if m is None:
+            raise ReprDecodeError("Bad bytes at %d" % pos)
+        return ast.literal_eval(m.group()), m.end()
+
+    elif c.isdigit() or c == "-":
+        m = _NUMBER_RE.match(s, pos)
+        if m is None:
+            raise ReprDecodeError("Bad number at %d" % pos)
+        text = m.group()
+        if m.group(1) is None and m.group(2) is None and "n" not in text:
+            return int(text), m.end()
+        else:
+            return float(text), m.end()
+
+    else:
+        m = _NAME_RE.match(s, pos)
+        if m is None:
+            raise ReprDecodeError("Unexpected character at %d" % pos)
+        name = m.group()
+        pos = m.end()
+        if pos < len(s) and s[pos] == "(":
+            return _decode_repr_call(s, pos + 1, name)
+        elif name in _REPR_CONSTANTS:
+            return _REPR_CONSTANTS[name], pos
+        else:
+            raise ReprDecodeError("Unknown name '%s'" % name)
+
+
+def _skip_repr_separator(s, pos, closing):
+    """Skips whitespace and comma after an item.
+    Returns position of next item or of closing bracket"""
+    pos = _SPACE_RE.match(s, pos).end()
+    if s[pos] == ",":
+        pos = _SPACE_RE.match(s, pos + 1).end()
+    elif s[pos] != closing:
+        raise ReprDecodeError("Expected ',' or '%s' at %d" % (closing, pos))
+    return pos
+
+
+def _decode_repr_items(s, pos, closing):
+    items = []
+    pos = _SPACE_RE.match(s, pos).end()
+    while s[pos] != closing:
+        item, pos = _decode_repr_value(s, pos)
+        items.append(item)
+        pos = _skip_repr_separator(s, pos, closing)
+    return items, pos + 1
+
+
+def _decode_repr_dict_or_set(s, pos):
+    pos = _SPACE_RE.match(s, pos).end()
+    if s[pos] == "}":
+        return {}, pos + 1
+
+    first, pos = _decode_repr_value(s, pos)
+    pos = _SPACE_RE.match(s, pos).end()
+    if s[pos] != ":":
+        # it's a set
+        pos = _skip_repr_separator(s, pos, "}")
+        items, pos = _decode_repr_items(s, pos, "}")
+        items.append(first)
+        return set(items), pos
+
+    result = {}
+    key = first
+    while True:
+        pos = _SPACE_RE.match(s, pos + 1).end()  # skip the colon
+        result[key], pos = _decode_repr_value(s, pos)
+        pos = _skip_repr_separator(s, pos, "}")
+        if s[pos] == "}":
+            return result, pos + 1
+        key, pos = _decode_repr_value(s, pos)
+        pos = _SPACE_RE.match(s, pos).end()
+        if s[pos] != ":":
+            raise ReprDecodeError("Expected ':' at %d" % pos)
+
+
+def _decode_repr_call(s, pos, name):
+    args = []
+    kwargs = {}
+    pos = _SPACE_RE.match(s, pos).end()
+    while s[pos] != ")":
+        m = _NAME_RE.match(s, pos)
+        if m is not None and s.startswith("=", m.end()):
+            kwargs[m.group()], pos = _decode_repr_value(s, m.end() + 1)
+        elif kwargs:
+            raise ReprDecodeError("Positional argument after keyword argument at %d" % pos)
+        else:
+            arg, pos = _decode_repr_value(s, pos)
+            args.append(arg)
+        pos = _skip_repr_separator(s, pos, ")")
+    pos += 1
+
+    if name in _RECORD_CLASSES and not args:
+        # Record's repr lists all attributes, __init__ is not needed
+        cls = _RECORD_CLASSES[name]
+        record = cls.__new__(cls)
+        record.__dict__.update(kwargs)
+        return record, pos
+    elif name in _NAMEDTUPLE_CLASSES:
+        return _NAMEDTUPLE_CLASSES[name](*args, **kwargs), pos
+    elif name == "set" and not kwargs and len(args) <= 1:
+        return set(*args), pos
+    elif name == "frozenset" and not kwargs and len(args) <= 1:
+        return frozenset(*args), pos
+    else:
+        raise ReprDecodeError("Can't construct '%s'" % name)
+
+
+_LENGTH = struct.Struct(">I")
+_INT64 = struct.Struct(">q")
+_FLOAT = struct.Struct(">d")
+
+_RECORD_CLASSES = {
+    cls.__name__: cls
+    for cls in [
+        Record,
+        InputSubmission,
+        CommandToBackend,
+        ToplevelCommand,
+        DebuggerCommand,
+        InlineCommand,
+        MessageFromBackend,
+        ToplevelResponse,
+        DebuggerResponse,
+        BackendEvent,
+        InlineResponse,
+    ]
+}
+
+_NAMEDTUPLE_CLASSES = {cls.__name__: cls for cls in [ValueInfo, FrameInfo, TextRange]}
+
+
+def _encode_none(value, out):
+    out.append(b"N")
+
+
+def _encode_bool(value, out):
+    out.append(b"T" if value else b"F")
+
+
+def _encode_int(value, out):
+    if -0x8000000000000000 <= value <= 0x7FFFFFFFFFFFFFFF:
+        out.append(b"i")
+        out.append(_INT64.pack(value))
+    else:
+        _encode_sized(b"I", str(int(value)).encode("ASCII"), out)
+
+
+def _encode_float(value, out):
+    out.append(b"f")
+    out.append(_FLOAT.pack(value))
+
+
+def _encode_str(value, out):
+    _encode_sized(b"s", value.encode("utf-8", "surrogatepass"), out)
+
+
+def _encode_bytes(value, out):
+    _encode_sized(b"y", bytes(value), out)
+
+
+def _encode_sized(tag, data, out):
+    out.append(tag)
+    out.append(_LENGTH.pack(len(data)))
+    out.append(data)
+
+
+def _encode_sequence(tag, value, out):
+    out.append(tag)
+    out.append(_LENGTH.pack(len(value)))
+    for item in value:
+        _encode_value(item, out)
+
+
+def _encode_dict(value, out):
+    out.append(b"d")
+    out.append(_LENGTH.pack(len(value)))
+    for key in value:
+        _encode_value(key, out)
+        _encode_value(value[key], out)
+
+
+def _encode_namedtuple(value, out):
+    _encode_sized(b"n", type(value).__name__.encode("ASCII"), out)
+    out.append(_LENGTH.pack(len(value)))
+    for item in value:
+        _encode_value(item, out)
+
+
+def _encode_record(value, out):
+    _encode_sized(b"r", type(value).__name__.encode("ASCII"), out)
+    _encode_dict(value.__dict__, out)
+
+
+_ENCODERS = {
+    type(None): _encode_none,
+    bool: _encode_bool,
+    int: _encode_int,
+    float: _encode_float,
+    str: _encode_str,
+    bytes: _encode_bytes,
+    list: lambda value, out: _encode_sequence(b"l", value, out),
+    tuple: lambda value, out: _encode_sequence(b"t", value, out),
+    set: lambda value, out: _encode_sequence(b"e", value, out),
+    frozenset: lambda value, out: _encode_sequence(b"e", value, out),
+    dict: _encode_dict,
+}
+_ENCODERS.update({cls: _encode_namedtuple for cls in _NAMEDTUPLE_CLASSES.values()})
+_ENCODERS.update({cls: _encode_record for cls in _RECORD_CLASSES.values()})
+
+
+def _encode_value(value, out):
+    encoder = _ENCODERS.get(type(value))
+    if encoder is not None:
+        encoder(value, out)
+    elif isinstance(value, Record) and type(value).__name__ in _RECORD_CLASSES:
+        _encode_record(value, out)
+    elif isinstance(value, int):
+        _encode_int(value, out)
+    elif isinstance(value, float):
+        _encode_float(value, out)
+    elif isinstance(value, str):
+        _encode_str(str(value), out)
+    elif isinstance(value, (bytes, bytearray)):
+        _encode_bytes(value, out)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        _ENCODERS[type(value).__mro__[-2]](value, out)
+    elif isinstance(value, dict):
+        _encode_dict(value, out)
+    else:
+        raise TypeError("Can't serialize value of type " + type(value).__name__)
+
+
+def _decode_value(data, pos):
+    tag = data[pos]
+    return _DECODERS[tag](data, pos + 1)
+
+
+def _decode_sized(data, pos):
+    (size,) = _LENGTH.unpack_from(data, pos)
+    start = pos + 4
+    return data[start : start + size], start + size
+
+
+def _decode_str(data, pos):
+    raw, pos = _decode_sized(data, pos)
+    return raw.decode("utf-8", "surrogatepass"), pos
+
+
+def _decode_bytes(data, pos):
+    raw, pos = _decode_sized(data, pos)
+    return bytes(raw), pos
+
+
+def _decode_big_int(data, pos):
+    raw, pos = _decode_sized(data, pos)
+    return int(raw), pos
+
+
+def _decode_items(data, pos):
+    (count,) = _LENGTH.unpack_from(data, pos)
+    pos += 4
+    items = []
+    for _ in range(count):
+        item, pos = _decode_value(data, pos)
+        items.append(item)
+    return items, pos
+
+
+def _decode_tuple(data, pos):
+    items, pos = _decode_items(data, pos)
+    return tuple(items), pos
+
+
+def _decode_set(data, pos):
+    items, pos = _decode_items(data, pos)
+    return set(items), pos
+
+
+def _decode_dict(data, pos):
+    (count,) = _LENGTH.unpack_from(data, pos)
+    pos += 4
+    result = {}
+    for _ in range(count):
+        key, pos = _decode_value(data, pos)
+        result[key], pos = _decode_value(data, pos)
+    return result, pos
+
+
+def _decode_namedtuple(data, pos):
+    name, pos = _decode_sized(data, pos)
+    cls = _NAMEDTUPLE_CLASSES.get(name.decode("ASCII"))
+    if cls is None:
+        raise ValueError("Unknown namedtuple type: %r" % name)
+    items, pos = _decode_items(data, pos)
+    return cls(*items), pos
+
+
+def _decode_record(data, pos):
+    name, pos = _decode_sized(data, pos)
+    cls = _RECORD_CLASSES.get(name.decode("ASCII"))
+    if cls is None:
+        raise ValueError("Unknown record type: %r" % name)
+    if data[pos] != ord("d"):
+        raise ValueError("Bad record attributes")
+    attributes, pos = _decode_dict(data, pos + 1)
+    # bypass __init__, the attributes contain everything
+    record = cls.__new__(cls)
+    record.__dict__.update(attributes)
+    return record, pos
+
+
+_DECODERS = {
+    ord("N"): lambda data, pos: (None, pos),
+    ord("T"): lambda data, pos: (True, pos),
+    ord("F"): lambda data, pos: (False, pos),
+    ord("i"): lambda data, pos: (_INT64.unpack_from(data, pos)[0], pos + 8),
+    ord("I"): _decode_big_int,
+    ord("f"): lambda data, pos: (_FLOAT.unpack_from(data, pos)[0], pos + 8),
+    ord("s"): _decode_str,
+    ord("y"): _decode_bytes,
+    ord("l"): _decode_items,
+    ord("t"): _decode_tuple,
+    ord("e"): _decode_set,
+    ord("d"): _decode_dict,
+    ord("n"): _decode_namedtuple,
+    ord("r"): _decode_record,
+}
+
+
+def serialize_binary_message(msg) -> bytes:
+    """Returns a length-prefixed frame with compact typed encoding of the message.
+    
+    Unlike serialize_message, the result doesn't depend on repr-s and can be
+    decoded without eval."""
+    out = []
+    _encode_value(msg, out)
+    payload = b"".join(out)
+    return BINARY_FRAME_MARKER + _LENGTH.pack(len(payload)) + payload
+
+
+def parse_binary_message(payload: bytes):
+    """Decodes the payload of a frame (ie. the part after marker and length)"""
+    value, pos = _decode_value(payload, 0)
+    if pos != len(payload):
+        raise ValueError("Extra data after message")
+    return value
+
+
+def parse_binary_frame_header(header: bytes) -> int:
+    """Takes marker and length bytes of a frame, returns the length of the payload"""
+    assert header[:1] == BINARY_FRAME_MARKER
+    return _LENGTH.unpack_from(header, 1)[0]
+
+
+BINARY_FRAME_HEADER_SIZE = 1 + _LENGTH.size
+
+
+def format_startup_phases(phases: List[Tuple[str, float]]) -> str:
+    """Formats backend's startup phases (name, seconds) for logging"""
+    return ", ".join("%s %.1f ms" % (name, duration * 1000) for name, duration in phases)
 
 
 def normpath_with_actual_case(name: str) -> str:
@@ -2,8 +2,6 @@ import math
 import tkinter as tk
 from tkinter import ttk
 
-from thonny import get_workbench
-
 
 class GridTable(tk.Frame):
     def __init__(self, master, header_rows, data_row_count, footer_row_count, frozen_column_count):
@@ -39,7 +37,7 @@ class GridTable(tk.Frame):
     def update_header_rows(self):
         for row_no in range(self.header_row_count):
             for col_no in range(self.column_count):
-                w = self.get_header_widget(self.screen_row_count, col_no)
+                w = self.get_header_widget(row_no, col_no)
                 w.grid(row=row_no, column=col_no, sticky="nsew", pady=(0, 1), padx=(0, 1))
                 w.configure(text=self.get_header_value(row_no, col_no))
 
@@ -160,7 +158,6 @@ class ScrollableGridTable(ttk.Frame):
         # set up scrolling with canvas
         hscrollbar = ttk.Scrollbar(self, orient=tk.HORIZONTAL)
         self.canvas = tk.Canvas(self, bd=0, highlightthickness=0, xscrollcommand=hscrollbar.set)
-        get_workbench().bind_all("<Control-r>", self.debug)
         self.create_infopanel(data_row_count)
         hscrollbar.config(command=self.canvas.xview)
         self.canvas.xview_moveto(0)
@@ -186,13 +183,18 @@ class ScrollableGridTable(ttk.Frame):
         self.bind("<Configure>", self._configure_interior, True)
         self.bind("<Expose>", self._on_expose, True)
 
-        self.grid_table = GridTable(
+        self.grid_table = self.create_grid_table(
             self.interior, header_rows, data_row_count, footer_row_count, frozen_column_count
         )
         self.grid_table.grid(row=0, column=0, sticky=tk.NSEW)
 
         self._update_vertical_scrollbar()
 
+    def create_grid_table(
+        self, master, header_rows, data_row_count, footer_row_count, frozen_column_count
+    ):
+        return GridTable(master, header_rows, data_row_count, footer_row_count, frozen_column_count)
+
     def debug(self, event=None):
         print("DE", self.vscrollbar.get())
 
@@ -202,6 +204,10 @@ class ScrollableGridTable(ttk.Frame):
         self.size_label.grid(row=0, column=0, padx=5)
 
     def _update_vertical_scrollbar(self):
+        if self.grid_table.data_row_count == 0:
+            self.vscrollbar.set(0.0, 1.0)
+            return
+
         first = self.grid_table.first_visible_data_row_no / self.grid_table.data_row_count
         last = first + self.grid_table.visible_data_row_count / self.grid_table.data_row_count
         # print(first, last, self.grid_table.visible_data_row_count)
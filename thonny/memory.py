@@ -1,10 +1,11 @@
 # -*- coding: utf-8 -*-
 
+import math
 import tkinter as tk
 import tkinter.font as tk_font
 
-from thonny import get_workbench, ui_utils
-from thonny.common import ValueInfo
+from thonny import get_runner, get_workbench, ui_utils
+from thonny.common import InlineCommand, ValueInfo
 from thonny.ui_utils import TreeFrame
 
 MAX_REPR_LENGTH_IN_GRID = 100
@@ -45,7 +46,249 @@ class MemoryFrame(TreeFrame):
             get_workbench().event_generate("ObjectSelect", object_id=object_id)
 
 
+class PagedMemoryFrame(MemoryFrame):
+    """MemoryFrame for potentially long lists of rows, which get fetched from
+    the backend by pages.
+
+    The tree contains only the rows which fit into the visible area, the
+    scrollbar represents the position in the whole list. Subclasses send the
+    requests in request_rows and pass received pages to set_rows.
+    """
+
+    def __init__(self, master, columns):
+        MemoryFrame.__init__(self, master, columns)
+
+        self.total_count = 0
+        self.first_row_no = 0
+        self._visible_count = 1
+        self._rows = {}  # row no => tuple of column values
+        self._requested_range = None
+        self._request_after_id = None
+
+        self.tree.configure(yscrollcommand="")
+        self.vert_scrollbar["command"] = self._on_vertical_scroll
+        self.tree.bind("<Configure>", self._on_tree_configure, True)
+        self.tree.bind("<MouseWheel>", self._on_mouse_wheel, True)
+        self.tree.bind("<Button-4>", self._on_mouse_wheel, True)
+        self.tree.bind("<Button-5>", self._on_mouse_wheel, True)
+        self.tree.bind("<Up>", self._on_up, True)
+        self.tree.bind("<Down>", self._on_down, True)
+        self.tree.bind("<Prior>", lambda e: self._scroll_by(-self._visible_count), True)
+        self.tree.bind("<Next>", lambda e: self._scroll_by(self._visible_count), True)
+
+    def request_rows(self, offset, limit):
+        raise NotImplementedError()
+
+    def set_rows(self, offset, total_count, rows):
+        """Stores received rows and shows the ones in visible range"""
+        if total_count != self.total_count:
+            self.total_count = total_count
+            self._rows = {}
+
+        for i, row in enumerate(rows):
+            self._rows[offset + i] = row
+
+        self._requested_range = None
+        if self.first_row_no > max(self.total_count - self._visible_count, 0):
+            self.scroll_to(self.total_count)
+        else:
+            self._update_screen()
+
+    def refresh(self):
+        """Forgets fetched rows and requests visible ones again"""
+        self.forget_rows()
+        self._schedule_request()
+
+    def forget_rows(self):
+        """Forgets fetched rows, so that they get requested again when needed"""
+        self._rows = {}
+        self._requested_range = None
+
+    def clear(self):
+        self.reset()
+
+    def reset(self):
+        self.total_count = 0
+        self.first_row_no = 0
+        self._rows = {}
+        self._requested_range = None
+        self._update_screen()
+
+    def scroll_to(self, row_no):
+        self.first_row_no = max(min(row_no, self.total_count - self._visible_count), 0)
+        self._update_screen()
+
+    def get_selected_row_no(self):
+        iid = self.tree.focus()
+        if iid == "":
+            return None
+        else:
+            return self.first_row_no + self.tree.index(iid)
+
+    def _scroll_by(self, amount):
+        self.scroll_to(self.first_row_no + amount)
+        return "break"
+
+    def _update_screen(self):
+        visible_range = range(
+            self.first_row_no, min(self.first_row_no + self._visible_count, self.total_count)
+        )
+
+        # reuse the items in the tree
+        items = self.tree.get_children()
+        for iid in items[len(visible_range) :]:
+            self.tree.delete(iid)
+        for _ in range(len(items), len(visible_range)):
+            self.tree.insert("", "end")
+
+        missing = False
+        for iid, row_no in zip(self.tree.get_children(), visible_range):
+            if row_no in self._rows:
+                values = self._rows[row_no]
+            else:
+                values = [""] * len(self.tree["columns"])
+                missing = True
+
+            if tuple(self.tree.item(iid, "values")) != tuple(values):
+                self.tree.item(iid, values=values)
+
+        if missing:
+            self._schedule_request()
+
+        if self.total_count:
+            self.vert_scrollbar.set(
+                self.first_row_no / self.total_count,
+                (self.first_row_no + len(visible_range)) / self.total_count,
+            )
+        else:
+            self.vert_scrollbar.set(0.0, 1.0)
+
+    def _schedule_request(self):
+        # coalesce requests caused by fast scrolling
+        if self._request_after_id is None:
+            self._request_after_id = self.after(20, self._request_visible_rows)
+
+    def _request_visible_rows(self):
+        self._request_after_id = None
+        # fetch also next and previous screenfuls to make scrolling smoother
+        offset = max(self.first_row_no - self._visible_count, 0)
+        limit = self._visible_count * 3
+        if self._requested_range != (offset, limit):
+            self._requested_range = (offset, limit)
+            self.request_rows(offset, limit)
+
+    def _on_tree_configure(self, event):
+        row_height = int(ui_utils.lookup_style_option("Treeview", "rowheight", 20))
+        # one row is taken by headings
+        visible_count = max(event.height // row_height - 1, 1)
+        if visible_count != self._visible_count:
+            self._visible_count = visible_count
+            self.scroll_to(self.first_row_no)
+
+    def _on_vertical_scroll(self, *args):
+        if args[0] == "scroll":
+            amount = int(args[1])
+            if args[2] == "pages":
+                amount *= self._visible_count
+            self._scroll_by(amount)
+        else:
+            assert args[0] == "moveto"
+            pos = max(min(float(args[1]), 1.0), 0.0)
+            self.scroll_to(math.floor(pos * self.total_count))
+
+    def _on_mouse_wheel(self, event):
+        if event.num == 4 or event.delta > 0:
+            return self._scroll_by(-3)
+        else:
+            return self._scroll_by(3)
+
+    def _on_up(self, event):
+        items = self.tree.get_children()
+        if items and self.tree.focus() == items[0] and self.first_row_no > 0:
+            self._scroll_by(-1)
+            self._reselect(items[0])
+            return "break"
+
+    def _on_down(self, event):
+        items = self.tree.get_children()
+        if (
+            items
+            and self.tree.focus() == items[-1]
+            and self.first_row_no + len(items) < self.total_count
+        ):
+            self._scroll_by(1)
+            self._reselect(items[-1])
+            return "break"
+
+    def _reselect(self, iid):
+        # row in the same position on screen has new content
+        self.tree.selection_set(iid)
+        self.on_select(None)
+
+
+class TreeRows:
+    """Keeps the rows of a tree equal to given rows by modifying only the rows of added,
+    removed or changed items. Rows with changed values get tagged "changed".
+    """
+
+    def __init__(self, tree):
+        self._tree = tree
+        self._items = {}  # (group title, name) => item id; name is None for group title rows
+        self._item_values = {}  # item id => (id, value) shown in the row
+
+    def update(self, rows):
+        """Rows are (key, name, id, value), key is (group title, name)
+        or (group title, None) for group title rows"""
+        new_keys = {row[0] for row in rows}
+        removed_iids = [iid for key, iid in self._items.items() if key not in new_keys]
+        if removed_iids:
+            self._tree.delete(*removed_iids)
+            for iid in removed_iids:
+                del self._item_values[iid]
+
+        new_items = {}
+        for key, name, id_str, description in rows:
+            values = (id_str, description)
+            iid = self._items.get(key)
+            if iid is None:
+                tags = ("group_title",) if key[1] is None else ("item",)
+                iid = self._tree.insert("", "end", values=(name, id_str, description), tags=tags)
+            elif key[1] is not None:
+                if values != self._item_values[iid]:
+                    self._tree.item(
+                        iid, values=(name, id_str, description), tags=("item", "changed")
+                    )
+                elif self._tree.tag_has("changed", iid):
+                    self._tree.item(iid, tags=("item",))
+
+            new_items[key] = iid
+            self._item_values[iid] = values
+
+        self._items = new_items
+
+        # new rows were added to the end, move them and the rows after them to right places
+        current_order = self._tree.get_children()
+        for i, key in enumerate(row[0] for row in rows):
+            if current_order[i] != new_items[key]:
+                for j in range(i, len(rows)):
+                    self._tree.move(new_items[rows[j][0]], "", j)
+                break
+
+    def clear(self):
+        children = self._tree.get_children()
+        if children:
+            self._tree.delete(*children)
+        self._items = {}
+        self._item_values = {}
+
+
 class VariablesFrame(MemoryFrame):
+    """Shows variables grouped under optional titles.
+
+    Successive updates modify only the rows of added, removed or changed variables,
+    so that selection and scroll position are kept. Changed values get highlighted.
+    """
+
     def __init__(self, master):
         MemoryFrame.__init__(self, master, ("name", "id", "value"))
 
@@ -57,6 +300,12 @@ class VariablesFrame(MemoryFrame):
         self.tree.heading("id", text="Value ID", anchor=tk.W)
         self.tree.heading("value", text="Value", anchor=tk.W)
 
+        self._rows = TreeRows(self.tree)
+        self._pending_variables = None
+        self._update_after_id = None
+        # backend keeps the values of displayed ids, so that they can be inspected
+        self._pinned_ids = set()
+
         get_workbench().bind("ShowView", self._update_memory_model, True)
         get_workbench().bind("HideView", self._update_memory_model, True)
         self._update_memory_model()
@@ -65,8 +314,11 @@ class VariablesFrame(MemoryFrame):
             font="BoldTkDefaultFont",
             background=ui_utils.lookup_style_option(".", "background"),
         )
+        self.tree.tag_configure("changed", font="BoldTkDefaultFont")
 
     def destroy(self):
+        self._cancel_pending_update()
+        self._pin_displayed_objects(set())
         MemoryFrame.destroy(self)
         get_workbench().unbind("ShowView", self._update_memory_model)
         get_workbench().unbind("HideView", self._update_memory_model)
@@ -82,35 +334,69 @@ class VariablesFrame(MemoryFrame):
             # self.tree.columnconfigure(2, weight=1, width=400)
 
     def update_variables(self, all_variables):
-        self._clear_tree()
+        # Debugger may send several updates in quick succession, only the last one
+        # needs to be shown
+        self._pending_variables = all_variables
+        if self._update_after_id is None:
+            self._update_after_id = self.after_idle(self._apply_pending_update)
 
-        if not all_variables:
-            return
+    def _cancel_pending_update(self):
+        if self._update_after_id is not None:
+            self.after_cancel(self._update_after_id)
+            self._update_after_id = None
+        self._pending_variables = None
+
+    def _apply_pending_update(self):
+        self._update_after_id = None
+        all_variables = self._pending_variables
+        self._pending_variables = None
 
-        if isinstance(all_variables, list):
+        if not all_variables:
+            groups = []
+        elif isinstance(all_variables, list):
             groups = all_variables
         else:
             groups = [("", all_variables)]
 
+        rows = []  # (key, name, id, value)
+        ids = set()
         for group_title, variables in groups:
             if group_title:
-                node_id = self.tree.insert("", "end", tags=("group_title",))
-                self.tree.set(node_id, "name", group_title)
+                rows.append(((group_title, None), group_title, "", ""))
 
             for name in sorted(variables.keys()):
-
                 if not name.startswith("__"):
-                    node_id = self.tree.insert("", "end", tags="item")
-                    self.tree.set(node_id, "name", name)
                     if isinstance(variables[name], ValueInfo):
                         description = variables[name].repr
                         id_str = variables[name].id
+                        ids.add(id_str)
                     else:
                         description = variables[name]
                         id_str = None
 
-                    self.tree.set(node_id, "id", format_object_id(id_str))
-                    self.tree.set(node_id, "value", description)
+                    rows.append(((group_title, name), name, format_object_id(id_str), description))
+
+        self._rows.update(rows)
+        self._pin_displayed_objects(ids)
+
+    def _pin_displayed_objects(self, ids):
+        if ids == self._pinned_ids:
+            return
+
+        self._pinned_ids = ids
+        if get_runner() is not None:
+            get_runner().send_command(
+                InlineCommand(
+                    "set_pinned_objects",
+                    owner="VariablesFrame " + str(self),
+                    object_ids=sorted(ids),
+                )
+            )
+
+    def _clear_tree(self):
+        self._cancel_pending_update()
+        self._rows.clear()
+        self._pin_displayed_objects(set())
 
     def on_select(self, event):
         self.show_selected_object_info()
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+Static metadata of plug-ins, which allows Workbench to register them
+without importing their modules.
+
+A plug-in module may declare what it contributes to Workbench in a module-level
+dict literal called plugin_manifest, eg:
+
+    plugin_manifest = {
+        "defaults": {"assistance.use_pylint": True},
+        "views": [{"class": "HeapView", "label": "Heap", "default_location": "e"}],
+        "commands": [
+            {
+                "command_id": "backendpipgui",
+                "menu_name": "tools",
+                "command_label": "Manage packages...",
+                "handler": "open_backend_pip_gui",
+                "required_backend_feature": "pip_gui",
+                "group": 80,
+            }
+        ],
+        "program_analyzers": ["PylintAnalyzer"],
+        "content_inspectors": ["TabularDataInspector"],
+    }
+
+Views, commands, program analyzers and content inspectors take the arguments of corresponding Workbench
+methods, but classes and functions are given by their names in the plug-in module.
+They get registered as DeferredPluginObject-s, which import the module when
+they are called for the first time. Labels and captions get translated during
+registration. A tester given by name imports the module as soon as the menu gets
+prepared, therefore commands may use "required_backend_feature" instead, which
+enables the command only when current backend supports given feature.
+Optional "load_order_key" has the same meaning as in regular plug-ins.
+load_plugin of a module with manifest doesn't get called.
+
+Manifests are read without executing the modules and cached in THONNY_USER_DIR,
+keyed by modification times and sizes of module files.
+"""
+
+import ast
+import importlib
+import logging
+import os.path
+import sys
+from typing import Any, Callable, Dict, Optional  # pylint: disable=unused-import
+
+import thonny
+
+MANIFEST_NAME = "plugin_manifest"
+_CACHE_VERSION = 1
+
+
+class DeferredPluginObject:
+    """Stands for a class or function of a plug-in module, which hasn't been imported yet"""
+
+    def __init__(self, module_name: str, attribute_name: str) -> None:
+        # Workbench uses __name__ of view classes as view id-s
+        self.__name__ = attribute_name
+        self.module_name = module_name
+
+    def resolve(self) -> Any:
+        if self.module_name not in sys.modules:
+            logging.info("Importing deferred plug-in %s", self.module_name)
+        return getattr(importlib.import_module(self.module_name), self.__name__)
+
+    def __call__(self, *args, **kwargs):
+        return self.resolve()(*args, **kwargs)
+
+    def __repr__(self):
+        return "<deferred %s.%s>" % (self.module_name, self.__name__)
+
+
+def create_backend_feature_tester(feature: str) -> Callable[[], bool]:
+    def tester():
+        runner = thonny.get_runner()
+        return runner is not None and feature in runner.get_supported_features()
+
+    return tester
+
+
+class ManifestCache:
+    def __init__(self, path: str) -> None:
+        self._path = path
+        self._entries = {}  # type: Dict[str, Any]
+        self._used_entries = {}  # type: Dict[str, Any]
+
+        try:
+            with open(path, encoding="utf-8") as fp:
+                content = ast.literal_eval(fp.read())
+            if content.get("version") == _CACHE_VERSION:
+                self._entries = content["modules"]
+        except FileNotFoundError:
+            pass
+        except Exception:
+            logging.exception("Could not read plug-in manifest cache")
+
+    def get_manifest(self, module_info) -> Optional[Dict[str, Any]]:
+        """Returns the manifest for a module found by pkgutil.iter_modules
+        or None if the module doesn't have it (or it can't be read without importing)"""
+        module_finder, module_name, is_pkg = module_info
+        if not hasattr(module_finder, "path"):
+            # eg. zipimporter
+            return None
+
+        short_name = module_name.split(".")[-1]
+        if is_pkg:
+            file_path = os.path.join(module_finder.path, short_name, "__init__.py")
+        else:
+            file_path = os.path.join(module_finder.path, short_name + ".py")
+
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            # eg. extension module
+            return None
+
+        key = [stat.st_mtime, stat.st_size]
+        entry = self._entries.get(file_path)
+        if entry is None or entry[0] != key:
+            entry = [key, read_manifest(file_path)]
+
+        self._used_entries[file_path] = entry
+        return entry[1]
+
+    def save(self) -> None:
+        if self._used_entries == self._entries:
+            return
+
+        try:
+            with open(self._path, "w", encoding="utf-8") as fp:
+                fp.write(repr({"version": _CACHE_VERSION, "modules": self._used_entries}))
+        except Exception:
+            logging.exception("Could not save plug-in manifest cache")
+
+
+def read_manifest(file_path: str) -> Optional[Dict[str, Any]]:
+    with open(file_path, "rb") as fp:
+        source = fp.read()
+
+    # avoid parsing modules which obviously don't have a manifest
+    if MANIFEST_NAME.encode("ASCII") not in source:
+        return None
+
+    try:
+        root = ast.parse(source, file_path)
+    except SyntaxError:
+        # let import report the problem
+        return None
+
+    for node in root.body:
+        if (
+            isinstance(node, ast.Assign)
+            and len(node.targets) == 1
+            and isinstance(node.targets[0], ast.Name)
+            and node.targets[0].id == MANIFEST_NAME
+        ):
+            try:
+                return ast.literal_eval(node.value)
+            except ValueError:
+                logging.warning("Manifest in %s is not a literal", file_path)
+                return None
+
+    return None
@@ -151,5 +151,4 @@ def _find_closest_containing_node(tree, text_range):
         return None
 
 
-def load_plugin() -> None:
-    get_workbench().add_view(AstView, _("AST"), "s")
+plugin_manifest = {"views": [{"class": "AstView", "label": "AST", "default_location": "s"}]}
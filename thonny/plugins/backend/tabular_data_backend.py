@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+Provides object inspector with shapes, data types, summary statistics and windows of rows
+of numpy arrays and pandas data frames and series. Values never get serialized in full.
+
+numpy and pandas don't get imported here -- values can be of their types only
+if user's program has imported them already.
+"""
+import sys
+import warnings
+
+from thonny.backend import get_vm
+from thonny.bounded_repr import bounded_repr
+from thonny.common import InlineResponse
+
+# this many first rows get sent with object info, others get requested when scrolled into view
+_INITIAL_WINDOW_SIZE = 50
+# only this many first columns get shown
+_MAX_COLUMNS = 100
+_MAX_CELL_LENGTH = 100
+
+
+def _get_kind(value):
+    numpy = sys.modules.get("numpy")
+    if numpy is not None and isinstance(value, numpy.ndarray):
+        return "ndarray" if value.ndim in (1, 2) else None
+
+    pandas = sys.modules.get("pandas")
+    if pandas is not None:
+        if isinstance(value, pandas.DataFrame):
+            return "DataFrame"
+        elif isinstance(value, pandas.Series):
+            return "Series"
+
+    return None
+
+
+def _get_shown_part(value, kind):
+    """Returns the part of the value, which can be shown as a table"""
+    if kind == "ndarray":
+        if value.ndim == 1:
+            return value.reshape(-1, 1)
+        else:
+            return value[:, :_MAX_COLUMNS]
+    elif kind == "DataFrame":
+        return value.iloc[:, :_MAX_COLUMNS]
+    else:
+        return value.to_frame()
+
+
+def _format_cell(value):
+    numpy = sys.modules.get("numpy")
+    if numpy is not None and isinstance(value, numpy.generic):
+        # numpy scalar types have verbose reprs
+        value = value.item()
+
+    if isinstance(value, str):
+        if len(value) > _MAX_CELL_LENGTH:
+            return value[:_MAX_CELL_LENGTH] + "…"
+        return value
+    else:
+        return bounded_repr(value, _MAX_CELL_LENGTH)
+
+
+def _get_window(value, kind, offset, limit):
+    table = _get_shown_part(value, kind)
+    if kind == "ndarray":
+        rows = table[offset : offset + limit].tolist()
+        index = [str(i) for i in range(offset, offset + len(rows))]
+    else:
+        part = table.iloc[offset : offset + limit]
+        rows = part.values.tolist()
+        index = [_format_cell(label) for label in part.index]
+
+    return {
+        "offset": offset,
+        "index": index,
+        "rows": [[_format_cell(cell) for cell in row] for row in rows],
+    }
+
+
+def _compute_stats(value, kind):
+    """Returns min, max, mean and NaN count (as strings) of each shown column
+    ("" for non-numeric columns)"""
+    table = _get_shown_part(value, kind)
+    column_count = table.shape[1]
+    result = {name: [""] * column_count for name in ["min", "max", "mean", "nan_count"]}
+
+    with warnings.catch_warnings():
+        # eg. all-NaN columns
+        warnings.simplefilter("ignore")
+
+        if kind == "ndarray":
+            numpy = sys.modules["numpy"]
+            if table.shape[0] == 0 or not (
+                numpy.issubdtype(table.dtype, numpy.integer)
+                or numpy.issubdtype(table.dtype, numpy.floating)
+            ):
+                return result
+
+            stats = {
+                "min": numpy.nanmin(table, axis=0),
+                "max": numpy.nanmax(table, axis=0),
+                "mean": numpy.nanmean(table, axis=0),
+                "nan_count": numpy.isnan(table).sum(axis=0)
+                if numpy.issubdtype(table.dtype, numpy.floating)
+                else numpy.zeros(column_count, dtype=int),
+            }
+            for name in stats:
+                result[name] = [_format_cell(x) for x in stats[name].tolist()]
+        else:
+            pandas = sys.modules["pandas"]
+            nan_counts = table.isna().sum().tolist()
+            for i in range(column_count):
+                column = table.iloc[:, i]
+                result["nan_count"][i] = str(nan_counts[i])
+                if pandas.api.types.is_numeric_dtype(column) and not (
+                    pandas.api.types.is_bool_dtype(column)
+                ):
+                    result["min"][i] = _format_cell(column.min())
+                    result["max"][i] = _format_cell(column.max())
+                    result["mean"][i] = _format_cell(column.mean())
+
+    return result
+
+
+def tweak_object_info(value, info, cmd):
+    kind = _get_kind(value)
+    if kind is None:
+        return
+
+    table = _get_shown_part(value, kind)
+    if kind == "ndarray":
+        columns = [str(i) for i in range(table.shape[1])] if value.ndim == 2 else [""]
+        dtypes = [str(value.dtype)] * table.shape[1]
+    else:
+        columns = [_format_cell(name) for name in table.columns]
+        dtypes = [str(dtype) for dtype in table.dtypes]
+
+    info["tabular"] = {
+        "kind": kind,
+        "shape": tuple(value.shape),
+        "row_count": table.shape[0],
+        "column_count": value.shape[1] if value.ndim == 2 else 1,
+        "columns": columns,
+        "dtypes": dtypes,
+        "window": _get_window(value, kind, 0, _INITIAL_WINDOW_SIZE),
+    }
+
+
+def _cmd_get_tabular_window(cmd):
+    try:
+        value = get_vm().get_exported_value(cmd.object_id)
+    except KeyError:
+        return InlineResponse("get_tabular_window", object_id=cmd.object_id, error="not available")
+
+    return InlineResponse(
+        "get_tabular_window",
+        object_id=cmd.object_id,
+        window=_get_window(value, _get_kind(value), cmd.offset, cmd.limit),
+    )
+
+
+def _cmd_get_tabular_stats(cmd):
+    try:
+        value = get_vm().get_exported_value(cmd.object_id)
+    except KeyError:
+        return InlineResponse("get_tabular_stats", object_id=cmd.object_id, error="not available")
+
+    return InlineResponse(
+        "get_tabular_stats", object_id=cmd.object_id, stats=_compute_stats(value, _get_kind(value))
+    )
+
+
+def load_plugin():
+    vm = get_vm()
+    vm.add_object_info_tweaker(tweak_object_info)
+    vm.add_command("get_tabular_window", _cmd_get_tabular_window)
+    vm.add_command("get_tabular_stats", _cmd_get_tabular_stats)
@@ -31,6 +31,10 @@ class Debugger:
         self._last_progress_message = None
         self._last_brought_out_frame_id = None
         self._editor_context_menu = None
+        # Backend announces each source only once per toplevel command
+        # and frames in DebuggerResponse-s refer to them by hash.
+        # A Debugger lives for one toplevel command, so the cache gets evicted together with it
+        self._sources_by_hash = {}
 
     def check_issue_command(self, command, **kwargs):
         cmd = DebuggerCommand(command, **kwargs)
@@ -69,6 +73,8 @@ class Debugger:
             return (
                 self._last_progress_message
                 and self._last_progress_message["tracer_class"] == "NiceTracer"
+                # older states may have been dropped
+                and self._last_progress_message.get("past_state_count", 1) > 0
             )
         else:
             return True
@@ -76,6 +82,15 @@ class Debugger:
     def handle_debugger_progress(self, msg):
         self._last_brought_out_frame_id = None
 
+    def handle_source_announcement(self, msg):
+        self._sources_by_hash[msg["source_hash"]] = msg["source"]
+
+    def get_frame_source(self, frame_info):
+        if frame_info.source is not None or frame_info.source_hash is None:
+            return frame_info.source
+        else:
+            return self._sources_by_hash[frame_info.source_hash]
+
     def handle_debugger_return(self, msg):
         pass
 
@@ -322,6 +337,7 @@ class FrameVisualizer:
         self._text_frame = text_frame
         self._text = text_frame.text
         self._frame_info = frame_info
+        self._source = _current_debugger.get_frame_source(frame_info)
         self._frame_id = frame_info.id
         self._filename = frame_info.filename
         self._firstlineno = None
@@ -841,7 +857,7 @@ class DialogVisualizer(tk.Toplevel, FrameVisualizer):
         self._code_book.preferred_size_in_pw = 400
 
     def _load_code(self, frame_info):
-        self._text_frame.set_content(frame_info.source)
+        self._text_frame.set_content(self._source)
 
     def _update_this_frame(self, msg, frame_info):
         FrameVisualizer._update_this_frame(self, msg, frame_info)
@@ -1107,6 +1123,11 @@ def _handle_debugger_return(msg):
     _current_debugger.handle_debugger_return(msg)
 
 
+def _handle_source_announcement(msg):
+    if _current_debugger is not None:
+        _current_debugger.handle_source_announcement(msg)
+
+
 def _run_or_resume():
     state = get_runner().get_state()
     if state == "waiting_debugger_command":
@@ -1162,14 +1183,29 @@ class DebuggerConfigurationPage(ConfigurationPage):
             row=3,
             columnspan=3,
         )
+        self.add_checkbox(
+            "debugger.lazy_instrumentation",
+            _("Prepare functions for the nicer debugger only when stepping into them"),
+            tooltip=_("Makes starting big programs faster, ")
+            + _("but first call of a function may be shown in less detail."),
+            row=4,
+            columnspan=3,
+        )
+        self.add_checkbox(
+            "debugger.use_sys_monitoring",
+            _("Use sys.monitoring in faster debugger (Python 3.12 and later)"),
+            tooltip=_("Makes faster debugger run almost at full speed between breakpoints."),
+            row=5,
+            columnspan=3,
+        )
 
         default_label = ttk.Label(self, text="Preferred debugger", anchor="w")
-        default_label.grid(row=4, column=0, sticky="w", pady=(15, 0))
+        default_label.grid(row=6, column=0, sticky="w", pady=(15, 0))
         self.add_combobox(
             "debugger.preferred_debugger",
             ["nicer", "faster", "birdseye"],
             width=8,
-            row=4,
+            row=6,
             column=1,
             padx=5,
             pady=(15, 0),
@@ -1177,16 +1213,16 @@ class DebuggerConfigurationPage(ConfigurationPage):
         default_comment_label = ttk.Label(
             self, text=_("(used when clicking Debug toolbar button)"), anchor="w"
         )
-        default_comment_label.grid(row=4, column=2, sticky="w", pady=(15, 0))
+        default_comment_label.grid(row=6, column=2, sticky="w", pady=(15, 0))
 
         if get_workbench().get_option("run.birdseye_port", None):
             port_label = ttk.Label(self, text=_("Birdseye port"), anchor="w")
-            port_label.grid(row=5, column=0, sticky="w", pady=(5, 0))
-            self.add_entry("run.birdseye_port", row=5, column=1, width=5, pady=(5, 0), padx=5)
+            port_label.grid(row=7, column=0, sticky="w", pady=(5, 0))
+            self.add_entry("run.birdseye_port", row=7, column=1, width=5, pady=(5, 0), padx=5)
             port_comment_label = ttk.Label(
                 self, text=_("(restart Thonny after changing this)"), anchor="w"
             )
-            port_comment_label.grid(row=5, column=2, sticky="w", pady=(5, 0))
+            port_comment_label.grid(row=7, column=2, sticky="w", pady=(5, 0))
 
         self.columnconfigure(2, weight=1)
 
@@ -1216,6 +1252,8 @@ def load_plugin() -> None:
     get_workbench().set_default("debugger.automatic_stack_view", True)
     get_workbench().set_default("debugger.preferred_debugger", "nicer")
     get_workbench().set_default("debugger.allow_stepping_into_libraries", False)
+    get_workbench().set_default("debugger.lazy_instrumentation", False)
+    get_workbench().set_default("debugger.use_sys_monitoring", True)
 
     get_workbench().add_command(
         "runresume",
@@ -1347,4 +1385,5 @@ def load_plugin() -> None:
     get_workbench().bind("DebuggerResponse", _handle_debugger_progress, True)
     get_workbench().bind("ToplevelResponse", _handle_toplevel_response, True)
     get_workbench().bind("debugger_return_response", _handle_debugger_return, True)
+    get_workbench().bind("SourceAnnouncement", _handle_source_announcement, True)
     get_workbench().bind("CommandAccepted", _debug_accepted, True)
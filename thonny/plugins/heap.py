@@ -5,20 +5,46 @@ from tkinter import ttk
 
 from thonny import get_runner, get_workbench
 from thonny.common import InlineCommand
-from thonny.memory import MAX_REPR_LENGTH_IN_GRID, MemoryFrame, format_object_id, parse_object_id
+from thonny.memory import (
+    MAX_REPR_LENGTH_IN_GRID,
+    PagedMemoryFrame,
+    format_object_id,
+    parse_object_id,
+)
 from thonny.misc_utils import shorten_repr
 from _tkinter import TclError
 
 
-class HeapView(MemoryFrame):
+def _format_size(size):
+    if size < 1024:
+        return "%d B" % size
+    elif size < 1024 * 1024:
+        return "%.1f KB" % (size / 1024)
+    else:
+        return "%.1f MB" % (size / 1024 / 1024)
+
+
+class HeapView(PagedMemoryFrame):
     def __init__(self, master):
-        MemoryFrame.__init__(self, master, ("id", "value"))
+        PagedMemoryFrame.__init__(self, master, ("id", "type", "size", "value"))
 
         self.tree.column("id", width=100, anchor=tk.W, stretch=False)
+        self.tree.column("type", width=80, anchor=tk.W, stretch=False)
+        self.tree.column("size", width=60, anchor=tk.E, stretch=False)
         self.tree.column("value", width=150, anchor=tk.W, stretch=True)
 
-        self.tree.heading("id", text="ID", anchor=tk.W)
-        self.tree.heading("value", text="Value", anchor=tk.W)
+        self._sort_by = "id"
+        self._reverse = False
+        for column, title in [("id", _("ID")), ("type", _("Type")), ("size", _("Size"))]:
+            self.tree.heading(
+                column,
+                text=title,
+                anchor=tk.W,
+                command=lambda column=column: self._set_sort_column(column),
+            )
+        self.tree.heading("value", text=_("Value"), anchor=tk.W)
+
+        self._init_filter_bar()
 
         get_workbench().bind("get_heap_response", self._handle_heap_event, True)
 
@@ -26,6 +52,7 @@ class HeapView(MemoryFrame):
         get_workbench().bind("ToplevelResponse", self._request_heap_data, True)
         # Showing new globals may introduce new interesting objects
         get_workbench().bind("get_globals_response", self._request_heap_data, True)
+        get_workbench().bind("BackendRestart", self._on_backend_restart, True)
 
         self.bind("<Map>", self._on_map, True)
         self.bind("<Unmap>", self._on_unmap, True)
@@ -40,13 +67,45 @@ class HeapView(MemoryFrame):
             padding=(3, 0),
         )
 
-    def _update_data(self, data):
-        self._clear_tree()
-        for value_id in sorted(data.keys()):
-            node_id = self.tree.insert("", "end")
-            self.tree.set(node_id, "id", format_object_id(value_id))
-            self.tree.set(
-                node_id, "value", shorten_repr(data[value_id].repr, MAX_REPR_LENGTH_IN_GRID)
+    def _init_filter_bar(self):
+        bar = ttk.Frame(self)
+        bar.grid(row=1, column=0, columnspan=2, sticky="nsew", pady=(1, 0))
+        bar.columnconfigure(1, weight=1)
+
+        ttk.Label(bar, text=_("Type") + ":").grid(row=0, column=0, padx=(3, 3))
+        self._type_filter_var = tk.StringVar(value="")
+        self._type_filter_var.trace("w", self._on_filter_change)
+        ttk.Entry(bar, textvariable=self._type_filter_var, width=10).grid(
+            row=0, column=1, sticky="we"
+        )
+        self._stats_label = ttk.Label(bar, text="")
+        self._stats_label.grid(row=0, column=2, padx=(6, 3))
+
+    def _set_sort_column(self, column):
+        if column == self._sort_by:
+            self._reverse = not self._reverse
+        else:
+            self._sort_by = column
+            self._reverse = column == "size"
+
+        self.refresh()
+        self.scroll_to(0)
+
+    def _on_filter_change(self, *args):
+        self.refresh()
+        self.scroll_to(0)
+
+    def request_rows(self, offset, limit):
+        if get_runner() is not None:
+            get_runner().send_command(
+                InlineCommand(
+                    "get_heap",
+                    offset=offset,
+                    limit=limit,
+                    sort_by=self._sort_by,
+                    reverse=self._reverse,
+                    type_filter=self._type_filter_var.get().strip(),
+                )
             )
 
     def before_show(self):
@@ -61,13 +120,41 @@ class HeapView(MemoryFrame):
     def _request_heap_data(self, msg=None, even_when_hidden=False):
         if self.winfo_ismapped() or even_when_hidden:
             # TODO: update itself also when it becomes visible
-            if get_runner() is not None:
-                get_runner().send_command(InlineCommand("get_heap"))
+            self.refresh()
 
     def _handle_heap_event(self, msg):
-        if self.winfo_ismapped():
-            if hasattr(msg, "heap"):
-                self._update_data(msg.heap)
+        if not self.winfo_ismapped() or "page" not in msg:
+            return
+
+        if (
+            msg.sort_by != self._sort_by
+            or msg.reverse != self._reverse
+            or msg.type_filter != self._type_filter_var.get().strip()
+        ):
+            # response to an outdated request
+            return
+
+        rows = []
+        for item in msg.page:
+            rows.append(
+                (
+                    format_object_id(item["id"]),
+                    item["type_name"],
+                    _format_size(item["size"]),
+                    shorten_repr(item["value_info"].repr, MAX_REPR_LENGTH_IN_GRID),
+                )
+            )
+        self.set_rows(msg.offset, msg.total_count, rows)
+
+        self._stats_label.configure(
+            text=_("%d objects") % msg.total_count
+            + ", "
+            + _("%s kept") % _format_size(msg.heap_stats["strong_size"])
+        )
+
+    def _on_backend_restart(self, event=None):
+        self.reset()
+        self._stats_label.configure(text="")
 
     def _on_map(self, event):
         self.info_label.grid(row=0, column=1005)
@@ -79,5 +166,4 @@ class HeapView(MemoryFrame):
             pass
 
 
-def load_plugin() -> None:
-    get_workbench().add_view(HeapView, _("Heap"), "e")
+plugin_manifest = {"views": [{"class": "HeapView", "label": "Heap", "default_location": "e"}]}
@@ -1,5 +1,5 @@
 # -*- coding: utf-8 -*-
-from thonny.assistance import ProgramAnalyzer, add_program_analyzer
+from thonny.assistance import ProgramAnalyzer
 from thonny import get_runner, rst_utils
 from thonny.running import CPythonProxy
 import logging
@@ -293,5 +293,4 @@ class ProgramNamingAnalyzer(ProgramAnalyzer):
         return result
 
 
-def load_plugin():
-    add_program_analyzer(ProgramNamingAnalyzer)
+plugin_manifest = {"program_analyzers": ["ProgramNamingAnalyzer"]}
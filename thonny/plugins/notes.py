@@ -55,5 +55,13 @@ class NotesView(TextFrame):
         super().destroy()
 
 
-def load_plugin():
-    get_workbench().add_view(NotesView, _("Notes"), "ne", default_position_key="zz")
+plugin_manifest = {
+    "views": [
+        {
+            "class": "NotesView",
+            "label": "Notes",
+            "default_location": "ne",
+            "default_position_key": "zz",
+        }
+    ]
+}
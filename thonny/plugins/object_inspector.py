@@ -10,6 +10,9 @@ from thonny.misc_utils import shorten_repr
 from thonny.tktextext import TextFrame
 import base64
 
+# number of container elements sent with object info, others are fetched when scrolled into view
+ELEMENTS_PAGE_SIZE = 100
+
 
 class ObjectInspector(ttk.Frame):
     def __init__(self, master):
@@ -170,10 +173,21 @@ class ObjectInspector(ttk.Frame):
                 del self.forward_links[:]
 
             self.object_id = object_id
+            self._pin_current_object()
             self.set_object_info(None)
             self._set_title(_("object @ ") + thonny.memory.format_object_id(object_id))
             self.request_object_info()
 
+    def _pin_current_object(self):
+        # backend may otherwise drop the object from its heap while it's being inspected
+        get_runner().send_command(
+            InlineCommand(
+                "set_pinned_objects",
+                owner="ObjectInspector",
+                object_ids=[] if self.object_id is None else [self.object_id],
+            )
+        )
+
     def _set_title(self, text):
         self.title_label.configure(text=text)
 
@@ -182,6 +196,7 @@ class ObjectInspector(ttk.Frame):
             if msg.info["id"] == self.object_id:
                 if hasattr(msg, "not_found") and msg.not_found:
                     self.object_id = None
+                    self._pin_current_object()
                     self.set_object_info(None)
                 else:
                     self.set_object_info(msg.info)
@@ -214,10 +229,12 @@ class ObjectInspector(ttk.Frame):
                 all_attributes=False,
                 frame_width=frame_width,
                 frame_height=frame_height,
+                elements_limit=ELEMENTS_PAGE_SIZE,
             )
         )
 
     def set_object_info(self, object_info):
+        previous_info = self.object_info
         self.object_info = object_info
         if object_info is None or "error" in object_info:
             if object_info is None:
@@ -234,6 +251,9 @@ class ObjectInspector(ttk.Frame):
                 + " @ "
                 + thonny.memory.format_object_id(object_info["id"])
             )
+            if previous_info is None or previous_info.get("id") != object_info["id"]:
+                # attributes of another object shouldn't be highlighted as changed
+                self.attributes_page.clear()
             self.attributes_page.update_variables(object_info["attributes"])
             self.update_type_specific_info(object_info)
 
@@ -416,10 +436,89 @@ class ReprInspector(TextFrame, ContentInspector):
         """
 
 
-class ElementsInspector(thonny.memory.MemoryFrame, ContentInspector):
-    def __init__(self, master):
+class PagedContentInspector(thonny.memory.PagedMemoryFrame, ContentInspector):
+    """Base class for inspectors of container elements, which get fetched
+    from the backend page by page"""
+
+    def __init__(self, master, columns):
         ContentInspector.__init__(self, master)
-        thonny.memory.MemoryFrame.__init__(self, master, ("index", "id", "value"))
+        thonny.memory.PagedMemoryFrame.__init__(self, master, columns)
+        self.object_id = None
+
+        bar = ttk.Frame(self)
+        bar.grid(row=1, column=0, columnspan=2, sticky="nsew", pady=(1, 0))
+        bar.columnconfigure(0, weight=1)
+        self.length_label = ttk.Label(bar, text="")
+        self.length_label.grid(row=0, column=0, sticky="w", padx=(3, 0))
+        ttk.Label(bar, text=_("Go to index") + ":").grid(row=0, column=1, padx=(6, 3))
+        self.index_entry = ttk.Entry(bar, width=8)
+        self.index_entry.grid(row=0, column=2, padx=(0, 3))
+        self.index_entry.bind("<Return>", self._jump_to_index, True)
+
+        get_workbench().bind("get_object_elements_response", self._handle_elements_event, True)
+
+    def set_object_info(self, object_info):
+        if object_info["id"] != self.object_id:
+            self.object_id = object_info["id"]
+            self.reset()
+        else:
+            # elements may have changed
+            self.forget_rows()
+
+        self.length_label.configure(text=self.format_length(object_info["length"]))
+        self.tree.config(height=min(object_info["length"], 10))
+        self._show_page(object_info)
+
+    def request_rows(self, offset, limit):
+        get_runner().send_command(
+            InlineCommand(
+                "get_object_elements", object_id=self.object_id, offset=offset, limit=limit
+            )
+        )
+
+    def _handle_elements_event(self, msg):
+        if msg.object_id == self.object_id and "error" not in msg:
+            self._show_page(msg)
+
+    def _show_page(self, info):
+        self.set_rows(info["elements_offset"], info["length"], self.create_rows(info))
+
+    def _jump_to_index(self, event=None):
+        try:
+            row_no = int(self.index_entry.get())
+        except ValueError:
+            get_workbench().bell()
+            return
+
+        if row_no < 0:
+            row_no += self.total_count
+        if not 0 <= row_no < self.total_count:
+            get_workbench().bell()
+            return
+
+        self.scroll_to(row_no)
+        items = self.tree.get_children()
+        if items:
+            iid = items[row_no - self.first_row_no]
+            self.tree.focus(iid)
+            self.tree.selection_set(iid)
+
+    def create_rows(self, info):
+        raise NotImplementedError()
+
+    def format_length(self, length):
+        raise NotImplementedError()
+
+    def on_select(self, event):
+        pass
+
+    def on_double_click(self, event):
+        self.show_selected_object_info()
+
+
+class ElementsInspector(PagedContentInspector):
+    def __init__(self, master):
+        PagedContentInspector.__init__(self, master, ("index", "id", "value"))
 
         # self.vert_scrollbar.grid_remove()
         self.tree.column("index", width=40, anchor=tk.W, stretch=False)
@@ -454,48 +553,32 @@ class ElementsInspector(thonny.memory.MemoryFrame, ContentInspector):
     def applies_to(self, object_info):
         return "elements" in object_info
 
-    def on_select(self, event):
-        pass
-
-    def on_double_click(self, event):
-        self.show_selected_object_info()
-
     def set_object_info(self, object_info):
         assert "elements" in object_info
 
         self.elements_have_indices = object_info["type"] in (repr(tuple), repr(list))
         self._update_columns()
-
-        self._clear_tree()
-        index = 0
-        # TODO: don't show too big number of elements
-        for element in object_info["elements"]:
-            node_id = self.tree.insert("", "end")
-            if self.elements_have_indices:
-                self.tree.set(node_id, "index", index)
-            else:
-                self.tree.set(node_id, "index", "")
-
-            self.tree.set(node_id, "id", thonny.memory.format_object_id(element.id))
-            self.tree.set(
-                node_id, "value", shorten_repr(element.repr, thonny.memory.MAX_REPR_LENGTH_IN_GRID)
+        PagedContentInspector.set_object_info(self, object_info)
+
+    def create_rows(self, info):
+        rows = []
+        for i, element in enumerate(info["elements"]):
+            rows.append(
+                (
+                    info["elements_offset"] + i if self.elements_have_indices else "",
+                    thonny.memory.format_object_id(element.id),
+                    shorten_repr(element.repr, thonny.memory.MAX_REPR_LENGTH_IN_GRID),
+                )
             )
-            index += 1
+        return rows
 
-        count = len(object_info["elements"])
-        self.tree.config(height=min(count, 10))
-
-        """ TODO:
-        label.configure (
-            text=("%d element" if count == 1 else "%d elements") % count
-        )
-        """
+    def format_length(self, length):
+        return (_("%d element") if length == 1 else _("%d elements")) % length
 
 
-class DictInspector(thonny.memory.MemoryFrame, ContentInspector):
+class DictInspector(PagedContentInspector):
     def __init__(self, master):
-        ContentInspector.__init__(self, master)
-        thonny.memory.MemoryFrame.__init__(self, master, ("key_id", "id", "key", "value"))
+        PagedContentInspector.__init__(self, master, ("key_id", "id", "key", "value"))
         self.configure(border=1)
         # self.vert_scrollbar.grid_remove()
         self.tree.column("key_id", width=100, anchor=tk.W, stretch=False)
@@ -519,39 +602,26 @@ class DictInspector(thonny.memory.MemoryFrame, ContentInspector):
     def applies_to(self, object_info):
         return "entries" in object_info
 
-    def on_select(self, event):
-        pass
-
-    def on_double_click(self, event):
-        # NB! this selects value
-        self.show_selected_object_info()
-
     def set_object_info(self, object_info):
         assert "entries" in object_info
+        PagedContentInspector.set_object_info(self, object_info)
+        self.update_memory_model()
 
-        self._clear_tree()
-        # TODO: don't show too big number of elements
-        for key, value in object_info["entries"]:
-            node_id = self.tree.insert("", "end")
-            self.tree.set(node_id, "key_id", thonny.memory.format_object_id(key.id))
-            self.tree.set(
-                node_id, "key", shorten_repr(key.repr, thonny.memory.MAX_REPR_LENGTH_IN_GRID)
-            )
-            self.tree.set(node_id, "id", thonny.memory.format_object_id(value.id))
-            self.tree.set(
-                node_id, "value", shorten_repr(value.repr, thonny.memory.MAX_REPR_LENGTH_IN_GRID)
+    def create_rows(self, info):
+        rows = []
+        for key, value in info["entries"]:
+            rows.append(
+                (
+                    thonny.memory.format_object_id(key.id),
+                    thonny.memory.format_object_id(value.id),
+                    shorten_repr(key.repr, thonny.memory.MAX_REPR_LENGTH_IN_GRID),
+                    shorten_repr(value.repr, thonny.memory.MAX_REPR_LENGTH_IN_GRID),
+                )
             )
+        return rows
 
-        count = len(object_info["entries"])
-        self.tree.config(height=min(count, 10))
-
-        """ TODO:
-        label.configure (
-            text=("%d entry" if count == 1 else "%d entries") % count
-        )
-        """
-
-        self.update_memory_model()
+    def format_length(self, length):
+        return (_("%d entry") if length == 1 else _("%d entries")) % length
 
 
 class ImageInspector(ContentInspector, tk.Frame):
@@ -597,5 +667,6 @@ class AttributesFrame(thonny.memory.VariablesFrame):
         self.show_selected_object_info()
 
 
-def load_plugin() -> None:
-    get_workbench().add_view(ObjectInspector, _("Object inspector"), "se")
+plugin_manifest = {
+    "views": [{"class": "ObjectInspector", "label": "Object inspector", "default_location": "se"}]
+}
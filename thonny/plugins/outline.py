@@ -129,5 +129,6 @@ class OutlineView(ttk.Frame):
             )
 
 
-def load_plugin() -> None:
-    get_workbench().add_view(OutlineView, _("Outline"), "ne")
+plugin_manifest = {
+    "views": [{"class": "OutlineView", "label": "Outline", "default_location": "ne"}]
+}
@@ -579,6 +579,7 @@ class PipDialog(tk.Toplevel):
 
         # following call blocks
         _show_subprocess_dialog(self, proc, title)
+        self._on_packages_changed()
         if action == "uninstall":
             self._show_instructions()  # Make the old package go away as fast as possible
         self._start_update_list(None if action == "uninstall" else name)
@@ -610,6 +611,7 @@ class PipDialog(tk.Toplevel):
         title = subprocess.list2cmdline(cmd)
 
         _, out, _ = _show_subprocess_dialog(self, proc, title)
+        self._on_packages_changed()
 
         # Try to find out the name of the package we're installing
         name = None
@@ -657,6 +659,9 @@ class PipDialog(tk.Toplevel):
     def _create_python_process(self, args, stderr):
         raise NotImplementedError()
 
+    def _on_packages_changed(self):
+        pass
+
     def _create_pip_process(self, args, stderr=subprocess.STDOUT):
         if "--disable-pip-version-check" not in args:
             args.append("--disable-pip-version-check")
@@ -726,6 +731,10 @@ class BackendPipDialog(PipDialog):
         proc = running.create_backend_python_process(args, stderr=stderr)
         return proc, proc.cmd
 
+    def _on_packages_changed(self):
+        # spare backend wouldn't see new packages
+        self._backend_proxy.packages_changed()
+
     def _confirm_install(self, package_data):
         name = package_data["info"]["name"]
 
@@ -1117,26 +1126,32 @@ def _extract_click_text(widget, event, tag):
     return None
 
 
-def load_plugin() -> None:
-    def open_backend_pip_gui(*args):
-        pg = BackendPipDialog(get_workbench())
-        ui_utils.show_dialog(pg)
-
-    def open_backend_pip_gui_enabled():
-        return "pip_gui" in get_runner().get_supported_features()
-
-    def open_frontend_pip_gui(*args):
-        pg = PluginsPipDialog(get_workbench())
-        ui_utils.show_dialog(pg)
-
-    get_workbench().add_command(
-        "backendpipgui",
-        "tools",
-        _("Manage packages..."),
-        open_backend_pip_gui,
-        tester=open_backend_pip_gui_enabled,
-        group=80,
-    )
-    get_workbench().add_command(
-        "pluginspipgui", "tools", _("Manage plug-ins..."), open_frontend_pip_gui, group=180
-    )
+def open_backend_pip_gui(*args):
+    pg = BackendPipDialog(get_workbench())
+    ui_utils.show_dialog(pg)
+
+
+def open_frontend_pip_gui(*args):
+    pg = PluginsPipDialog(get_workbench())
+    ui_utils.show_dialog(pg)
+
+
+plugin_manifest = {
+    "commands": [
+        {
+            "command_id": "backendpipgui",
+            "menu_name": "tools",
+            "command_label": "Manage packages...",
+            "handler": "open_backend_pip_gui",
+            "required_backend_feature": "pip_gui",
+            "group": 80,
+        },
+        {
+            "command_id": "pluginspipgui",
+            "menu_name": "tools",
+            "command_label": "Manage plug-ins...",
+            "handler": "open_frontend_pip_gui",
+            "group": 180,
+        },
+    ]
+}
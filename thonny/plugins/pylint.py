@@ -3,7 +3,7 @@ import ast
 import subprocess
 
 from thonny import ui_utils, get_workbench
-from thonny.assistance import SubprocessProgramAnalyzer, add_program_analyzer
+from thonny.assistance import SubprocessProgramAnalyzer
 from thonny.running import get_frontend_python
 import logging
 
@@ -3065,6 +3065,7 @@ all_checks = [
 all_checks_by_symbol = {c["msg_sym"]: c for c in all_checks}
 
 
-def load_plugin():
-    add_program_analyzer(PylintAnalyzer)
-    get_workbench().set_default("assistance.use_pylint", True)
+plugin_manifest = {
+    "defaults": {"assistance.use_pylint": True},
+    "program_analyzers": ["PylintAnalyzer"],
+}
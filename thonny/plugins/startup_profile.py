@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""Adds a command for saving the trace of Thonny's startup (see thonny.startup_profiler)"""
+
+import time
+
+from thonny import get_workbench, startup_profiler
+from thonny.ui_utils import asksaveasfilename
+
+
+def export_startup_profile() -> None:
+    filename = asksaveasfilename(
+        filetypes=[(_("JSON files"), ".json"), (_("all files"), ".*")],
+        defaultextension=".json",
+        initialdir=get_workbench().get_cwd(),
+        initialfile=time.strftime("ThonnyStartupProfile_%Y-%m-%d.json"),
+    )
+
+    if not filename:
+        return
+
+    startup_profiler.save(filename)
+
+
+plugin_manifest = {
+    "commands": [
+        {
+            "command_id": "export_startup_profile",
+            "menu_name": "tools",
+            "command_label": "Export startup profile...",
+            "handler": "export_startup_profile",
+            "group": 110,
+        }
+    ]
+}
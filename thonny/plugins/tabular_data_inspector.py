@@ -0,0 +1,216 @@
+"""
+Shows numpy arrays and pandas data frames and series as tables. The backend
+(see thonny.plugins.backend.tabular_data_backend) sends shape, data types and
+first rows with object info, other rows get requested when they are scrolled
+into view and summary statistics only when asked for.
+"""
+import tkinter as tk
+from tkinter import ttk
+
+from thonny import get_runner, get_workbench
+from thonny.common import InlineCommand
+from thonny.gridtable import GridTable, ScrollableGridTable
+from thonny.plugins.object_inspector import ContentInspector
+
+# cached rows get forgotten when there are more of them
+_MAX_CACHED_ROWS = 10000
+
+_STATS_ROWS = [("min", "min"), ("max", "max"), ("mean", "mean"), ("nan_count", "NaN-s")]
+
+
+class _LazyGridTable(GridTable):
+    def __init__(
+        self, master, header_rows, data_row_count, footer_row_count, frozen_column_count, inspector
+    ):
+        self._inspector = inspector
+        GridTable.__init__(
+            self, master, header_rows, data_row_count, footer_row_count, frozen_column_count
+        )
+
+    def get_data_value(self, row_no, col_no):
+        return self._inspector.get_cell(row_no, col_no)
+
+
+class _TabularGridTable(ScrollableGridTable):
+    def __init__(self, master, header_rows, data_row_count, inspector):
+        self._inspector = inspector
+        ScrollableGridTable.__init__(self, master, header_rows, data_row_count, 0, 1)
+
+    def create_grid_table(
+        self, master, header_rows, data_row_count, footer_row_count, frozen_column_count
+    ):
+        return _LazyGridTable(
+            master,
+            header_rows,
+            data_row_count,
+            footer_row_count,
+            frozen_column_count,
+            self._inspector,
+        )
+
+    def scroll_to(self, row_no):
+        self.grid_table.set_first_visible_data_row_no(row_no)
+        self._update_vertical_scrollbar()
+
+
+class TabularDataInspector(ttk.Frame, ContentInspector):
+    def __init__(self, master):
+        ContentInspector.__init__(self, master)
+        ttk.Frame.__init__(self, master)
+
+        self.object_id = None
+        self._tabular = None
+        self._stats = None
+        self._rows = {}  # row no => index label followed by cell values
+        self._requested_range = None
+        self._request_after_id = None
+        self._table = None
+        self._table_header_rows = None
+
+        bar = ttk.Frame(self)
+        bar.grid(row=0, column=0, sticky="nsew", pady=(0, 1))
+        bar.columnconfigure(0, weight=1)
+        self.summary_label = ttk.Label(bar, text="")
+        self.summary_label.grid(row=0, column=0, sticky="w", padx=(3, 0))
+        self.stats_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            bar, text=_("Statistics"), variable=self.stats_var, command=self._on_toggle_stats
+        ).grid(row=0, column=1, padx=(6, 3))
+
+        self.columnconfigure(0, weight=1)
+        self.rowconfigure(1, weight=1)
+
+        get_workbench().bind("get_tabular_window_response", self._handle_window_event, True)
+        get_workbench().bind("get_tabular_stats_response", self._handle_stats_event, True)
+
+    def applies_to(self, object_info):
+        return "tabular" in object_info
+
+    def set_object_info(self, object_info):
+        new_object = object_info["id"] != self.object_id
+        self.object_id = object_info["id"]
+        self._tabular = object_info["tabular"]
+
+        # rows and statistics may have changed
+        self._rows = {}
+        self._requested_range = None
+        self._stats = None
+        self._store_window(self._tabular["window"])
+        if self.stats_var.get():
+            self._request_stats()
+
+        self.summary_label.configure(text=self._format_summary())
+        self._update_table(keep_position=not new_object)
+
+    def get_cell(self, row_no, col_no):
+        row = self._rows.get(row_no)
+        if row is None:
+            self._schedule_request()
+            return None
+
+        return row[col_no]
+
+    def _format_summary(self):
+        tabular = self._tabular
+        summary = "%s, shape %s" % (
+            tabular["kind"],
+            " × ".join(str(n) for n in tabular["shape"]),
+        )
+        if len(tabular["columns"]) < tabular["column_count"]:
+            summary += ", " + _("showing first %d columns") % len(tabular["columns"])
+        if tabular["kind"] != "DataFrame" and tabular["dtypes"]:
+            summary += ", dtype " + tabular["dtypes"][0]
+        return summary
+
+    def _create_header_rows(self):
+        tabular = self._tabular
+        rows = [[""] + tabular["columns"]]
+        if tabular["kind"] == "DataFrame":
+            rows.append(["dtype"] + tabular["dtypes"])
+        if self.stats_var.get() and self._stats is not None:
+            for key, label in _STATS_ROWS:
+                rows.append([label] + self._stats[key])
+        return rows
+
+    def _update_table(self, keep_position):
+        header_rows = self._create_header_rows()
+        row_count = self._tabular["row_count"]
+
+        if (
+            self._table is not None
+            and header_rows == self._table_header_rows
+            and row_count == self._table.grid_table.data_row_count
+        ):
+            self._table.grid_table.update_screen_data()
+            return
+
+        first_row_no = 0
+        if self._table is not None:
+            if keep_position:
+                first_row_no = self._table.grid_table.first_visible_data_row_no
+            self._table.destroy()
+
+        self._table = _TabularGridTable(self, header_rows, row_count, self)
+        self._table_header_rows = header_rows
+        self._table.grid(row=1, column=0, sticky="nsew")
+        if first_row_no:
+            self._table.scroll_to(first_row_no)
+
+    def _store_window(self, window):
+        if len(self._rows) + len(window["rows"]) > _MAX_CACHED_ROWS:
+            self._rows = {}
+
+        for i, (label, row) in enumerate(zip(window["index"], window["rows"])):
+            self._rows[window["offset"] + i] = [label] + row
+
+    def _schedule_request(self):
+        if self._request_after_id is None:
+            # all missing cells of a repaint get fetched with one request
+            self._request_after_id = self.after(20, self._request_visible_rows)
+
+    def _request_visible_rows(self):
+        self._request_after_id = None
+        if self._table is None or get_runner() is None:
+            return
+
+        grid_table = self._table.grid_table
+        visible_count = max(grid_table.visible_data_row_count, 1)
+        # fetch a screenful around visible rows so that small scrolls don't need requests
+        offset = max(grid_table.first_visible_data_row_no - visible_count, 0)
+        limit = visible_count * 3
+        if self._requested_range == (offset, limit):
+            return
+
+        self._requested_range = (offset, limit)
+        get_runner().send_command(
+            InlineCommand(
+                "get_tabular_window", object_id=self.object_id, offset=offset, limit=limit
+            )
+        )
+
+    def _request_stats(self):
+        get_runner().send_command(InlineCommand("get_tabular_stats", object_id=self.object_id))
+
+    def _on_toggle_stats(self):
+        if self._tabular is None:
+            return
+
+        if self.stats_var.get() and self._stats is None:
+            self._request_stats()
+        else:
+            self._update_table(keep_position=True)
+
+    def _handle_window_event(self, msg):
+        if msg.object_id == self.object_id and "error" not in msg:
+            self._requested_range = None
+            self._store_window(msg.window)
+            if self._table is not None:
+                self._table.grid_table.update_screen_data()
+
+    def _handle_stats_event(self, msg):
+        if msg.object_id == self.object_id and "error" not in msg:
+            self._stats = msg.stats
+            self._update_table(keep_position=True)
+
+
+plugin_manifest = {"content_inspectors": ["TabularDataInspector"]}
@@ -9,23 +9,39 @@ shell becomes kind of title for the execution.
 """
 
 
+import array
+import codecs
 import collections
 import logging
 import os.path
 import shlex
 import shutil
 import signal
+import socket
+import struct
 import subprocess
+import tempfile
 import sys
 import time
+import tkinter as tk
 import traceback
 from logging import debug
-from threading import Thread
+from threading import Condition, Event, Lock, Thread
 from time import sleep
 
-from thonny import THONNY_USER_DIR, common, get_runner, get_shell, get_workbench, ui_utils
+from thonny import (
+    THONNY_USER_DIR,
+    get_runner,
+    get_shell,
+    get_workbench,
+    startup_profiler,
+    ui_utils,
+)
 from thonny.code import get_current_breakpoints, get_saved_current_script_filename
 from thonny.common import (
+    BINARY_FRAME_HEADER_SIZE,
+    BINARY_FRAME_MARKER,
+    MESSAGE_MARKER,
     BackendEvent,
     CommandToBackend,
     DebuggerCommand,
@@ -35,14 +51,24 @@ from thonny.common import (
     ToplevelCommand,
     ToplevelResponse,
     UserError,
+    apply_stack_delta,
+    format_startup_phases,
     normpath_with_actual_case,
     is_same_path,
+    parse_binary_frame_header,
+    parse_binary_message,
     parse_message,
     path_startswith,
+    serialize_binary_message,
     serialize_message,
     update_system_path,
 )
-from thonny.misc_utils import construct_cmd_line, running_on_mac_os, running_on_windows
+from thonny.misc_utils import (
+    construct_cmd_line,
+    running_on_linux,
+    running_on_mac_os,
+    running_on_windows,
+)
 
 from typing import Any, List, Optional, Sequence, Set  # @UnusedImport; @UnusedImport
 from thonny.terminal import run_in_terminal
@@ -51,6 +77,23 @@ from thonny.ui_utils import select_sequence
 
 WINDOWS_EXE = "python.exe"
 OUTPUT_MERGE_THRESHOLD = 1000
+MESSAGE_QUEUE_SIZE = 100
+# Settings which affect backend process spec (see CPythonProxy._create_process_spec)
+PROCESS_SPEC_OPTIONS = [
+    "run.socket_transport",
+    "run.binary_protocol",
+    "run.output_buffering",
+    "run.preload_backend_modules",
+    "run.heap_size_limit_mb",
+    "run.debugger_history_limit_mb",
+]
+# Bigger frame headers are considered to be program output which happens to contain
+# BINARY_FRAME_MARKER
+MAX_BINARY_FRAME_SIZE = 256 * 1024 * 1024
+# Polling interval (ms) for proxies which don't notify about new messages ...
+MESSAGE_POLL_INTERVAL = 20
+# ... and for proxies which do (needed only for noticing backend termination)
+NOTIFIED_MESSAGE_POLL_INTERVAL = 500
 
 RUN_COMMAND_LABEL = ""
 RUN_COMMAND_CAPTION = ""
@@ -62,12 +105,21 @@ io_animation_required = False
 class Runner:
     def __init__(self) -> None:
         get_workbench().set_default("run.auto_cd", True)
+        get_workbench().set_default("run.binary_protocol", True)
+        get_workbench().set_default("run.output_buffering", True)
+        get_workbench().set_default("run.socket_transport", False)
+        get_workbench().set_default("run.spare_backend", True)
+        get_workbench().set_default("run.backend_zygote", False)
+        get_workbench().set_default("run.preload_backend_modules", True)
+        get_workbench().set_default("run.heap_size_limit_mb", 256)
+        get_workbench().set_default("run.debugger_history_limit_mb", 128)
 
         self._init_commands()
         self._state = "starting"
         self._proxy = None  # type: Any
         self._publishing_events = False
         self._polling_after_id = None
+        self._wakeup_pipe = None
         self._postponed_commands = []  # type: List[CommandToBackend]
 
     def _remove_obsolete_jedi_copies(self) -> None:
@@ -79,6 +131,7 @@ class Runner:
 
     def start(self) -> None:
         self._check_alloc_console()
+        self._create_wakeup_pipe()
         self.restart_backend(False, True)
         # temporary
         self._remove_obsolete_jedi_copies()
@@ -202,6 +255,12 @@ class Runner:
         # Attach extra info
         if "debug" in cmd.name.lower():
             cmd["breakpoints"] = get_current_breakpoints()
+            cmd["lazy_instrumentation"] = get_workbench().get_option(
+                "debugger.lazy_instrumentation", False
+            )
+            cmd["use_sys_monitoring"] = get_workbench().get_option(
+                "debugger.use_sys_monitoring", True
+            )
 
         # Offer the command
         logging.debug("RUNNER Sending: %s, %s", cmd.name, cmd)
@@ -223,11 +282,14 @@ class Runner:
             get_workbench().event_generate("BackendRestart")
 
     def _postpone_command(self, cmd: CommandToBackend) -> None:
-        # in case of InlineCommands, discard older same type command
+        # in case of InlineCommands, discard older same type command of same owner
+        # (eg. object pins of one panel must not replace the pins of another)
         if isinstance(cmd, InlineCommand):
-            for older_cmd in self._postponed_commands:
-                if older_cmd.name == cmd.name:
-                    self._postponed_commands.remove(older_cmd)
+            self._postponed_commands = [
+                older_cmd
+                for older_cmd in self._postponed_commands
+                if (older_cmd.name, older_cmd.get("owner")) != (cmd.name, cmd.get("owner"))
+            ]
 
         if len(self._postponed_commands) > 10:
             logging.warning("Can't pile up too many commands. This command will be just ignored")
@@ -369,16 +431,45 @@ class Runner:
 
         self.restart_backend(True)
 
+    def _create_wakeup_pipe(self) -> None:
+        # Tk's file handlers are reliable only on Linux
+        # (they are not available on Windows and are problematic with Aqua Tk)
+        if not running_on_linux():
+            return
+
+        try:
+            self._wakeup_pipe = WakeupPipe(get_workbench(), self._handle_vm_messages_notification)
+        except Exception:
+            logging.exception("Could not create wakeup pipe, falling back to polling")
+            self._wakeup_pipe = None
+
+    def notify_vm_messages(self) -> None:
+        """Called by proxies' listener threads when they have queued new messages"""
+        if self._wakeup_pipe is not None:
+            self._wakeup_pipe.notify()
+
+    def _handle_vm_messages_notification(self) -> None:
+        if self._proxy is not None:
+            self._pull_vm_messages()
+
     def _poll_vm_messages(self) -> None:
         """I chose polling instead of event_generate in listener thread,
         because event_generate across threads is not reliable
         http://www.thecodingforums.com/threads/more-on-tk-event_generate-and-threads.359615/
+        
+        If the proxy notifies about new messages via wakeup pipe, then polling
+        is required only for noticing the termination of the backend.
         """
         self._polling_after_id = None
         if self._pull_vm_messages() is False:
             return
 
-        self._polling_after_id = get_workbench().after(20, self._poll_vm_messages)
+        if self._wakeup_pipe is not None and self._proxy.notifies_about_messages():
+            interval = NOTIFIED_MESSAGE_POLL_INTERVAL
+        else:
+            interval = MESSAGE_POLL_INTERVAL
+
+        self._polling_after_id = get_workbench().after(interval, self._poll_vm_messages)
 
     def _pull_vm_messages(self):
         while self._proxy is not None:
@@ -402,6 +493,8 @@ class Runner:
             # change state
             if isinstance(msg, ToplevelResponse):
                 self._set_state("waiting_toplevel_command")
+                if startup_profiler.is_recording():
+                    startup_profiler.record_backend_ready(msg.get("startup_phases"))
             elif isinstance(msg, DebuggerResponse):
                 self._set_state("waiting_debugger_command")
             else:
@@ -422,6 +515,10 @@ class Runner:
             finally:
                 self._publishing_events = False
 
+            if isinstance(msg, ToplevelResponse) and startup_profiler.is_recording():
+                # includes the time for presenting the welcome message
+                startup_profiler.finish()
+
             # TODO: is it necessary???
             # https://stackoverflow.com/a/13520271/261181
             # get_workbench().update()
@@ -464,7 +561,10 @@ class Runner:
         backend_class = get_workbench().get_backends()[backend_name].proxy_class
         self._set_state("running")
         self._proxy = None
-        self._proxy = backend_class(clean)
+        if first:
+            startup_profiler.record_backend_start()
+        with startup_profiler.phase("start backend " + backend_name):
+            self._proxy = backend_class(clean)
 
         self._poll_vm_messages()
 
@@ -616,6 +716,11 @@ class BackendProxy:
         """Used in MicroPython proxies"""
         return True
 
+    def notifies_about_messages(self):
+        """Whether the proxy calls Runner.notify_vm_messages after queueing new messages.
+        Otherwise the runner needs to poll fetch_next_message frequently."""
+        return False
+
     def get_local_executable(self):
         """Return system command for invoking current interpreter"""
         return None
@@ -641,11 +746,22 @@ class CPythonProxy(BackendProxy):
         super().__init__(True)
         self._executable = executable
 
+        self._process = None
+        self._spare_process = None
+        self._spare_spec_key = None
+        self._spare_spec = None
+        self._spare_packages_stamp = None
+        self._zygote = None
         self._proc = None
+        self._message_output = None
+        self._message_parser = None
         self._message_queue = None
         self._sys_path = []
         self._usersitepackages = None
         self._gui_update_loop_id = None
+        self._protocol = "text"
+        self._last_debugger_stack = None
+        self._last_debugger_state_id = None
         self.in_venv = None
         self._start_new_process()
 
@@ -660,6 +776,19 @@ class CPythonProxy(BackendProxy):
         msg = self._message_queue.popleft()
         self._store_state_info(msg)
 
+        if isinstance(msg, ToplevelResponse):
+            logging.debug("Message queue stats: %s", self._message_queue.get_stats())
+            if msg.get("command_name") == "execute_system_command":
+                # eg. pip install in Shell
+                self.packages_changed()
+            # cwd may have changed
+            self._check_prepare_spare_process(msg.get("cwd"))
+
+        if isinstance(msg, DebuggerResponse) and not self._restore_full_stack(msg):
+            # backend will send it again with full stack, meanwhile continue with next message
+            # (None would mean that the queue is empty)
+            return self.fetch_next_message()
+
         if msg.event_type == "ProgramOutput":
             # combine available small output messages to one single message,
             # in order to put less pressure on UI code
@@ -684,6 +813,15 @@ class CPythonProxy(BackendProxy):
         else:
             return msg
 
+    def notifies_about_messages(self):
+        return True
+
+    def get_message_queue_stats(self):
+        if self._message_queue is None:
+            return None
+        else:
+            return self._message_queue.get_stats()
+
     def _store_state_info(self, msg):
         if "gui_is_active" in msg:
             self._update_gui_updating(msg)
@@ -703,7 +841,45 @@ class CPythonProxy(BackendProxy):
         if "exe_dirs" in msg:
             self._exe_dirs = msg["exe_dirs"]
 
+        if "protocol" in msg:
+            # backend accepted the protocol (or fell back to text)
+            self._protocol = msg["protocol"]
+
+        if "startup_phases" in msg:
+            logging.info(
+                "Backend startup phases: %s", format_startup_phases(msg["startup_phases"])
+            )
+
+    def _restore_full_stack(self, msg):
+        """Returns False if the stack can't be restored and full stack was requested instead"""
+        if "stack_delta_base" in msg:
+            # backend sends deltas only against acknowledged states
+            if (
+                self._last_debugger_stack is None
+                or msg["stack_delta_base"] != self._last_debugger_state_id
+            ):
+                logging.warning(
+                    "Stack delta against unknown state %r (last known %r), requesting full stack",
+                    msg["stack_delta_base"],
+                    self._last_debugger_state_id,
+                )
+                self._last_debugger_stack = None
+                self._last_debugger_state_id = None
+                self._send_msg(InlineCommand("resend_debugger_response"))
+                return False
+
+            msg["stack"] = apply_stack_delta(self._last_debugger_stack, msg["stack"])
+            del msg["stack_delta_base"]
+
+        self._last_debugger_stack = msg["stack"]
+        self._last_debugger_state_id = msg.get("state_id")
+        return True
+
     def send_command(self, cmd):
+        if isinstance(cmd, DebuggerCommand):
+            # lets backend send next stack as delta against the one we have
+            cmd["acknowledged_state_id"] = self._last_debugger_state_id
+
         if isinstance(cmd, ToplevelCommand) and cmd.name[0].isupper():
             self._close_backend()
             self._start_new_process(cmd)
@@ -711,8 +887,12 @@ class CPythonProxy(BackendProxy):
         self._send_msg(cmd)
 
     def _send_msg(self, msg):
-        self._proc.stdin.write(serialize_message(msg) + "\n")
-        self._proc.stdin.flush()
+        if self._protocol == "binary":
+            data = serialize_binary_message(msg)
+        else:
+            data = (serialize_message(msg) + "\n").encode("ASCII")
+        self._message_output.write(data)
+        self._message_output.flush()
 
     def send_program_input(self, data):
         self._send_msg(InputSubmission(data))
@@ -732,20 +912,43 @@ class CPythonProxy(BackendProxy):
 
     def destroy(self):
         self._close_backend()
+        self._discard_spare_process()
+        self._discard_zygote()
 
     def _close_backend(self):
         self._cancel_gui_update_loop()
 
-        if self._proc is not None and self._proc.poll() is None:
-            self._proc.kill()
+        if self._process is not None:
+            self._process.kill()
 
+        if self._message_queue is not None:
+            # release the listeners possibly waiting for free space
+            self._message_queue.close()
+
+        self._process = None
         self._proc = None
+        self._message_output = None
+        self._message_parser = None
         self._message_queue = None
 
-    def _start_new_process(self, cmd=None):
-        # deque, because in one occasion I need to put messages back
-        self._message_queue = collections.deque()
+    def _get_offered_protocols(self):
+        if get_workbench().get_option("run.binary_protocol"):
+            return ["binary", "text"]
+        else:
+            return ["text"]
 
+    def _uses_socket_transport(self):
+        return (
+            get_workbench().get_option("run.socket_transport")
+            and hasattr(socket, "AF_UNIX")
+            and not running_on_windows()
+        )
+
+    def _create_process_spec(self, cmd=None, cwd=None):
+        """Collects everything which determines the initial state of a backend process.
+        
+        A spare process can replace a new one only if their specs are equal.
+        """
         # prepare environment
         my_env = get_environment_for_python_subprocess(self._executable)
         # variables controlling communication with the back-end process
@@ -783,98 +986,249 @@ class CPythonProxy(BackendProxy):
         if hasattr(cmd, "environment"):
             my_env.update(cmd.environment)
 
-        creationflags = 0
-        if running_on_windows():
-            creationflags = subprocess.CREATE_NEW_PROCESS_GROUP
+        return {
+            "cmd_line": cmd_line,
+            "env": my_env,
+            "cwd": get_workbench().get_cwd() if cwd is None else cwd,
+            "socket_transport": self._uses_socket_transport(),
+            "init_msg": {
+                # copy, so that comparing specs notices changes in sys.path
+                "frontend_sys_path": list(sys.path),
+                "protocols": self._get_offered_protocols(),
+                "output_buffering": get_workbench().get_option("run.output_buffering"),
+                "preload_shared_modules": get_workbench().get_option(
+                    "run.preload_backend_modules"
+                ),
+                "heap_size_limit": get_workbench().get_option("run.heap_size_limit_mb")
+                * 1024
+                * 1024,
+                "debugger_history_limit": get_workbench().get_option(
+                    "run.debugger_history_limit_mb"
+                )
+                * 1024
+                * 1024,
+            },
+        }
+
+    def _check_prepare_spare_process(self, cwd=None):
+        """Makes sure there is a spare backend process for next Run/Debug command,
+        which corresponds to current settings"""
+        if not get_workbench().get_option("run.spare_backend"):
+            self._discard_spare_process()
+            return
 
-        debug(_("Starting the backend: %s %s"), cmd_line, get_workbench().get_cwd())
-        self._proc = subprocess.Popen(
-            cmd_line,
-            # bufsize=0,
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            cwd=get_workbench().get_cwd(),
-            env=my_env,
-            universal_newlines=True,
-            creationflags=creationflags,
+        try:
+            spec = self._get_spare_process_spec(cwd)
+        except UserError:
+            self._discard_spare_process()
+            return
+
+        packages_stamp = self._get_packages_stamp()
+        if self._spare_process is not None:
+            if (
+                self._spare_process.spec == spec
+                and self._spare_packages_stamp == packages_stamp
+                and self._spare_process.is_alive()
+            ):
+                return
+            else:
+                # interpreter, environment, cwd, communication settings or
+                # installed packages have changed
+                self._discard_spare_process()
+
+        self._spare_process = BackendProcess(spec, self._get_zygote())
+        self._spare_packages_stamp = packages_stamp
+        # GUI thread shouldn't wait for backend's initialization
+        Thread(target=self._spare_process.warm_up, daemon=True).start()
+
+    def _get_spare_process_spec(self, cwd):
+        """Creating the spec is relatively expensive, so it gets reused until
+        the settings and environment it depends on change"""
+        if cwd is None:
+            cwd = get_workbench().get_cwd()
+
+        key = (
+            cwd,
+            self._executable,
+            get_workbench().in_debug_mode(),
+            tuple(get_workbench().get_option(name) for name in PROCESS_SPEC_OPTIONS),
+            # the environment of the process is derived from these
+            tuple(sorted(os.environ.items())),
+            tuple(sys.path),
+        )
+        if key != self._spare_spec_key:
+            self._spare_spec = self._create_process_spec(cwd=cwd)
+            self._spare_spec_key = key
+
+        return self._spare_spec
+
+    def _get_packages_stamp(self):
+        """Changes when packages get installed to or removed from site-packages
+        (new packages wouldn't be visible in a process started before)"""
+        dirs = [self._usersitepackages] + [
+            path
+            for path in self._sys_path
+            if os.path.basename(path) in ["site-packages", "dist-packages"]
+        ]
+        result = []
+        for path in dirs:
+            if path is None:
+                continue
+            try:
+                result.append((path, os.stat(path).st_mtime))
+            except OSError:
+                # eg. user site dir may not exist yet
+                result.append((path, None))
+        return result
+
+    def packages_changed(self):
+        """Called when user may have installed or removed packages"""
+        self._discard_spare_process()
+
+    def _discard_spare_process(self):
+        if self._spare_process is not None:
+            self._spare_process.kill()
+            self._spare_process = None
+
+    def _uses_zygote(self):
+        return (
+            get_workbench().get_option("run.backend_zygote")
+            and running_on_linux()
+            and hasattr(os, "fork")
         )
 
-        # send init message
-        self._send_msg({"frontend_sys_path": sys.path})
+    def _get_zygote(self):
+        """Returns the fork server for current settings or None.
+        
+        A zygote which turned out to be unsafe is kept around (without a process),
+        so that it doesn't get restarted for each new backend.
+        """
+        if not self._uses_zygote():
+            self._discard_zygote()
+            return None
+
+        try:
+            spec = self._create_process_spec()
+        except UserError:
+            self._discard_zygote()
+            return None
+
+        if self._zygote is not None and not self._zygote.is_usable_for(spec):
+            # interpreter, environment or sys.path has changed or zygote has died
+            self._discard_zygote()
+
+        if self._zygote is None:
+            self._zygote = BackendZygote(spec)
+
+        return self._zygote
+
+    def _discard_zygote(self):
+        if self._zygote is not None:
+            self._zygote.kill()
+            self._zygote = None
+
+    def _start_new_process(self, cmd=None):
+        # Listener thread blocks when the queue is full, until GUI thread drains it.
+        # This keeps GUI responsive when backend runs a long print loop
+        self._message_queue = MessageQueue(MESSAGE_QUEUE_SIZE, get_runner().notify_vm_messages)
+        # until backend confirms the offer, commands are sent as text
+        self._protocol = "text"
+        # new backend doesn't know the stacks of previous one
+        self._last_debugger_stack = None
+        self._last_debugger_state_id = None
+
+        spec = self._create_process_spec(cmd)
+        if (
+            cmd
+            and self._spare_process is not None
+            and self._spare_process.spec == spec
+            and self._spare_packages_stamp == self._get_packages_stamp()
+            and self._spare_process.is_alive()
+        ):
+            debug("Using spare backend process")
+            self._process = self._spare_process
+            self._spare_process = None
+        else:
+            self._discard_spare_process()
+            self._process = BackendProcess(spec, self._get_zygote())
+
+        self._process.connect()
+        self._proc = self._process.proc
+        self._message_output = self._process.message_output
+        self._message_parser = self._process.message_parser
 
         if cmd:
             # Consume the ready message, cmd will get its own result message
-            ready_line = self._proc.stdout.readline()
-            if ready_line == "":  # There was some problem
-                error_msg = self._proc.stderr.read()
-                raise Exception(_("Error starting backend process: ") + error_msg)
-            self._store_state_info(parse_message(ready_line))
+            ready_msg, preceding_msgs = self._process.wait_until_ready()
+            for msg in preceding_msgs:
+                # GUI thread must not wait for itself
+                self._message_queue.append(msg, block=False)
+            self._store_state_info(ready_msg)
 
         # setup asynchronous output listeners
-        Thread(target=self._listen_stdout, daemon=True).start()
+        Thread(target=self._listen_messages, daemon=True).start()
+        if self._process.message_socket is not None:
+            Thread(target=self._listen_raw_stdout, daemon=True).start()
         Thread(target=self._listen_stderr, daemon=True).start()
 
-    def _listen_stdout(self):
+        if cmd:
+            # next Run shouldn't wait for backend startup
+            self._check_prepare_spare_process()
+
+    def _listen_messages(self):
         # debug("... started listening to stdout")
         # will be called from separate thread
 
         message_queue = self._message_queue
-
-        def publish_as_msg(data):
-            msg = parse_message(data)
-            if "cwd" in msg:
-                self.cwd = msg["cwd"]
-            message_queue.append(msg)
-
-            while len(message_queue) > 100:
-                # Probably backend runs an infinite/long print loop.
-                # Throttle message thougput in order to keep GUI thread responsive.
-                sleep(0.1)
+        parser = self._message_parser
 
         while self._proc is not None:
-            data = self._proc.stdout.readline()
-            # debug("... read some stdout data", repr(data))
-            if data == "":
+            msgs = parser.read_messages()
+            if msgs is None:
                 break
-            else:
-                try:
-                    publish_as_msg(data)
-                except Exception:
-                    traceback.print_exc()
-                    # Can mean the line was from subprocess,
-                    # which can't be captured by stream faking.
-                    # NB! If subprocess printed it without linebreak,
-                    # then the suffix can be thonny message
-
-                    parts = data.rsplit(common.MESSAGE_MARKER, maxsplit=1)
 
-                    # print first part as it is
-                    message_queue.append(
-                        BackendEvent("ProgramOutput", data=parts[0], stream_name="stdout")
-                    )
+            for msg in msgs:
+                if "cwd" in msg:
+                    self.cwd = msg["cwd"]
+                message_queue.append(msg)
+
+    def _listen_raw_stdout(self):
+        # With socket transport stdout carries only the output which couldn't be
+        # captured by stream faking (eg. output of subprocesses).
+        # Process and queue are captured, because they may get replaced
+        # while this thread is still draining the output of the old process
+        stream = self._proc.stdout
+        message_queue = self._message_queue
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        newline_normalizer = _NewlineNormalizer()
+        while True:
+            data = stream.read1(65536)
+            if data == b"":
+                break
 
-                    if len(parts) == 2:
-                        second_part = common.MESSAGE_MARKER + parts[1]
-                        try:
-                            publish_as_msg(second_part)
-                        except Exception:
-                            # just print ...
-                            message_queue.append(
-                                BackendEvent(
-                                    "ProgramOutput", data=second_part, stream_name="stdout"
-                                )
-                            )
+            message_queue.append(
+                BackendEvent(
+                    "ProgramOutput",
+                    stream_name="stdout",
+                    data=newline_normalizer.normalize(decoder.decode(data)),
+                )
+            )
 
     def _listen_stderr(self):
         # stderr is used only for debugger debugging
+        stream = self._proc.stderr
+        message_queue = self._message_queue
         while True:
-            data = self._proc.stderr.readline()
-            if data == "":
+            data = stream.readline()
+            if data == b"":
                 break
             else:
-                self._message_queue.append(
-                    BackendEvent("ProgramOutput", stream_name="stderr", data=data)
+                message_queue.append(
+                    BackendEvent(
+                        "ProgramOutput",
+                        stream_name="stderr",
+                        data=_normalize_newlines(data.decode("utf-8", errors="replace")),
+                    )
                 )
 
     def get_local_executable(self):
@@ -940,6 +1294,605 @@ class CPythonProxy(BackendProxy):
         return {"run", "debug", "run_in_terminal", "pip_gui", "system_shell"}
 
 
+class BackendProcess:
+    """Backend process together with the channel for commands and messages.
+    
+    Connecting, sending the init message and waiting for the welcome message
+    may happen in a background thread, so that a process can be prepared in advance.
+    """
+
+    def __init__(self, spec, zygote=None):
+        self.spec = spec
+        self.message_socket = None
+        self.message_output = None
+        self.message_parser = None
+        self._lock = Lock()
+        self._killed = False
+        self._ready_msg = None
+        self._preceding_msgs = []
+        self._error_msg = None
+
+        env = spec["env"]
+        if spec["socket_transport"]:
+            # commands and messages go through a separate channel,
+            # stdout and stderr carry only program output
+            self._socket_dir = tempfile.mkdtemp(prefix="thonny-")
+            socket_path = os.path.join(self._socket_dir, "backend.sock")
+            self._listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._listener.bind(socket_path)
+            self._listener.listen(1)
+            env = dict(env, THONNY_BACKEND_SOCKET=socket_path)
+        else:
+            self._listener = None
+
+        creationflags = 0
+        if running_on_windows():
+            creationflags = subprocess.CREATE_NEW_PROCESS_GROUP
+
+        # backend measures its startup phases relative to this
+        self._start_time = time.time()
+        self.proc = None
+        if zygote is not None and zygote.can_fork(spec):
+            debug("Forking the backend: %s %s", spec["cmd_line"], spec["cwd"])
+            try:
+                self.proc = zygote.fork(spec, env)
+            except Exception:
+                logging.exception("Could not fork backend process, starting a new one")
+
+        if self.proc is None:
+            debug(_("Starting the backend: %s %s"), spec["cmd_line"], spec["cwd"])
+            # pipes are binary, because stdout may carry binary frames
+            self.proc = subprocess.Popen(
+                spec["cmd_line"],
+                # bufsize=0,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                cwd=spec["cwd"],
+                env=env,
+                creationflags=creationflags,
+            )
+
+    def connect(self):
+        """Sets up the channel for commands and messages and sends the init message"""
+        with self._lock:
+            if self.message_output is not None:
+                return
+
+            binary_offered = "binary" in self.spec["init_msg"].get("protocols", [])
+            if self._listener is not None:
+                try:
+                    self.message_socket = self._accept_connection()
+                finally:
+                    self._close_listener()
+
+                self.message_output = self.message_socket.makefile("wb")
+                self.message_parser = BackendOutputParser(
+                    self.message_socket.makefile("rb"),
+                    messages_only=True,
+                    binary_frames=binary_offered,
+                )
+            else:
+                self.message_output = self.proc.stdin
+                self.message_parser = BackendOutputParser(
+                    self.proc.stdout, binary_frames=binary_offered
+                )
+
+            # init message is always sent as text, backend chooses the protocol for the rest
+            init_msg = dict(self.spec["init_msg"], process_start_time=self._start_time)
+            self.message_output.write((serialize_message(init_msg) + "\n").encode("ASCII"))
+            self.message_output.flush()
+
+    def _accept_connection(self):
+        self._listener.settimeout(0.05)
+        while True:
+            try:
+                connection = self._listener.accept()[0]
+                connection.settimeout(None)
+                return connection
+            except socket.timeout:
+                if self.proc.poll() is not None:
+                    self._raise_start_error()
+
+    def _close_listener(self):
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
+            shutil.rmtree(self._socket_dir, ignore_errors=True)
+
+    def wait_until_ready(self):
+        """Returns backend's welcome message (ToplevelResponse) and the messages preceding it"""
+        self.connect()
+        with self._lock:
+            while self._ready_msg is None:
+                msgs = self.message_parser.read_messages()
+                if msgs is None:  # There was some problem
+                    self._raise_start_error()
+
+                for msg in msgs:
+                    if self._ready_msg is None and isinstance(msg, ToplevelResponse):
+                        self._ready_msg = msg
+                    else:
+                        self._preceding_msgs.append(msg)
+
+            return self._ready_msg, self._preceding_msgs
+
+    def warm_up(self):
+        try:
+            self.wait_until_ready()
+        except Exception:
+            if not self._killed:
+                logging.exception("Could not prepare backend process")
+
+    def _raise_start_error(self):
+        if self._error_msg is None:
+            self._error_msg = self.proc.stderr.read().decode("utf-8", errors="replace")
+        raise Exception(_("Error starting backend process: ") + self._error_msg)
+
+    def is_alive(self):
+        return not self._killed and self.proc.poll() is None
+
+    def kill(self):
+        self._killed = True
+        if self.proc.poll() is None:
+            self.proc.kill()
+
+        if self.message_socket is not None:
+            # shutdown makes also the files created with makefile see the end
+            try:
+                self.message_socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self.message_socket.close()
+
+        if self._listener is not None and not self._lock.locked():
+            self._close_listener()
+
+
+class BackendZygote:
+    """Fork server, which imports backend's modules once and forks new backend processes
+    (see thonny.backend_zygote for the protocol). Linux only.
+    
+    Forking is refused when the zygote finds it unsafe (eg. when a plug-in
+    has imported tkinter or started threads). BackendProcess starts a regular
+    process in this case.
+    """
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.unsafe_reason = None
+        self._ready = False
+        self._status_known = Event()
+
+        self._socket_dir = tempfile.mkdtemp(prefix="thonny-")
+        self._socket_path = os.path.join(self._socket_dir, "zygote.sock")
+        env = dict(
+            spec["env"],
+            THONNY_BACKEND_ZYGOTE=self._socket_path,
+            THONNY_FRONTEND_SYS_PATH=os.pathsep.join(spec["init_msg"]["frontend_sys_path"]),
+        )
+
+        debug("Starting backend zygote: %s", spec["cmd_line"])
+        # zygote exits when its stdin gets closed
+        self._proc = subprocess.Popen(
+            spec["cmd_line"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            cwd=spec["cwd"],
+            env=env,
+        )
+        Thread(target=self._read_status, daemon=True).start()
+
+    def _read_status(self):
+        status = self._proc.stdout.readline().decode("utf-8", errors="replace").strip()
+        if status == "ready":
+            self._ready = True
+        elif status.startswith("unsafe "):
+            self.unsafe_reason = status[len("unsafe ") :]
+            logging.warning("Backend zygote can't be used: %s", self.unsafe_reason)
+        else:
+            logging.warning("Backend zygote failed to start")
+        self._status_known.set()
+
+    def is_usable_for(self, spec):
+        """Tells whether this zygote (in whatever state) corresponds to given settings"""
+        return (
+            spec["env"] == self.spec["env"]
+            and spec["cmd_line"][: len(self.spec["cmd_line"])] == self.spec["cmd_line"]
+            and spec["init_msg"]["frontend_sys_path"]
+            == self.spec["init_msg"]["frontend_sys_path"]
+            and (self.unsafe_reason is not None or self._proc.poll() is None)
+        )
+
+    def can_fork(self, spec):
+        if not self.is_usable_for(spec):
+            return False
+
+        # GUI thread shouldn't wait until the zygote has imported everything.
+        # Meanwhile new processes get started in the regular way
+        return self._status_known.is_set() and self._ready and self._proc.poll() is None
+
+    def fork(self, spec, env):
+        """Returns a Popen-like object for the new backend process"""
+        # script name and arguments, as a new process would get them in sys.argv
+        argv = spec["cmd_line"][len(self.spec["cmd_line"]) - 1 :]
+        request = serialize_message({"argv": argv, "env": env, "cwd": spec["cwd"]})
+        payload = request.encode("ASCII")
+
+        stdin_read, stdin_write = os.pipe()
+        stdout_read, stdout_write = os.pipe()
+        stderr_read, stderr_write = os.pipe()
+        control = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            control.connect(self._socket_path)
+            control.sendmsg(
+                [struct.pack(">I", len(payload)) + payload],
+                [
+                    (
+                        socket.SOL_SOCKET,
+                        socket.SCM_RIGHTS,
+                        array.array("i", [stdin_read, stdout_write, stderr_write]),
+                    )
+                ],
+            )
+            reply = control.makefile("rb").readline()
+            if not reply.startswith(b"pid "):
+                raise RuntimeError("Unexpected reply from backend zygote: %r" % reply)
+        except Exception:
+            control.close()
+            for fd in [stdin_write, stdout_read, stderr_read]:
+                os.close(fd)
+            raise
+        finally:
+            # child has got its own copies
+            for fd in [stdin_read, stdout_write, stderr_write]:
+                os.close(fd)
+
+        return ForkedProcess(int(reply.split()[1]), control, stdin_write, stdout_read, stderr_read)
+
+    def kill(self):
+        if self._proc.poll() is None:
+            self._proc.kill()
+        shutil.rmtree(self._socket_dir, ignore_errors=True)
+
+
+class ForkedProcess:
+    """Popen-like handle for a backend process forked by BackendZygote.
+    
+    Exit code is reported by the zygote via the control connection.
+    """
+
+    def __init__(self, pid, control, stdin_fd, stdout_fd, stderr_fd):
+        self.pid = pid
+        self.returncode = None
+        self.stdin = open(stdin_fd, "wb")
+        self.stdout = open(stdout_fd, "rb")
+        self.stderr = open(stderr_fd, "rb")
+        self._control = control
+        self._control.setblocking(False)
+        self._control_data = b""
+
+    def poll(self):
+        if self.returncode is not None:
+            return self.returncode
+
+        try:
+            data = self._control.recv(1024)
+        except BlockingIOError:
+            return None
+        except OSError:
+            data = b""
+
+        self._control_data += data
+        if self._control_data.startswith(b"exit ") and self._control_data.endswith(b"\n"):
+            self.returncode = int(self._control_data.split()[1])
+            self._control.close()
+        elif data == b"":
+            # zygote has gone away and can't report the exit code
+            try:
+                os.kill(self.pid, 0)
+            except ProcessLookupError:
+                self.returncode = -signal.SIGKILL
+                self._control.close()
+
+        return self.returncode
+
+    def send_signal(self, sig):
+        if self.poll() is None:
+            try:
+                os.kill(self.pid, sig)
+            except ProcessLookupError:
+                pass
+
+    def kill(self):
+        self.send_signal(signal.SIGKILL)
+
+
+class BackendOutputParser:
+    """Splits backend's stdout into protocol messages and raw program output.
+    
+    Messages may be text lines (starting with MESSAGE_MARKER) or length-prefixed
+    binary frames (starting with BINARY_FRAME_MARKER). Everything else is output
+    of processes which couldn't be captured by stream faking (eg. subprocesses)
+    and is reported as ProgramOutput.
+    
+    With messages_only the stream (eg. a socket) is expected to contain only messages
+    and anything else is an error.
+
+    Binary frames are recognized only if binary protocol was offered to the backend
+    (binary_frames) and until the backend answers with a text message, which means
+    it chose the text protocol.
+    """
+
+    def __init__(self, stream, messages_only=False, binary_frames=False):
+        self._stream = stream
+        self._messages_only = messages_only
+        self._binary_frames = binary_frames
+        self._seen_binary_frame = False
+        self._buffer = b""
+        self._raw_decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._raw_newline_normalizer = _NewlineNormalizer()
+
+    def read_messages(self):
+        """Blocks until at least some data is available.
+        
+        Returns list of complete messages (may be empty) or None in case of EOF"""
+        if hasattr(self._stream, "read1"):
+            data = self._stream.read1(65536)
+        else:
+            data = self._stream.read(1)
+
+        if data == b"":
+            return None
+
+        self._buffer += data
+        return self._consume_buffer()
+
+    def _consume_buffer(self):
+        result = []
+        buf = self._buffer
+        pos = 0
+        text_marker = ord(MESSAGE_MARKER)
+        frame_marker = ord(BINARY_FRAME_MARKER)
+
+        while pos < len(buf):
+            first = buf[pos]
+            if first == frame_marker and self._binary_frames:
+                if len(buf) - pos < BINARY_FRAME_HEADER_SIZE:
+                    break
+                size = parse_binary_frame_header(buf[pos : pos + BINARY_FRAME_HEADER_SIZE])
+                payload_start = pos + BINARY_FRAME_HEADER_SIZE
+                if size > MAX_BINARY_FRAME_SIZE or (
+                    # messages are always encoded as records
+                    len(buf) > payload_start
+                    and buf[payload_start] != ord("r")
+                ):
+                    if self._messages_only:
+                        raise ValueError("Implausible binary frame: %r" % buf[pos : pos + 100])
+                    # Marker was printed by a subprocess
+                    result.append(self._create_raw_output(buf[pos : pos + 1]))
+                    pos += 1
+                    continue
+                end = pos + BINARY_FRAME_HEADER_SIZE + size
+                if len(buf) < end:
+                    break
+                payload = buf[pos + BINARY_FRAME_HEADER_SIZE : end]
+                try:
+                    result.append(parse_binary_message(payload))
+                    self._seen_binary_frame = True
+                except Exception:
+                    if self._messages_only:
+                        raise
+                    traceback.print_exc()
+                    # Marker was probably printed by a subprocess
+                    result.append(self._create_raw_output(buf[pos:end]))
+                pos = end
+
+            elif first == text_marker:
+                line_end = buf.find(b"\n", pos)
+                if line_end == -1:
+                    break
+                line = buf[pos : line_end + 1]
+                try:
+                    result.append(parse_message(line.decode("ASCII")))
+                    if not self._seen_binary_frame:
+                        # backend chose text protocol
+                        self._binary_frames = False
+                except Exception:
+                    if self._messages_only:
+                        raise
+                    traceback.print_exc()
+                    # Can mean the line was from subprocess,
+                    # which can't be captured by stream faking.
+                    result.append(self._create_raw_output(line))
+                pos = line_end + 1
+
+            elif self._messages_only:
+                raise ValueError("Unexpected data in message stream: %r" % buf[pos : pos + 100])
+
+            else:
+                # raw output lasts until the end of the line or until next message
+                end = len(buf)
+                terminators = [b"\n", MESSAGE_MARKER.encode("ASCII")]
+                if self._binary_frames:
+                    terminators.append(BINARY_FRAME_MARKER)
+                for terminator in terminators:
+                    i = buf.find(terminator, pos, end)
+                    if i != -1:
+                        end = i + 1 if terminator == b"\n" else i
+                result.append(self._create_raw_output(buf[pos:end]))
+                pos = end
+
+        self._buffer = buf[pos:]
+        return result
+
+    def _create_raw_output(self, data):
+        return BackendEvent(
+            "ProgramOutput",
+            data=self._raw_newline_normalizer.normalize(self._raw_decoder.decode(data)),
+            stream_name="stdout",
+        )
+
+
+class MessageQueue:
+    """Bounded deque for passing messages from listener threads to GUI thread.
+    
+    append blocks until GUI thread has taken something out of a full queue
+    (or until the queue is closed).
+    Counters in get_stats help to tell whether a slow print loop is limited
+    by the backend (queue mostly empty) or by the GUI thread (producers often blocked).
+    """
+
+    def __init__(self, maxsize, notify=None):
+        self._maxsize = maxsize
+        self._notify = notify
+        self._items = collections.deque()
+        self._condition = Condition()
+        self._closed = False
+
+        self._appended_count = 0
+        self._drained_count = 0
+        self._max_depth = 0
+        self._blocked_count = 0
+        self._blocked_time = 0.0
+        self._last_stats_time = time.time()
+        self._last_stats_drained_count = 0
+
+    def append(self, item, block=True):
+        with self._condition:
+            if block and len(self._items) >= self._maxsize and not self._closed:
+                self._blocked_count += 1
+                wait_start = time.time()
+                while len(self._items) >= self._maxsize and not self._closed:
+                    self._condition.wait()
+                self._blocked_time += time.time() - wait_start
+
+            if self._closed:
+                return
+
+            self._items.append(item)
+            self._appended_count += 1
+            self._max_depth = max(self._max_depth, len(self._items))
+
+        if self._notify is not None:
+            self._notify()
+
+    def appendleft(self, item):
+        """Puts back an item taken with popleft. Never blocks"""
+        with self._condition:
+            self._items.appendleft(item)
+            self._drained_count -= 1
+
+    def popleft(self):
+        with self._condition:
+            item = self._items.popleft()
+            self._drained_count += 1
+            self._condition.notify_all()
+            return item
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._items.clear()
+            self._condition.notify_all()
+
+    def get_stats(self):
+        """Drain rate is measured since previous call"""
+        with self._condition:
+            now = time.time()
+            elapsed = now - self._last_stats_time
+            drained = self._drained_count - self._last_stats_drained_count
+            self._last_stats_time = now
+            self._last_stats_drained_count = self._drained_count
+
+            return {
+                "depth": len(self._items),
+                "max_depth": self._max_depth,
+                "appended_count": self._appended_count,
+                "drained_count": self._drained_count,
+                "drain_rate": drained / elapsed if elapsed > 0 else 0.0,
+                "blocked_count": self._blocked_count,
+                "blocked_time": self._blocked_time,
+            }
+
+    def __len__(self):
+        return len(self._items)
+
+
+class WakeupPipe:
+    """Lets other threads wake up Tk event loop (self-pipe trick).
+    
+    notify may be called from any thread, callback gets called in Tk thread.
+    """
+
+    def __init__(self, tk_app, callback):
+        self._tk_app = tk_app
+        self._callback = callback
+        self._notified = False
+        self._read_fd, self._write_fd = os.pipe()
+        os.set_blocking(self._read_fd, False)
+        os.set_blocking(self._write_fd, False)
+        try:
+            tk_app.tk.createfilehandler(self._read_fd, tk.READABLE, self._on_readable)
+        except Exception:
+            self._close_fds()
+            raise
+
+    def notify(self):
+        if self._notified:
+            # Tk thread hasn't handled previous notification yet
+            return
+
+        self._notified = True
+        try:
+            os.write(self._write_fd, b"!")
+        except BlockingIOError:
+            # full pipe is a pending notification anyway
+            pass
+
+    def _on_readable(self, fd, mask):
+        self._notified = False
+        try:
+            while os.read(self._read_fd, 4096):
+                pass
+        except BlockingIOError:
+            pass
+
+        self._callback()
+
+    def close(self):
+        self._tk_app.tk.deletefilehandler(self._read_fd)
+        self._close_fds()
+
+    def _close_fds(self):
+        os.close(self._read_fd)
+        os.close(self._write_fd)
+
+
+def _normalize_newlines(s):
+    # imitate universal newlines mode
+    return s.replace("\r\n", "\n").replace("\r", "\n")
+
+
+class _NewlineNormalizer:
+    """Imitates universal newlines mode for text arriving in chunks,
+    where \r\n may be split between two chunks"""
+
+    def __init__(self):
+        self._after_cr = False
+
+    def normalize(self, s):
+        if not s:
+            return s
+
+        if self._after_cr and s.startswith("\n"):
+            # \r at the end of previous chunk was already turned into \n
+            s = s[1:]
+        self._after_cr = s.endswith("\r")
+        return _normalize_newlines(s)
+
+
 class PrivateVenvCPythonProxy(CPythonProxy):
     def __init__(self, clean):
         self._prepare_private_venv()
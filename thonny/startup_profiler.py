@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+Records the durations of frontend startup steps (from launch() until the backend
+has become ready for the first time) in Chrome trace event format
+(https://docs.google.com/document/d/1CvAClvFfyA5R-PhYUmn5OOQtYMH4h6I0nSsKtqABVTQ).
+
+The trace gets saved to THONNY_USER_DIR/startup_trace.json and can be
+inspected with chrome://tracing, https://ui.perfetto.dev or speedscope.
+
+Startup phases reported by the backend (see VM._get_startup_durations) are
+included as a separate track.
+"""
+
+import contextlib
+import functools
+import json
+import logging
+import os.path
+import platform
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple  # pylint: disable=unused-import
+
+TRACE_FILENAME = "startup_trace.json"
+
+_origin = time.perf_counter()
+_origin_wall_time = time.time()
+_events = []  # type: List[Dict[str, Any]]
+_recording = True
+_backend_start = None  # type: Optional[float]
+
+_FRONTEND_TID = 1
+_BACKEND_TID = 2
+
+
+def _get_timestamp(perf_counter_value: Optional[float] = None) -> float:
+    """Microseconds since the start of recording"""
+    if perf_counter_value is None:
+        perf_counter_value = time.perf_counter()
+    return round((perf_counter_value - _origin) * 1000000, 1)
+
+
+def _add_event(**event) -> None:
+    event.setdefault("pid", os.getpid())
+    event.setdefault("tid", _FRONTEND_TID)
+    _events.append(event)
+
+
+def is_recording() -> bool:
+    return _recording
+
+
+@contextlib.contextmanager
+def phase(name: str, **args):
+    """Records the duration of the with-block as a phase of startup"""
+    if not _recording or threading.current_thread() is not threading.main_thread():
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        event = dict(
+            name=name,
+            ph="X",
+            ts=_get_timestamp(start),
+            dur=round((time.perf_counter() - start) * 1000000, 1),
+        )
+        if args:
+            event["args"] = args
+        _add_event(**event)
+
+
+def traced(func):
+    """Decorator, which records the calls of given function or method during startup"""
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _recording:
+            return func(*args, **kwargs)
+
+        with phase(func.__name__):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+def mark(name: str, **args) -> None:
+    """Records an instant event"""
+    if _recording:
+        _add_event(name=name, ph="i", s="p", ts=_get_timestamp(), args=args)
+
+
+def record_backend_start() -> None:
+    global _backend_start
+    if _recording and _backend_start is None:
+        _backend_start = time.perf_counter()
+
+
+def record_backend_ready(startup_phases: Optional[List[Tuple[str, float]]]) -> None:
+    """Records the time between starting the backend process and receiving its
+    welcome message. Backend's own startup phases get laid out inside this span."""
+    if not _recording or _backend_start is None:
+        return
+
+    now = time.perf_counter()
+    _add_event(
+        name="backend startup",
+        ph="X",
+        tid=_BACKEND_TID,
+        ts=_get_timestamp(_backend_start),
+        dur=round((now - _backend_start) * 1000000, 1),
+    )
+
+    if startup_phases:
+        # backend reports durations only, consecutive phases end when the message is sent
+        total = sum(duration for _, duration in startup_phases)
+        start = max(_backend_start, now - total)
+        for name, duration in startup_phases:
+            _add_event(
+                name=name,
+                ph="X",
+                tid=_BACKEND_TID,
+                ts=_get_timestamp(start),
+                dur=round(duration * 1000000, 1),
+            )
+            start += duration
+
+    mark("backend ready")
+
+
+def finish() -> None:
+    """Stops recording and saves the trace under THONNY_USER_DIR"""
+    global _recording
+    if not _recording:
+        return
+
+    mark("startup finished")
+    _recording = False
+    try:
+        save(get_trace_path())
+    except Exception:
+        logging.exception("Could not save startup trace")
+
+
+def get_trace_path() -> str:
+    from thonny import THONNY_USER_DIR
+
+    return os.path.join(THONNY_USER_DIR, TRACE_FILENAME)
+
+
+def get_trace() -> Dict[str, Any]:
+    from thonny import get_version
+
+    pid = os.getpid()
+    metadata = [
+        dict(name="process_name", ph="M", pid=pid, args={"name": "Thonny"}),
+        dict(name="thread_name", ph="M", pid=pid, tid=_FRONTEND_TID, args={"name": "UI"}),
+        dict(name="thread_name", ph="M", pid=pid, tid=_BACKEND_TID, args={"name": "Backend"}),
+    ]
+
+    return {
+        "traceEvents": metadata + _events,
+        "displayTimeUnit": "ms",
+        "otherData": {
+            "thonny_version": get_version(),
+            "python_version": sys.version,
+            "platform": platform.platform(),
+            "start_time": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(_origin_wall_time)),
+        },
+    }
+
+
+def save(path: str) -> None:
+    with open(path, "w", encoding="utf-8") as fp:
+        json.dump(get_trace(), fp, indent=1)
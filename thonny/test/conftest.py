@@ -0,0 +1,105 @@
+import os.path
+import sys
+
+import pytest
+
+import thonny.backend_launcher
+from thonny.common import (
+    BackendEvent,
+    DebuggerCommand,
+    DebuggerResponse,
+    InlineResponse,
+    ToplevelResponse,
+    serialize_binary_message,
+)
+
+
+class BackendSession:
+    """Talks to a real backend process the way the frontend does"""
+
+    def __init__(self, process):
+        self.process = process
+        self.ready_msg, _ = process.wait_until_ready()
+        self.output = []
+        self._pending_msgs = []
+
+    def send(self, cmd):
+        self.process.message_output.write(serialize_binary_message(cmd))
+        self.process.message_output.flush()
+
+    def receive(self, types=(DebuggerResponse, ToplevelResponse, InlineResponse)):
+        """Returns next message of given types, program output gets collected on the way"""
+        while True:
+            if not self._pending_msgs:
+                msgs = self.process.message_parser.read_messages()
+                assert msgs is not None, "backend has exited"
+                self._pending_msgs.extend(msgs)
+                continue
+
+            msg = self._pending_msgs.pop(0)
+            if isinstance(msg, BackendEvent) and msg.event_type == "ProgramOutput":
+                self.output.append(msg["data"])
+            elif isinstance(msg, types):
+                return msg
+
+    def debug(self, cmd, commands):
+        """Sends the Run/Debug command and answers each debugger stop with next of the
+        commands (name and breakpoints, last one gets repeated).
+
+        Returns the stops as (line number, code name) pairs"""
+        self.send(cmd)
+        stops = []
+        msg = self.receive((DebuggerResponse, ToplevelResponse))
+        while isinstance(msg, DebuggerResponse):
+            frame = msg["stack"][-1]
+            stops.append((frame.lineno, frame.code_name))
+            name, breakpoints = commands[min(len(stops), len(commands)) - 1]
+            self.send(
+                DebuggerCommand(
+                    name,
+                    breakpoints=breakpoints,
+                    cursor_position=None,
+                    frame_id=frame.id,
+                    state=frame.event,
+                    focus=frame.focus,
+                    allow_stepping_into_libraries=False,
+                )
+            )
+            msg = self.receive((DebuggerResponse, ToplevelResponse))
+
+        return stops
+
+    def close(self):
+        self.process.kill()
+
+
+@pytest.fixture
+def backend_spec(tmpdir):
+    """Spec of a backend process with the interpreter running the tests"""
+    work_dir = str(tmpdir)
+    return {
+        "cmd_line": [sys.executable, "-u", "-B", thonny.backend_launcher.__file__],
+        "env": dict(os.environ, PYTHONIOENCODING="utf-8", THONNY_USER_DIR=work_dir),
+        "cwd": work_dir,
+        "socket_transport": False,
+        "init_msg": {"frontend_sys_path": list(sys.path), "protocols": ["binary"]},
+    }
+
+
+@pytest.fixture
+def start_backend(backend_spec):
+    """Returns a function, which starts a backend (with given init message options)
+    and returns a BackendSession for it"""
+    from thonny.running import BackendProcess
+
+    sessions = []
+
+    def start(zygote=None, **init_msg_options):
+        spec = dict(backend_spec, init_msg=dict(backend_spec["init_msg"], **init_msg_options))
+        sessions.append(BackendSession(BackendProcess(spec, zygote)))
+        return sessions[-1]
+
+    yield start
+
+    for session in sessions:
+        session.close()
@@ -0,0 +1,49 @@
+import io
+
+from thonny.common import ToplevelResponse, serialize_binary_message, serialize_message
+from thonny.running import BackendOutputParser, _NewlineNormalizer
+
+
+def _parse(data, **kw):
+    parser = BackendOutputParser(io.BytesIO(data), **kw)
+    result = []
+    while True:
+        msgs = parser.read_messages()
+        if msgs is None:
+            return result
+        result.extend(msgs)
+
+
+def _describe(msgs):
+    return [
+        msg["data"] if msg.get("event_type") == "ProgramOutput" else type(msg).__name__
+        for msg in msgs
+    ]
+
+
+def test_frames_only_with_binary_protocol():
+    frame = serialize_binary_message(ToplevelResponse(x=1))
+    assert _describe(_parse(b"a\n" + frame, binary_frames=True)) == ["a\n", "ToplevelResponse"]
+
+    msgs = _parse(b"\x03\x00\x00\x00\x00\x05abc\n", binary_frames=False)
+    assert "".join(_describe(msgs)) == "\x03\x00\x00\x00\x00\x05abc\n"
+
+
+def test_text_protocol_disables_frames():
+    text = (serialize_message(ToplevelResponse(x=1)) + "\n").encode("ASCII")
+    msgs = _parse(text + b"\x03\x00\x00\x00\x02ab\n", binary_frames=True)
+    assert _describe(msgs)[0] == "ToplevelResponse"
+    assert "".join(_describe(msgs)[1:]) == "\x03\x00\x00\x00\x02ab\n"
+
+
+def test_implausible_frame_is_output():
+    frame = serialize_binary_message(ToplevelResponse(x=1))
+    msgs = _parse(b"\x03\xff\xff\xff\xff\xff\xff\xff\xffzz\n" + frame, binary_frames=True)
+    assert _describe(msgs)[-1] == "ToplevelResponse"
+    assert "".join(_describe(msgs)[:-1]).endswith("zz\n")
+
+
+def test_crlf_split_between_chunks():
+    normalizer = _NewlineNormalizer()
+    chunks = ["a\r", "\nb\r", "", "\n", "c\r", "d\r\n"]
+    assert "".join(normalizer.normalize(chunk) for chunk in chunks) == "a\nb\nc\nd\n"
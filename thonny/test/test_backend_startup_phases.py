@@ -0,0 +1,25 @@
+from thonny.common import format_startup_phases
+
+
+def test_welcome_message_reports_startup_phases(start_backend):
+    session = start_backend()
+    phases = session.ready_msg["startup_phases"]
+    assert all(0 <= duration < 60 for _, duration in phases)
+
+    # each plug-in gets its own phase
+    assert [name for name, _ in phases if not name.startswith("plugin ")] == [
+        "interpreter start",
+        "thonny import",
+        "logging setup",
+        "backend import",
+        "vm setup",
+        "fake streams",
+        "init message wait",
+        "environment cleanup",
+        "shared modules",
+    ]
+    assert "plugin thonny.plugins.backend.tabular_data_backend" in dict(phases)
+
+
+def test_format_startup_phases():
+    assert format_startup_phases([("a", 0.0015), ("b", 1)]) == "a 1.5 ms, b 1000.0 ms"
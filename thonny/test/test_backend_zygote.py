@@ -0,0 +1,58 @@
+import os.path
+import sys
+import time
+
+import pytest
+
+from thonny.common import ToplevelCommand, ToplevelResponse
+from thonny.running import BackendZygote, ForkedProcess
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="Linux only")
+def test_reuse_rules_and_forking(tmpdir, backend_spec, start_backend):
+    spec = backend_spec
+    zygote = BackendZygote(spec)
+    try:
+        deadline = time.time() + 30
+        while not zygote.can_fork(spec) and time.time() < deadline:
+            if zygote.unsafe_reason is not None:
+                pytest.skip("Zygote is unsafe here: " + zygote.unsafe_reason)
+            time.sleep(0.05)
+        assert zygote.can_fork(spec)
+
+        # script and its arguments may differ
+        assert zygote.is_usable_for(dict(spec, cmd_line=spec["cmd_line"] + ["a.py", "arg"]))
+        # everything decided before forking may not
+        assert not zygote.is_usable_for(dict(spec, env=dict(spec["env"], X="1")))
+        assert not zygote.is_usable_for(
+            dict(spec, cmd_line=[sys.executable + "x"] + spec["cmd_line"][1:])
+        )
+        assert not zygote.is_usable_for(
+            dict(spec, init_msg=dict(spec["init_msg"], frontend_sys_path=sys.path + ["x"]))
+        )
+
+        script_path = os.path.join(str(tmpdir), "prog.py")
+        with open(script_path, "w", encoding="utf-8") as fp:
+            fp.write("import os\nprint('forked', os.getppid() != os.getpid())\n")
+
+        session = start_backend(zygote)
+        assert isinstance(session.process.proc, ForkedProcess)
+        session.send(ToplevelCommand("Run", args=[script_path]))
+        session.receive(ToplevelResponse)
+        assert "".join(session.output) == "forked True\n"
+
+        # exit code gets reported via the zygote
+        session.close()
+        deadline = time.time() + 10
+        while session.process.proc.poll() is None and time.time() < deadline:
+            time.sleep(0.01)
+        assert session.process.proc.poll() is not None
+    finally:
+        zygote.kill()
+
+    # dead zygote doesn't get reused
+    deadline = time.time() + 10
+    while zygote.is_usable_for(spec) and time.time() < deadline:
+        time.sleep(0.01)
+    assert not zygote.is_usable_for(spec)
+    assert not zygote.can_fork(spec)
@@ -0,0 +1,77 @@
+import gc
+import time
+import weakref
+
+from thonny import bounded_repr as br
+from thonny.bounded_repr import bounded_repr
+
+
+def test_same_as_repr_within_budget():
+    recursive_list = [1, 2]
+    recursive_list.append(recursive_list)
+    recursive_dict = {"a": None}
+    recursive_dict["self"] = recursive_dict
+
+    for value in [
+        [1, "a", b"b", 2.5, None, True],
+        (1,),
+        (),
+        {1: [2, (3,)], "x": {"y": frozenset([4])}},
+        set(),
+        frozenset(),
+        {5},
+        bytearray(b"abc"),
+        'quotes \' and "',
+        recursive_list,
+        recursive_dict,
+        range(3),
+        2 ** 100,
+    ]:
+        assert bounded_repr(value, 1000) == repr(value)
+
+
+def test_truncation():
+    assert bounded_repr(list(range(10)), 10) == repr(list(range(10)))[:10] + "…"
+    assert bounded_repr("x" * 100, 5) == "'xxxx…"
+    assert bounded_repr([1, 2], len("[1, 2]")) == "[1, 2]"
+
+    huge = list(range(10 ** 6))
+    start = time.perf_counter()
+    assert bounded_repr(huge, 100) == repr(huge[:100])[:100] + "…"
+    assert time.perf_counter() - start < 0.1
+
+
+def test_summaries(monkeypatch):
+    assert bounded_repr(10 ** 5000, 100) == "<int with about 5001 digits>"
+
+    class Slow:
+        def __repr__(self):
+            time.sleep(0.06)
+            return "slow"
+
+    monkeypatch.setattr(br, "_slow_reprs", br._slow_reprs.copy())
+    value = Slow()
+    assert bounded_repr(value, 100) == "slow"
+    assert bounded_repr(value, 100) == object.__repr__(value)
+
+    # without length, the type is considered slow only for some time
+    monkeypatch.setattr(br, "_SLOW_REPR_EXPIRATION_TIME", 0)
+    assert bounded_repr(value, 100) == "slow"
+
+    class SlowWhenLong(list):
+        def __repr__(self):
+            if len(self) > 2:
+                time.sleep(0.06)
+            return "long" if len(self) > 2 else "short"
+
+    long_value = SlowWhenLong([1, 2, 3])
+    assert bounded_repr(long_value, 100) == "long"
+    assert bounded_repr(SlowWhenLong([1, 2, 3, 4]), 100).startswith("<")
+    assert bounded_repr(SlowWhenLong([1]), 100) == "short"
+
+    # remembering slowness doesn't keep the classes alive
+    slow_class_ref = weakref.ref(Slow)
+    del Slow, value
+    gc.collect()
+    assert slow_class_ref() is None
+    assert SlowWhenLong in br._slow_reprs
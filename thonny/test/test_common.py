@@ -31,3 +31,134 @@ def test_path_startswith():
         assert path_startswith("c:\\foo\\bar.txt/kala\\pala", "C:\\")
 
         assert not path_startswith("C:\\kalapala\\pala", "C:\\kala")
+
+
+def test_binary_message_roundtrip():
+    from thonny.common import (
+        BINARY_FRAME_HEADER_SIZE,
+        DebuggerResponse,
+        FrameInfo,
+        TextRange,
+        ValueInfo,
+        parse_binary_frame_header,
+        parse_binary_message,
+        serialize_binary_message,
+    )
+
+    frame = FrameInfo(
+        id=1,
+        filename="/tmp/õun.py",
+        module_name="__main__",
+        code_name="<module>",
+        source="x = 1\n",
+        source_hash=None,
+        lineno=1,
+        firstlineno=1,
+        in_library=False,
+        locals=None,
+        globals={"x": ValueInfo(123, "1")},
+        freevars=(),
+        event="before_statement",
+        focus=TextRange(1, 0, 1, 5),
+        node_tags={"class=Assign"},
+        current_statement=None,
+        current_root_expression=None,
+        current_evaluations=[],
+    )
+    msg = DebuggerResponse(stack=[frame], big=2 ** 100, data=b"\x00\x03", ratio=0.5)
+
+    frame_bytes = serialize_binary_message(msg)
+    size = parse_binary_frame_header(frame_bytes[:BINARY_FRAME_HEADER_SIZE])
+    assert size == len(frame_bytes) - BINARY_FRAME_HEADER_SIZE
+
+    result = parse_binary_message(frame_bytes[BINARY_FRAME_HEADER_SIZE:])
+    assert result == msg
+    assert isinstance(result.stack[0], FrameInfo)
+    assert isinstance(result.stack[0].focus, TextRange)
+
+
+def test_decode_repr():
+    from thonny.common import (
+        ReprDecodeError,
+        TextRange,
+        ToplevelResponse,
+        ValueInfo,
+        decode_repr,
+        parse_message,
+        serialize_message,
+    )
+
+    msg = ToplevelResponse(
+        value_info=ValueInfo(1, "'õun'\n"),
+        focus=TextRange(1, 0, 2, -1),
+        items=[(), (1,), set(), {1, 2}, {}, {"a": [1.5e-10, None]}, b"\x00'"],
+        text="\\'\"\udc80",
+    )
+    assert parse_message(serialize_message(msg)) == msg
+
+    nan = decode_repr("[nan, -inf]")
+    assert nan[0] != nan[0] and nan[1] == float("-inf")
+
+    for source in ["__import__('os').system('ls')", "ToplevelResponse(x=open('f'))", "x.y", "1+1"]:
+        try:
+            decode_repr(source)
+        except ReprDecodeError:
+            pass
+        else:
+            raise AssertionError("Accepted " + source)
+
+
+def test_stack_delta_roundtrip():
+    from thonny.common import (
+        FrameInfo,
+        TextRange,
+        ValueInfo,
+        apply_stack_delta,
+        create_stack_delta,
+    )
+
+    def frame(id, locals, globals, focus):
+        return FrameInfo(
+            id=id,
+            filename="/tmp/prog.py",
+            module_name="__main__",
+            code_name="f",
+            source="def f(a):\n    b = a\n",
+            source_hash=None,
+            lineno=focus.lineno,
+            firstlineno=1,
+            in_library=False,
+            locals=locals,
+            globals=globals,
+            freevars=(),
+            event="line",
+            focus=focus,
+            node_tags=None,
+            current_statement=None,
+            current_root_expression=None,
+            current_evaluations=None,
+        )
+
+    glob = {"f": ValueInfo(1, "<function f>"), "x": ValueInfo(2, "1")}
+    base = [
+        frame(10, None, glob, TextRange(3, 0, 4, 0)),
+        frame(11, {"a": ValueInfo(3, "3")}, glob, TextRange(2, 0, 3, 0)),
+    ]
+    new_glob = {"f": ValueInfo(1, "<function f>"), "y": ValueInfo(4, "4")}
+    new = [
+        base[0]._replace(globals=new_glob),
+        base[1]._replace(
+            locals={"a": ValueInfo(3, "3"), "b": ValueInfo(3, "3")}, globals=new_glob, lineno=3
+        ),
+        frame(12, {}, new_glob, TextRange(1, 0, 2, 0)),
+    ]
+
+    delta = create_stack_delta(base, new)
+    assert delta[0] == {
+        "id": 10,
+        "globals_changes": {"y": ValueInfo(4, "4")},
+        "globals_removed": ["x"],
+    }
+    assert "source" not in delta[1] and "a" not in delta[1]["locals_changes"]
+    assert delta[2] is new[2]
+    assert apply_stack_delta(base, delta) == new
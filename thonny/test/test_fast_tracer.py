@@ -0,0 +1,118 @@
+import os.path
+import sys
+
+import pytest
+
+from thonny.common import ToplevelCommand
+
+PROGRAM = """def f():
+    x = 1
+    for i in range(3):
+        x += i
+    return x
+
+
+def g(y):
+    return y * 2
+
+
+y = f()
+print(g(y))
+"""
+
+THREAD_PROGRAM = """import sys
+import threading
+
+
+def work():
+    return 1
+
+
+thread = threading.Thread(target=work)
+thread.start()
+thread.join()
+print(work(), sys.monitoring.get_tool(sys.monitoring.DEBUGGER_ID))
+"""
+
+_TRACER_PARAMS = [
+    pytest.param(False, id="FastTracer"),
+    pytest.param(
+        True,
+        id="MonitoringTracer",
+        marks=pytest.mark.skipif(not hasattr(sys, "monitoring"), reason="Python 3.12+ only"),
+    ),
+]
+
+
+def _fast_debug(tmpdir, start_backend, commands, use_sys_monitoring, program=PROGRAM):
+    script_path = os.path.join(str(tmpdir), "prog.py")
+    with open(script_path, "w", encoding="utf-8") as fp:
+        fp.write(program)
+
+    session = start_backend()
+    stops = session.debug(
+        ToplevelCommand(
+            "FastDebug",
+            args=[script_path],
+            breakpoints={},
+            use_sys_monitoring=use_sys_monitoring,
+        ),
+        [(name, {script_path: lines}) for name, lines in commands],
+    )
+    return stops, "".join(session.output)
+
+
+@pytest.mark.parametrize("use_sys_monitoring", _TRACER_PARAMS)
+def test_stops_at_breakpoint_set_after_entering_frame(tmpdir, start_backend, use_sys_monitoring):
+    # f gets entered while there are no breakpoints, g only after the breakpoints are set
+    stops, output = _fast_debug(
+        tmpdir,
+        start_backend,
+        [("step_into", set())] * 4 + [("resume", {5, 9})],
+        use_sys_monitoring,
+    )
+    assert stops == [
+        (1, "<module>"),
+        (8, "<module>"),
+        (12, "<module>"),
+        (2, "f"),
+        (3, "f"),
+        (5, "f"),
+        (9, "g"),
+    ]
+    assert output == "8\n"
+
+
+@pytest.mark.parametrize("use_sys_monitoring", _TRACER_PARAMS)
+def test_stepping(tmpdir, start_backend, use_sys_monitoring):
+    stops, output = _fast_debug(
+        tmpdir,
+        start_backend,
+        [("step_into", set())] * 4
+        + [("step_over", set())] * 3
+        + [("step_out", set()), ("step_into", set()), ("step_over", set())],
+        use_sys_monitoring,
+    )
+    assert stops == [
+        (1, "<module>"),
+        (8, "<module>"),
+        (12, "<module>"),
+        (2, "f"),
+        (3, "f"),
+        (4, "f"),
+        (3, "f"),
+        (4, "f"),
+        (13, "<module>"),
+        (9, "g"),
+    ]
+    assert output == "8\n"
+
+
+@pytest.mark.skipif(not hasattr(sys, "monitoring"), reason="Python 3.12+ only")
+def test_monitoring_tracer_ignores_other_threads(tmpdir, start_backend):
+    # sys.monitoring reports events of all threads, but only the main thread may stop
+    stops, output = _fast_debug(
+        tmpdir, start_backend, [("resume", {6})], True, program=THREAD_PROGRAM
+    )
+    assert stops == [(1, "<module>"), (6, "work")]
+    assert output == "1 Thonny\n"
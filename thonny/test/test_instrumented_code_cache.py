@@ -0,0 +1,39 @@
+import os.path
+
+from thonny.backend import InstrumentedCodeCache
+
+
+def test_entries_are_keyed_by_source_and_file(tmpdir):
+    cache = InstrumentedCodeCache(str(tmpdir))
+    key = cache.get_key(b"x = 1\n", "a.py", "exec")
+    assert cache.get_key("x = 1\n", "a.py", "exec") == key
+    assert cache.get_key(b"x = 2\n", "a.py", "exec") != key
+    assert cache.get_key(b"x = 1\n", "b.py", "exec") != key
+    assert cache.get_key(b"x = 1\n", "a.py", "exec", "lazy") != key
+    assert cache.load(key) is None
+
+    code = compile("x = 1\n", "a.py", "exec")
+    table = [(1, 1, 0, 1, 5, {"skipexport"}, None)]
+    cache.save(key, code, table)
+
+    loaded_code, loaded_table = InstrumentedCodeCache(str(tmpdir)).load(key)
+    assert loaded_code == code
+    assert [tuple(row) for row in loaded_table] == table
+
+
+def test_broken_and_old_entries(tmpdir):
+    cache = InstrumentedCodeCache(str(tmpdir), max_files=2)
+    code = compile("pass", "a.py", "exec")
+    keys = [cache.get_key(str(i), "a.py", "exec") for i in range(3)]
+    for i, key in enumerate(keys):
+        cache.save(key, code, [])
+        # make modification times distinguishable
+        os.utime(os.path.join(str(tmpdir), key + ".bin"), (i, i))
+
+    cache.save(keys[2], code, [])
+    assert cache.load(keys[0]) is None
+    assert cache.load(keys[1]) is not None
+
+    with open(os.path.join(str(tmpdir), keys[1] + ".bin"), "wb") as fp:
+        fp.write(b"garbage")
+    assert cache.load(keys[1]) is None
@@ -0,0 +1,46 @@
+import ast
+import os.path
+
+from thonny.backend import _iter_nested_codes, _walk_outside_functions
+from thonny.common import ToplevelCommand
+
+PROGRAM = """
+def outer(n):
+    def inner(k):
+        return k + n
+
+    return inner(n)
+
+
+cheap_code = outer.__code__
+outer(1)
+print(outer.__code__ is not cheap_code, "_thonny_hidden_after_expr" in outer.__code__.co_names)
+"""
+
+
+def test_lazy_instrumentation_helpers():
+    source = "def f(x):\n    for a in x:\n        g = lambda: a\nfor b in []:\n    pass\n"
+    names = [
+        node.id for node in _walk_outside_functions(ast.parse(source)) if isinstance(node, ast.Name)
+    ]
+    assert names == ["b"]
+
+    code = compile(source, "a.py", "exec")
+    assert [c.co_name for c in _iter_nested_codes(code)] == ["f", "<lambda>"]
+
+
+def test_function_gets_instrumented_after_first_call(tmpdir, start_backend):
+    script_path = os.path.join(str(tmpdir), "prog.py")
+    with open(script_path, "w", encoding="utf-8") as fp:
+        fp.write(PROGRAM)
+
+    # the breakpoint is in the closure, which gets created and called by uninstrumented code
+    breakpoints = {script_path: {PROGRAM.splitlines().index("        return k + n") + 1}}
+    session = start_backend()
+    session.debug(
+        ToplevelCommand(
+            "Debug", args=[script_path], breakpoints=breakpoints, lazy_instrumentation=True
+        ),
+        [("resume", breakpoints)],
+    )
+    assert "".join(session.output) == "True True\n"
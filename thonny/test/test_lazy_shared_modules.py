@@ -0,0 +1,24 @@
+import importlib.util
+
+import pytest
+
+from thonny.common import InlineCommand, InlineResponse, ToplevelCommand, ToplevelResponse
+
+CHECK_SOURCE = "print(sorted(set(__import__('sys').modules) & {'jedi', 'parso', 'asttokens'}))"
+
+
+def test_modules_get_imported_on_first_use(start_backend):
+    session = start_backend(preload_shared_modules=False)
+    session.send(ToplevelCommand("execute_source", source=CHECK_SOURCE))
+    session.receive(ToplevelResponse)
+    assert "".join(session.output) == "[]\n"
+
+    if any(importlib.util.find_spec(name) is None for name in ["jedi", "parso", "asttokens"]):
+        pytest.skip("shared modules are not available")
+
+    session.send(InlineCommand("shell_autocomplete", source="import sys\nsys.pat"))
+    session.receive(InlineResponse)
+
+    session.send(ToplevelCommand("execute_source", source=CHECK_SOURCE))
+    session.receive(ToplevelResponse)
+    assert "".join(session.output).splitlines()[-1] == "['asttokens', 'jedi', 'parso']"
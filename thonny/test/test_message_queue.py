@@ -0,0 +1,64 @@
+import threading
+import time
+
+from thonny.running import MessageQueue
+
+
+def test_bound_and_stats():
+    notifications = []
+    queue = MessageQueue(2, lambda: notifications.append(None))
+    queue.append("a")
+    queue.append("b")
+    # non-blocking append (used in GUI thread) may exceed the bound
+    queue.append("c", block=False)
+    assert len(queue) == 3
+    assert len(notifications) == 3
+
+    assert queue.popleft() == "a"
+    queue.appendleft("a")
+    assert [queue.popleft() for _ in range(3)] == ["a", "b", "c"]
+
+    stats = queue.get_stats()
+    assert stats["depth"] == 0
+    assert stats["max_depth"] == 3
+    assert stats["appended_count"] == 3
+    assert stats["drained_count"] == 3
+    assert stats["blocked_count"] == 0
+
+
+def test_append_blocks_until_space_or_close():
+    queue = MessageQueue(1)
+    queue.append("a")
+
+    appended = threading.Event()
+
+    def append():
+        queue.append("b")
+        appended.set()
+
+    threading.Thread(target=append, daemon=True).start()
+    assert not appended.wait(0.1)
+    assert len(queue) == 1
+
+    assert queue.popleft() == "a"
+    assert appended.wait(5)
+    assert queue.popleft() == "b"
+    stats = queue.get_stats()
+    assert stats["blocked_count"] == 1
+    assert stats["blocked_time"] > 0
+
+    # closing releases blocked producers and discards their items
+    queue.append("c")
+    released = threading.Event()
+
+    def append_after_close():
+        queue.append("d")
+        released.set()
+
+    threading.Thread(target=append_after_close, daemon=True).start()
+    time.sleep(0.05)
+    queue.close()
+    assert released.wait(5)
+    assert len(queue) == 0
+    queue.append("e")
+    assert len(queue) == 0
@@ -0,0 +1,14 @@
+from thonny.backend import _get_element_page
+
+
+def test_element_pages():
+    assert _get_element_page(list(range(1000)), 0, 10) == list(range(10))
+    assert _get_element_page(tuple(range(100)), 95, 10) == tuple(range(95, 100))
+    assert _get_element_page(set(range(100)), 95, 10) == list(set(range(100)))[95:]
+    assert _get_element_page(range(5)) == [0, 1, 2, 3, 4]
+
+
+def test_dict_entries_page():
+    value = {i: str(i) for i in range(100)}
+    assert _get_element_page(value, 50, 1) == [(50, "50")]
+    assert len(_get_element_page(value, 95, 10)) == 5
@@ -0,0 +1,99 @@
+import gc
+
+import pytest
+
+from thonny.backend import ObjectHeap
+
+
+class Weakrefable:
+    pass
+
+
+def test_eviction_by_count():
+    heap = ObjectHeap(count_limit=2)
+    kept = Weakrefable()
+    values = [kept, Weakrefable(), [1], [2]]
+    for value in values:
+        heap.add(value)
+
+    # oldest ones got evicted, the one still alive remains available via weak reference
+    assert heap.get_stats()["strong_count"] == 2
+    assert id(kept) in heap
+    assert heap.get(id(kept)) is kept
+    # lists don't allow weak references
+    assert id(values[2]) not in heap
+    with pytest.raises(KeyError):
+        heap.get(id(values[2]))
+
+
+def test_weak_entries_disappear():
+    heap = ObjectHeap(count_limit=1)
+    value = Weakrefable()
+    value_id = id(value)
+    heap.add(value)
+    heap.add(None)
+    assert value_id in heap
+
+    del value
+    gc.collect()
+    assert value_id not in heap
+    assert heap.get_stats()["weak_count"] == 0
+
+
+def test_eviction_by_size_respects_pins():
+    heap = ObjectHeap(size_limit=10000)
+    big1 = list(range(1000))
+    big2 = list(range(1000))
+    heap.add(big1)
+    heap.set_pinned("test", [id(big1)])
+    heap.add(big2)
+
+    assert id(big1) in heap
+    assert id(big2) not in heap
+    assert [key for key, _ in heap.items()] == [id(big1)]
+
+    heap.set_pinned("test", [])
+    heap.add(big2)
+    assert id(big1) not in heap
+    assert id(big2) in heap
+
+
+def test_sorted_ids():
+    heap = ObjectHeap()
+    values = ["a", "bb", b"c", [1, 2, 3], Weakrefable()]
+    for value in values:
+        heap.add(value)
+
+    assert heap.get_sorted_ids("str") == sorted([id(values[0]), id(values[1])])
+    assert heap.get_sorted_ids() == sorted(id(value) for value in values)
+    by_size = heap.get_sorted_ids(sort_by="size")
+    assert by_size[-1] == id(values[3])
+    assert heap.get_sorted_ids(sort_by="type")[0] == id(values[4])
+
+    # order gets reused until heap changes
+    assert heap.get_sorted_ids(sort_by="size") is by_size
+    values.append(("new",))
+    heap.add(values[-1])
+    assert len(heap.get_sorted_ids(sort_by="size")) == 6
+
+
+def test_version_changes_with_available_values():
+    heap = ObjectHeap(count_limit=1)
+    first = Weakrefable()
+    second = Weakrefable()
+    heap.add(first)
+    heap.add(first)
+    heap.add(second)
+    version = heap.version
+
+    # demotions and promotions keep the values available
+    heap.get(id(first))
+    heap.add(second)
+    assert heap.version == version
+
+    heap.add([1])
+    assert heap.version != version
+    version = heap.version
+
+    heap.add(second)  # evicts the list
+    assert heap.version != version
@@ -0,0 +1,84 @@
+import os.path
+import pkgutil
+
+import thonny
+import thonny.plugins
+from thonny import plugin_manifests
+from thonny.plugin_manifests import (
+    DeferredPluginObject,
+    ManifestCache,
+    create_backend_feature_tester,
+    read_manifest,
+)
+
+
+def _get_builtin_manifests(cache):
+    return {
+        module_info[1]: cache.get_manifest(module_info)
+        for module_info in pkgutil.iter_modules(thonny.plugins.__path__, "thonny.plugins.")
+    }
+
+
+def test_read_manifest(tmpdir):
+    path = os.path.join(str(tmpdir), "plugin.py")
+    with open(path, "w") as fp:
+        fp.write(
+            "import os\n"
+            "def handler(): pass\n"
+            "plugin_manifest = {'commands': [{'command_id': 'a', 'handler': 'handler'}]}\n"
+        )
+    assert read_manifest(path) == {"commands": [{"command_id": "a", "handler": "handler"}]}
+
+    with open(path, "w") as fp:
+        fp.write("def load_plugin(): pass\n")
+    assert read_manifest(path) is None
+
+    with open(path, "w") as fp:
+        fp.write("plugin_manifest = {'views': compute_views()}\n")
+    assert read_manifest(path) is None
+
+
+def test_builtin_manifests_get_cached(tmpdir, monkeypatch):
+    cache_path = os.path.join(str(tmpdir), "plugin_manifests.cache")
+    cache = ManifestCache(cache_path)
+    manifests = _get_builtin_manifests(cache)
+    cache.save()
+
+    assert manifests["thonny.plugins.heap"] == {
+        "views": [{"class": "HeapView", "label": "Heap", "default_location": "e"}]
+    }
+    assert manifests["thonny.plugins.pylint"]["program_analyzers"] == ["PylintAnalyzer"]
+    assert manifests["thonny.plugins.tabular_data_inspector"] == {
+        "content_inspectors": ["TabularDataInspector"]
+    }
+    assert manifests["thonny.plugins.debugger"] is None
+    # testers given by name would import the module when the menu gets prepared
+    for command in manifests["thonny.plugins.pip_gui"]["commands"]:
+        assert "tester" not in command
+
+    def fail(file_path):
+        raise AssertionError("Should have used cache for " + file_path)
+
+    monkeypatch.setattr(plugin_manifests, "read_manifest", fail)
+    assert _get_builtin_manifests(ManifestCache(cache_path)) == manifests
+
+
+def test_deferred_plugin_object():
+    dumps = DeferredPluginObject("json", "dumps")
+    assert dumps.__name__ == "dumps"
+    assert dumps([1]) == "[1]"
+
+
+class _FakeRunner:
+    def get_supported_features(self):
+        return {"run", "pip_gui"}
+
+
+def test_backend_feature_tester(monkeypatch):
+    tester = create_backend_feature_tester("pip_gui")
+    monkeypatch.setattr(thonny, "_runner", None)
+    assert not tester()
+
+    monkeypatch.setattr(thonny, "_runner", _FakeRunner())
+    assert tester()
+    assert not create_backend_feature_tester("debug")()
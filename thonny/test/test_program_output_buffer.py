@@ -0,0 +1,62 @@
+import time
+
+from thonny.backend import ProgramOutputBuffer
+from thonny.common import ToplevelResponse
+
+
+class _FakeMessageStream:
+    def __init__(self):
+        self.messages = []
+
+    def write_message(self, msg):
+        self.messages.append(msg)
+
+    def describe(self):
+        return [
+            (msg["stream_name"], msg["data"]) if "stream_name" in msg else type(msg).__name__
+            for msg in self.messages
+        ]
+
+
+def test_order_of_streams_and_messages():
+    stream = _FakeMessageStream()
+    buffer = ProgramOutputBuffer(stream.write_message, flush_interval=60)
+    buffer.add("stdout", "a")
+    buffer.add("stdout", "b")
+    buffer.add("stderr", "c")
+    buffer.add("stdout", "d")
+    assert stream.describe() == [("stdout", "ab"), ("stderr", "c")]
+
+    buffer.write_message(ToplevelResponse())
+    assert stream.describe() == [
+        ("stdout", "ab"),
+        ("stderr", "c"),
+        ("stdout", "d"),
+        "ToplevelResponse",
+    ]
+
+
+def test_flushing_by_size_and_time():
+    stream = _FakeMessageStream()
+    buffer = ProgramOutputBuffer(stream.write_message, flush_size=10, flush_interval=60)
+    buffer.add("stdout", "x" * 6)
+    assert stream.messages == []
+    buffer.add("stdout", "y" * 6)
+    assert stream.describe() == [("stdout", "x" * 6 + "y" * 6)]
+
+    stream = _FakeMessageStream()
+    buffer = ProgramOutputBuffer(stream.write_message, flush_interval=0.01)
+    buffer.start_periodic_flushing()
+    buffer.add("stdout", "no newline")
+    deadline = time.time() + 5
+    while not stream.messages and time.time() < deadline:
+        time.sleep(0.01)
+    assert stream.describe() == [("stdout", "no newline")]
+
+    # newline after the interval sends the output without waiting for the thread
+    stream = _FakeMessageStream()
+    buffer = ProgramOutputBuffer(stream.write_message, flush_interval=0.01)
+    buffer.add("stdout", "a")
+    time.sleep(0.02)
+    buffer.add("stdout", "b\n")
+    assert stream.describe() == [("stdout", "ab\n")]
@@ -0,0 +1,43 @@
+from thonny import running
+from thonny.common import InlineCommand
+
+
+class _FakeWorkbench:
+    """Accepts all calls Runner makes to the workbench"""
+
+    def __getattr__(self, name):
+        return lambda *args, **kw: None
+
+
+class _BusyProxy:
+    def __init__(self):
+        self.busy = True
+        self.sent_commands = []
+
+    def send_command(self, cmd):
+        if self.busy:
+            return "postpone"
+
+        self.sent_commands.append(cmd)
+        return None
+
+
+def test_pins_of_different_owners_survive_postponing(monkeypatch):
+    monkeypatch.setattr(running, "get_workbench", lambda: _FakeWorkbench())
+    runner = running.Runner()
+    proxy = _BusyProxy()
+    runner._proxy = proxy
+
+    runner.send_command(InlineCommand("set_pinned_objects", owner="variables", object_ids=[1]))
+    runner.send_command(InlineCommand("set_pinned_objects", owner="inspector", object_ids=[2]))
+    runner.send_command(InlineCommand("set_pinned_objects", owner="variables", object_ids=[3]))
+    runner.send_command(InlineCommand("get_heap_stats"))
+    runner.send_command(InlineCommand("get_heap_stats"))
+
+    proxy.busy = False
+    runner._send_postponed_commands()
+    assert [(cmd.name, cmd.get("owner"), cmd.get("object_ids")) for cmd in proxy.sent_commands] == [
+        ("set_pinned_objects", "inspector", [2]),
+        ("set_pinned_objects", "variables", [3]),
+        ("get_heap_stats", None, None),
+    ]
@@ -0,0 +1,43 @@
+import json
+import os.path
+
+from thonny import startup_profiler
+
+
+def test_trace_format(tmpdir, monkeypatch):
+    monkeypatch.setattr(startup_profiler, "_events", [])
+    monkeypatch.setattr(startup_profiler, "_recording", True)
+    monkeypatch.setattr(startup_profiler, "_backend_start", None)
+    monkeypatch.setattr(startup_profiler, "get_trace_path", lambda: trace_path)
+    trace_path = os.path.join(str(tmpdir), "trace.json")
+
+    @startup_profiler.traced
+    def init_something():
+        with startup_profiler.phase("inner", detail=1):
+            pass
+
+    init_something()
+    startup_profiler.record_backend_start()
+    startup_profiler.record_backend_ready([("interpreter start", 0.001), ("vm setup", 0.002)])
+    startup_profiler.finish()
+
+    # recording has stopped
+    init_something()
+
+    with open(trace_path, encoding="utf-8") as fp:
+        trace = json.load(fp)
+
+    complete_events = [e for e in trace["traceEvents"] if e["ph"] == "X"]
+    assert [e["name"] for e in complete_events] == [
+        "inner",
+        "init_something",
+        "backend startup",
+        "interpreter start",
+        "vm setup",
+    ]
+    inner, outer, backend, _, vm_setup = complete_events
+    assert inner["args"] == {"detail": 1}
+    assert outer["ts"] <= inner["ts"] and outer["dur"] >= inner["dur"]
+    assert vm_setup["dur"] == 2000
+    assert vm_setup["tid"] == backend["tid"] != outer["tid"]
+    assert trace["otherData"]["python_version"]
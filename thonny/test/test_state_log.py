@@ -0,0 +1,42 @@
+import pytest
+
+from thonny.backend import SavedState, StateLog
+
+
+def _create_state(size):
+    return SavedState(
+        stack=[],
+        active_frame=None,
+        io_symbol_count=0,
+        exception_value=None,
+        fresh_exception_id=0,
+        exception_info=None,
+        size=size,
+    )
+
+
+def test_oldest_states_get_dropped():
+    log = StateLog(size_limit=1000, min_count=2)
+    states = [_create_state(100) for _ in range(5000)]
+    for state in states:
+        log.append(state)
+
+    assert len(log) == 5000
+    assert log.first_index == 4990
+    assert log[-1] is states[-1]
+    assert log[4990] is states[4990]
+    with pytest.raises(IndexError):
+        log[4989]
+
+    stats = log.get_stats()
+    assert stats["count"] == 10
+    assert stats["total_size"] == 1000
+
+
+def test_latest_states_are_kept():
+    log = StateLog(size_limit=100, min_count=2)
+    for _ in range(3):
+        log.append(_create_state(1000))
+
+    assert log.first_index == 1
+    assert log[1].size == 1000 and log[2].size == 1000
@@ -0,0 +1,49 @@
+import pytest
+
+from thonny.plugins.backend import tabular_data_backend as tdb
+
+
+def test_ndarray_info_and_stats():
+    numpy = pytest.importorskip("numpy")
+    value = numpy.arange(1000000, dtype=float).reshape(-1, 2)
+    value[0, 1] = numpy.nan
+
+    info = {}
+    tdb.tweak_object_info(value, info, None)
+    tabular = info["tabular"]
+    assert tabular["shape"] == (500000, 2)
+    assert tabular["columns"] == ["0", "1"]
+    assert tabular["dtypes"] == ["float64", "float64"]
+    assert tabular["window"]["rows"][:2] == [["0.0", "nan"], ["2.0", "3.0"]]
+    assert len(tabular["window"]["rows"]) == tdb._INITIAL_WINDOW_SIZE
+
+    window = tdb._get_window(value, "ndarray", 499999, 10)
+    assert window["index"] == ["499999"]
+    assert window["rows"] == [["999998.0", "999999.0"]]
+
+    stats = tdb._compute_stats(value, "ndarray")
+    assert stats["min"] == ["0.0", "3.0"]
+    assert stats["max"] == ["999998.0", "999999.0"]
+    assert stats["nan_count"] == ["0", "1"]
+
+
+def test_data_frame_info_and_stats():
+    pandas = pytest.importorskip("pandas")
+    value = pandas.DataFrame({"name": ["a", "b", None], "x": [1.5, None, 3.5]}, index=[10, 20, 30])
+
+    info = {}
+    tdb.tweak_object_info(value, info, None)
+    tabular = info["tabular"]
+    assert tabular["kind"] == "DataFrame"
+    assert tabular["columns"] == ["name", "x"]
+    assert tabular["window"]["index"] == ["10", "20", "30"]
+    assert tabular["window"]["rows"][0] == ["a", "1.5"]
+
+    stats = tdb._compute_stats(value, "DataFrame")
+    assert stats["mean"] == ["", "2.5"]
+    assert stats["nan_count"] == ["1", "1"]
+
+    info = {}
+    tdb.tweak_object_info(value["x"], info, None)
+    assert info["tabular"]["kind"] == "Series"
+    assert info["tabular"]["shape"] == (3,)
@@ -0,0 +1,80 @@
+from thonny.memory import TreeRows
+
+
+class _FakeTree:
+    """Implements the part of ttk.Treeview used by TreeRows and counts modifications"""
+
+    def __init__(self):
+        self.items = {}  # iid => {"values": ..., "tags": ...}
+        self.order = []
+        self.modification_count = 0
+        self._next_iid = 0
+
+    def insert(self, parent, index, values, tags):
+        self._next_iid += 1
+        iid = "I%d" % self._next_iid
+        self.items[iid] = {"values": values, "tags": tags}
+        self.order.append(iid)
+        self.modification_count += 1
+        return iid
+
+    def delete(self, *iids):
+        for iid in iids:
+            del self.items[iid]
+            self.order.remove(iid)
+        self.modification_count += 1
+
+    def item(self, iid, **kw):
+        self.items[iid].update(kw)
+        self.modification_count += 1
+
+    def tag_has(self, tag, iid):
+        return tag in self.items[iid]["tags"]
+
+    def move(self, iid, parent, index):
+        self.order.remove(iid)
+        self.order.insert(index, iid)
+        self.modification_count += 1
+
+    def get_children(self):
+        return tuple(self.order)
+
+    def describe(self):
+        return [
+            (self.items[iid]["values"][0], "changed" in self.items[iid]["tags"])
+            for iid in self.order
+        ]
+
+
+def _rows(variables, title="Globals"):
+    return [((title, None), title, "", "")] + [
+        ((title, name), name, "0x%d" % len(value), value) for name, value in variables
+    ]
+
+
+def test_only_changed_rows_get_modified():
+    tree = _FakeTree()
+    rows = TreeRows(tree)
+    rows.update(_rows([("a", "1"), ("c", "3")]))
+    assert tree.describe() == [("Globals", False), ("a", False), ("c", False)]
+    a_iid = tree.order[1]
+
+    # same content doesn't touch the tree
+    tree.modification_count = 0
+    rows.update(_rows([("a", "1"), ("c", "3")]))
+    assert tree.modification_count == 0
+
+    # new row gets inserted to right place, changed value gets highlighted
+    rows.update(_rows([("a", "11"), ("b", "2"), ("c", "3")]))
+    assert tree.describe() == [("Globals", False), ("a", True), ("b", False), ("c", False)]
+    assert tree.order[1] == a_iid
+
+    # highlight disappears when the value stays the same, removed rows disappear
+    rows.update(_rows([("a", "11"), ("c", "3")]))
+    assert tree.describe() == [("Globals", False), ("a", False), ("c", False)]
+    assert tree.order[1] == a_iid
+
+    rows.clear()
+    assert tree.describe() == []
+    rows.update(_rows([("a", "1")]))
+    assert tree.describe() == [("Globals", False), ("a", False)]
@@ -0,0 +1,40 @@
+import _tkinter
+import threading
+import time
+import tkinter
+
+import pytest
+
+from thonny.running import WakeupPipe
+
+
+def _process_events(interp, condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        interp.tk.dooneevent(_tkinter.DONT_WAIT)
+        time.sleep(0.001)
+
+
+@pytest.mark.skipif(not hasattr(tkinter.Tcl().tk, "createfilehandler"), reason="Unix only")
+def test_notifications_from_other_threads_reach_tk_thread():
+    # Tcl interpreter is enough for file handlers, no display needed
+    interp = tkinter.Tcl()
+    calls = []
+    pipe = WakeupPipe(interp, lambda: calls.append(threading.current_thread()))
+    try:
+        threads = [threading.Thread(target=pipe.notify) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        _process_events(interp, lambda: calls)
+        # pending notifications get coalesced
+        assert calls == [threading.current_thread()]
+
+        # next notification after handling the previous one wakes the loop again
+        pipe.notify()
+        _process_events(interp, lambda: len(calls) == 2)
+        assert len(calls) == 2
+    finally:
+        pipe.close()
@@ -2,6 +2,7 @@
 
 import ast
 import collections
+import functools
 import importlib
 import logging
 import os.path
@@ -35,12 +36,26 @@ from typing import (
 from warnings import warn
 
 import thonny
-from thonny import THONNY_USER_DIR, get_runner, running, ui_utils, assistance, languages
+from thonny import (
+    THONNY_USER_DIR,
+    get_runner,
+    running,
+    ui_utils,
+    assistance,
+    languages,
+    startup_profiler,
+)
 from thonny.code import EditorNotebook
 from thonny.common import Record, UserError, normpath_with_actual_case
 from thonny.config import try_load_configuration
 from thonny.config_ui import ConfigurationDialog
 from thonny.misc_utils import running_on_linux, running_on_mac_os, running_on_windows
+from thonny.plugin_manifests import (
+    MANIFEST_NAME,
+    DeferredPluginObject,
+    ManifestCache,
+    create_backend_feature_tester,
+)
 from thonny.running import BackendProxy, Runner
 from thonny.shell import ShellView
 from thonny.ui_utils import (
@@ -99,6 +114,7 @@ class Workbench(tk.Tk):
 
     """
 
+    @startup_profiler.traced
     def __init__(self, server_socket=None) -> None:
         thonny._workbench = self
         self._destroying = False
@@ -138,8 +154,10 @@ class Workbench(tk.Tk):
         self._init_theming()
         self._init_window()
         self.add_view(ShellView, "Shell", "s", visible_by_default=True, default_position_key="A")
-        assistance.init()
-        self._runner = Runner()
+        with startup_profiler.phase("assistance.init"):
+            assistance.init()
+        with startup_profiler.phase("Runner"):
+            self._runner = Runner()
         self._load_plugins()
 
         self._editor_notebook = None  # type: Optional[EditorNotebook]
@@ -161,7 +179,8 @@ class Workbench(tk.Tk):
         self._init_commands()
         self._init_icon()
         try:
-            self._editor_notebook.load_startup_files()
+            with startup_profiler.phase("load_startup_files"):
+                self._editor_notebook.load_startup_files()
         except Exception:
             self.report_exception()
 
@@ -204,6 +223,7 @@ class Workbench(tk.Tk):
         except Exception:
             self.report_exception()
 
+    @startup_profiler.traced
     def _init_configuration(self) -> None:
         self._configuration_manager = try_load_configuration(thonny.CONFIGURATION_FILE_NAME)
         self._configuration_pages = {}  # type: Dict[str, Type[tk.Widget]]
@@ -217,6 +237,7 @@ class Workbench(tk.Tk):
         self.set_default("general.font_scaling_mode", "default")
         self.set_default("run.working_directory", os.path.expanduser("~"))
 
+    @startup_profiler.traced
     def _init_language(self) -> None:
         """Initialize language."""
         language_code = self.get_option("general.language")
@@ -231,6 +252,7 @@ class Workbench(tk.Tk):
         else:
             return logging.INFO
 
+    @startup_profiler.traced
     def _init_diagnostic_logging(self) -> None:
         logFormatter = logging.Formatter("%(levelname)s: %(message)s")
         root_logger = logging.getLogger()
@@ -253,6 +275,7 @@ class Workbench(tk.Tk):
         fault_out = open(os.path.join(THONNY_USER_DIR, "frontend_faults.log"), mode="w")
         faulthandler.enable(fault_out)
 
+    @startup_profiler.traced
     def _init_window(self) -> None:
         self.title("Thonny")
 
@@ -290,6 +313,7 @@ class Workbench(tk.Tk):
         self.protocol("WM_DELETE_WINDOW", self._on_close)
         self.bind("<Configure>", self._on_configure, True)
 
+    @startup_profiler.traced
     def _init_icon(self) -> None:
         # Window icons
         if running_on_linux() and ui_utils.get_tk_version_info() >= (8, 6):
@@ -305,6 +329,7 @@ class Workbench(tk.Tk):
                 except Exception:
                     pass
 
+    @startup_profiler.traced
     def _init_menu(self) -> None:
         self.option_add("*tearOff", tk.FALSE)
         if lookup_style_option("Menubar", "custom", False):
@@ -334,12 +359,15 @@ class Workbench(tk.Tk):
         self.get_menu("tools", _("Tools"))
         self.get_menu("help", _("Help"))
 
+    @startup_profiler.traced
     def _load_plugins(self) -> None:
+        manifest_cache = ManifestCache(os.path.join(THONNY_USER_DIR, "plugin_manifests.cache"))
+
         # built-in plugins
         import thonny.plugins  # pylint: disable=redefined-outer-name
 
         self._load_plugins_from_path(
-            thonny.plugins.__path__, "thonny.plugins."  # type: ignore
+            thonny.plugins.__path__, "thonny.plugins.", manifest_cache  # type: ignore
         )
 
         # 3rd party plugins from namespace package
@@ -349,26 +377,86 @@ class Workbench(tk.Tk):
             # No 3rd party plugins installed
             pass
         else:
-            self._load_plugins_from_path(thonnycontrib.__path__, "thonnycontrib.")
+            self._load_plugins_from_path(thonnycontrib.__path__, "thonnycontrib.", manifest_cache)
 
-    def _load_plugins_from_path(self, path: List[str], prefix: str) -> None:
+        manifest_cache.save()
+
+    def _load_plugins_from_path(
+        self, path: List[str], prefix: str, manifest_cache: ManifestCache
+    ) -> None:
         load_function_name = "load_plugin"
 
-        modules = []
-        for _, module_name, _ in sorted(pkgutil.iter_modules(path, prefix), key=lambda x: x[2]):
-            try:
-                m = importlib.import_module(module_name)
-                if hasattr(m, load_function_name):
-                    modules.append(m)
-            except Exception:
-                logging.exception("Failed loading plugin '" + module_name + "'")
+        # (load order key, module name, loader)
+        plugins = []  # type: List[Tuple[str, str, Callable[[], None]]]
+        for module_info in sorted(pkgutil.iter_modules(path, prefix), key=lambda x: x[2]):
+            module_name = module_info[1]
+            manifest = manifest_cache.get_manifest(module_info)
+            if manifest is None:
+                try:
+                    with startup_profiler.phase("import " + module_name):
+                        m = importlib.import_module(module_name)
+                except Exception:
+                    logging.exception("Failed loading plugin '" + module_name + "'")
+                    continue
+
+                # manifest may be present even if it couldn't be read without importing
+                manifest = getattr(m, MANIFEST_NAME, None)
+                if manifest is None:
+                    if hasattr(m, load_function_name):
+                        load_order_key = getattr(m, "load_order_key", module_name)
+                        plugins.append(
+                            (load_order_key, module_name, getattr(m, load_function_name))
+                        )
+                    continue
+
+            # module gets imported when some of its commands or views get used
+            plugins.append(
+                (
+                    manifest.get("load_order_key", module_name),
+                    module_name,
+                    functools.partial(self._register_plugin_manifest, module_name, manifest),
+                )
+            )
+
+        for plugin in sorted(plugins, key=lambda x: x[0]):
+            with startup_profiler.phase("load " + plugin[1]):
+                plugin[2]()
+
+    def _register_plugin_manifest(self, module_name: str, manifest: Dict[str, Any]) -> None:
+        """Registers the things declared in plugin's manifest (see thonny.plugin_manifests)"""
+
+        def deferred(attribute_name):
+            return DeferredPluginObject(module_name, attribute_name)
+
+        for option_name, default_value in manifest.get("defaults", {}).items():
+            self.set_default(option_name, default_value)
+
+        for view in manifest.get("views", []):
+            options = dict(view)
+            cls = deferred(options.pop("class"))
+            self.add_view(cls, _(options.pop("label")), **options)  # type: ignore
+
+        for command in manifest.get("commands", []):
+            options = dict(command)
+            for name in ["command_label", "caption"]:
+                if name in options:
+                    options[name] = _(options[name])
+            for name in ["handler", "tester"]:
+                if name in options:
+                    options[name] = deferred(options[name])
+            if "required_backend_feature" in options:
+                options["tester"] = create_backend_feature_tester(
+                    options.pop("required_backend_feature")
+                )
+            self.add_command(**options)
 
-        def module_sort_key(m):
-            return getattr(m, "load_order_key", m.__name__)
+        for class_name in manifest.get("program_analyzers", []):
+            assistance.add_program_analyzer(deferred(class_name))
 
-        for m in sorted(modules, key=module_sort_key):
-            getattr(m, load_function_name)()
+        for class_name in manifest.get("content_inspectors", []):
+            self.add_content_inspector(deferred(class_name))
 
+    @startup_profiler.traced
     def _init_fonts(self) -> None:
         # set up editor and shell fonts
         self.set_default("view.io_font_family", "Courier" if running_on_mac_os() else "Courier New")
@@ -472,6 +560,7 @@ class Workbench(tk.Tk):
 
         self.update_fonts()
 
+    @startup_profiler.traced
     def _add_main_backends(self) -> None:
         self.set_default("run.backend_name", "SameAsFrontend")
         self.set_default("CustomInterpreter.used_paths", [])
@@ -504,6 +593,7 @@ class Workbench(tk.Tk):
             "z",
         )
 
+    @startup_profiler.traced
     def _start_runner(self) -> None:
         try:
             self.update_idletasks()  # allow UI to complete
@@ -530,6 +620,7 @@ class Workbench(tk.Tk):
         Thread(target=server_loop, daemon=True).start()
         self._poll_socket_requests()
 
+    @startup_profiler.traced
     def _init_commands(self) -> None:
 
         self.add_command(
@@ -641,6 +732,7 @@ class Workbench(tk.Tk):
     def _print_state_for_debugging(self, event) -> None:
         print(get_runner()._postponed_commands)
 
+    @startup_profiler.traced
     def _init_containers(self) -> None:
 
         # Main frame functions as
@@ -712,6 +804,7 @@ class Workbench(tk.Tk):
         self._editor_notebook.position_key = 1  # type: ignore
         self._center_pw.insert("auto", self._editor_notebook)
 
+    @startup_profiler.traced
     def _init_theming(self) -> None:
         self._style = ttk.Style()
         self._ui_themes = (
@@ -793,6 +886,7 @@ class Workbench(tk.Tk):
             )
         )
 
+    @startup_profiler.traced
     def _publish_commands(self) -> None:
         for cmd in self._commands:
             self._publish_command(**cmd)
@@ -1139,6 +1233,7 @@ class Workbench(tk.Tk):
 
         codeview.set_syntax_options(get_settings(name))
 
+    @startup_profiler.traced
     def reload_themes(self) -> None:
         preferred_theme = self.get_option("view.ui_theme")
         available_themes = self.get_usable_ui_theme_names()
@@ -1166,6 +1261,7 @@ class Workbench(tk.Tk):
 
         return False
 
+    @startup_profiler.traced
     def _init_program_arguments_frame(self) -> None:
         self.set_default("view.show_program_arguments", False)
         self.set_default("run.program_arguments", "")
@@ -1215,6 +1311,7 @@ class Workbench(tk.Tk):
 
         update_visibility()
 
+    @startup_profiler.traced
     def _init_regular_mode_link(self):
         if self.get_ui_mode() != "simple":
             return
@@ -1260,6 +1357,7 @@ class Workbench(tk.Tk):
         self.set_option("run.past_program_arguments", past_args)
         self.program_arguments_box.configure(values=[""] + past_args)
 
+    @startup_profiler.traced
     def _show_views(self) -> None:
         for view_id in self._view_records:
             if self._view_records[view_id]["visibility_flag"].get():
@@ -1540,6 +1638,7 @@ class Workbench(tk.Tk):
             "true",
         ] or self.get_option("general.debug_mode", False)
 
+    @startup_profiler.traced
     def _init_scaling(self) -> None:
         self._default_scaling_factor = self.tk.call("tk", "scaling")
         if self._default_scaling_factor > 10:
@@ -2067,6 +2166,7 @@ class Workbench(tk.Tk):
             dlg = ui_utils.LongTextDialog(title, msg, parent=self)
             ui_utils.show_dialog(dlg, self)
 
+    @startup_profiler.traced
     def _open_views(self) -> None:
         for nb_name in self._view_notebooks:
             view_name = self.get_option("layout.notebook_" + nb_name + "_visible_view")